@@ -1,97 +1,127 @@
 import math
 import util
 
+# input keys that determine the keys adjust adds to its output
+FIELDS = ('altitude', 'observation', 'height', 'temperature', 'pressure', 'horizon')
+
 def adjust(values):
-    output = values.copy()
+    return util.Overlay(values, _compute(values))
+
+# distinct requests in a batch from which adjustBatch computes their altitudes
+# together with vector.adjust; below this the scalar path is as fast and a small
+# batch need not import NumPy
+NUMPY_BATCH = 128
+
+def adjustBatch(valuesList):
+    return util.memoizeBatch(valuesList, FIELDS, _compute, _computeMany)
+
+# the text adjust reads for a field that is absent
+_DEFAULT_TEXT = (('observation', None), ('height', '0'), ('temperature', '72'), ('pressure', '1010'), ('horizon', 'natural'))
+
+def _computeMany(valuesList):
+    # _compute over distinct requests. Those whose fields are all strings are parsed
+    # and computed at once by vector.adjust, which reads them as _compute does; any
+    # it rejects, and all the others, go through _compute for their exact error
+    if len(valuesList) < NUMPY_BATCH:
+        return [_compute(values) for values in valuesList]
+    columns = [[values.get(key, default) for values in valuesList] for key, default in _DEFAULT_TEXT]
+    plain = [index for index, values in enumerate(valuesList) if 'altitude' not in values]
+    for column in columns:
+        if set(map(type, column)) != {str}:
+            plain = [index for index in plain if type(column[index]) is str]
+    if len(plain) < NUMPY_BATCH:
+        return [_compute(values) for values in valuesList]
+
+    import vector
+
+    if len(plain) < len(valuesList):
+        columns = [[column[index] for index in plain] for column in columns]
+    altitudes, errors = vector.adjust(*columns)
+    valid = errors == 0
+    altitudes = iter(vector.formatAlt(altitudes[valid]).tolist())
+    outputs = [None] * len(valuesList)
+    for index, rowValid in zip(plain, valid.tolist()):
+        if rowValid:
+            outputs[index] = {'altitude': next(altitudes)}
+    return [_compute(values) if output is None else output for values, output in zip(valuesList, outputs)]
+
+def adjustCached(values, cache):
+    return cache.memoize(values, FIELDS, _compute)
+
+def _compute(values):
+    output = {}
 
     if 'altitude' in values:
         output['error'] = 'altitude already exists in the input'
         return output
 
-    # observation (degrees and minutes)
-    if 'observation' not in values:
-        output['error'] = 'mandatory information is missing'
-        return output
-    try:
-        degreesAndMinutes = values['observation'].split('d')
-        degrees = int(degreesAndMinutes[0])
-        # print('degrees', degrees)
-        minutesStr = degreesAndMinutes[1]
-        minutes = float(minutesStr)
-        # print('minutes', minutes)
-    except:
-        output['error'] = 'observation is invalid'
-        return output
-    if degrees < 0 or degrees >= 90:
-        # output['error'] = 'degrees must be an integer [0, 90)'
-        output['error'] = 'observation is invalid'
+    altitude, error = altitudeFromValues(values)
+    if error is not None:
+        output['error'] = error
         return output
-    if minutesStr[::-1].find('.') is not 1:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'observation is invalid'
-        return output
-    if minutes < 0.0 or minutes >= 60.0:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'observation is invalid'
-        return output
-    if degrees == 0 and minutes == 0.1:
-        # output['error'] = 'can\'t be less than 0d0.1'
-        output['error'] = 'observation is invalid'
-        return output
-    totalDegrees = degrees + util.arcminToDegrees(minutes)
-    # print('totalDegrees', totalDegrees)
+    formattedAltitude = util.formatAlt(altitude)
+    # print('formatted altitude', formattedAltitude)
+
+    output['altitude'] = formattedAltitude
+
+    return output
 
-    # height (numeric? int or float accepted?)
+def validate(values):
+    # observation, height, temperature, pressure and horizon, checked in this order
+    # -> (parsed fields, None) or (None, error). Every request runs these, so they
+    # are written out rather than built with schema.build, whose validators cost a
+    # call per rule (scripts/benchValidation.py)
+    if 'observation' not in values:
+        return None, 'mandatory information is missing'
+    observation = util.parseAngle(values['observation'], 0, 90)
+    # 0d0.0 is on the horizon, where the refraction divides by zero
+    if observation is None or observation <= 0:
+        return None, 'observation is invalid'
     height = 0
     if 'height' in values:
         try:
             height = float(values['height'])
-        except ValueError:
-            output['error'] = 'height is invalid'
-            return output
-        if values['height'] < 0:
-            # output['error'] = 'height must be greater than 0'
-            output['error'] = 'height must be greater than 0'
-            return output
-
-    # temperature (int)
+        except (TypeError, ValueError, OverflowError):
+            return None, 'height is invalid'
+        if not height >= 0:
+            return None, 'height must be greater than 0'
     temperature = 72
     if 'temperature' in values:
         try:
             temperature = int(values['temperature'])
-        except ValueError:
-            output['error'] = 'temperature is invalid'
-            return output
+        except (TypeError, ValueError, OverflowError):
+            return None, 'temperature is invalid'
         if temperature < -20 or temperature > 120:
-            # output['error'] = 'temperature must be within range [-20, 120]'
-            output['error'] = 'temperature is invalid'
-            return output
-
-    # pressure (int)
+            return None, 'temperature is invalid'
     pressure = 1010
     if 'pressure' in values:
         try:
             pressure = int(values['pressure'])
-        except ValueError:
-            output['error'] = 'pressure is invalid'
-            return output
+        except (TypeError, ValueError, OverflowError):
+            return None, 'pressure is invalid'
         if pressure < 100 or pressure > 1100:
-            # output['error'] = 'pressure must be within range [100, 1100]'
-            output['error'] = 'pressure is invalid'
-            return output
-
-    # horizon (string)
+            return None, 'pressure is invalid'
     horizon = 'natural'
     if 'horizon' in values:
         try:
             horizon = values['horizon'].lower()
         except AttributeError:
-            output['error'] = 'horizon is invalid'
-            return output
+            return None, 'horizon is invalid'
         if horizon != 'artificial' and horizon != 'natural':
-            # output['error'] = 'horizon must be either artificial or natural (case-insensitive)'
-            output['error'] = 'horizon is invalid'
-            return output
+            return None, 'horizon is invalid'
+    return {'observation': observation, 'height': height, 'temperature': temperature,
+            'pressure': pressure, 'horizon': horizon}, None
+
+def altitudeFromValues(values):
+    # observation, height, temperature, pressure, horizon -> (altitude degrees, error)
+    fields, error = validate(values)
+    if error is not None:
+        return None, error
+    totalDegrees = fields['observation']
+    height = fields['height']
+    temperature = fields['temperature']
+    pressure = fields['pressure']
+    horizon = fields['horizon']
 
     # dip
     dip = 0
@@ -108,14 +138,9 @@ def adjust(values):
     # print('altitude', altitude)
     # check to see if altitude is within valid range
     if altitude < 0 or altitude >= 91:
-        output['error'] = 'altitude is invalid'
-        return output
-    formattedAltitude = util.formatAlt(altitude)
-    # print('formatted altitude', formattedAltitude)
+        return None, 'altitude is invalid'
 
-    output['altitude'] = formattedAltitude
-
-    return output
+    return altitude, None
 
 # input = {
 #     'observation': '30d1.5',
@@ -0,0 +1,175 @@
+import os
+import sys
+import math
+import mmap
+import zlib
+import array
+import struct
+import util
+
+# Star catalogs are compiled from CSV (name,sha,dec with angles as 'DdM.M') into a
+# binary file that is memory-mapped rather than parsed, so opening one costs the
+# same and allocates the same whatever its size. Layout, little-endian:
+#
+#   header   magic, row count, hash slots, string bytes          HEADER_SIZE bytes
+#   columns  sha, dec, shaRadians, decRadians, sinDec, cosDec     float64[rows] each
+#   offsets  start of each row's name, shaText and decText        uint32[3 * rows + 1]
+#   slots    open-addressed name index, row + 1 (0 is empty)      uint32[slots]
+#   strings  UTF-8 text the offsets point into
+#
+# Every section starts on an 8-byte boundary.
+
+MAGIC = b'CSSECAT1'
+HEADER = '<8sIIQ'
+HEADER_SIZE = 32
+COLUMNS = ('sha', 'dec', 'shaRadians', 'decRadians', 'sinDec', 'cosDec')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stars.cat')
+
+class Catalog(object):
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise ValueError('star catalogs can only be mapped on little-endian hosts')
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, rows, slots, stringsSize = struct.unpack_from(HEADER, self._map)
+        if magic != MAGIC:
+            raise ValueError('%s is not a star catalog' % path)
+        self.rows = rows
+        self._slotMask = slots - 1
+
+        view = memoryview(self._map)
+        offset = HEADER_SIZE
+        for column in COLUMNS:
+            setattr(self, column, view[offset:offset + 8 * rows].cast('d'))
+            offset += 8 * rows
+        self._offsets = view[offset:offset + 4 * (3 * rows + 1)].cast('I')
+        offset = _align(offset + 4 * (3 * rows + 1))
+        self._slots = view[offset:offset + 4 * slots].cast('I')
+        offset = _align(offset + 4 * slots)
+        self._strings = view[offset:offset + stringsSize]
+
+        self.names = _TextColumn(self, 0)
+        self.shaText = _TextColumn(self, 1)
+        self.decText = _TextColumn(self, 2)
+
+    def __len__(self):
+        return self.rows
+
+    def find(self, body):
+        # star name in any case -> row, or None if it is not in the catalog
+        try:
+            key = body.lower()
+            encoded = key.encode('utf-8')
+        except (AttributeError, UnicodeEncodeError):
+            # not a string, or one with a lone surrogate, which no star name has
+            return None
+        slot = zlib.crc32(encoded) & self._slotMask
+        while True:
+            row = self._slots[slot]
+            if row == 0:
+                return None
+            if self._text(row - 1, 0).lower() == key:
+                return row - 1
+            slot = (slot + 1) & self._slotMask
+
+    def _text(self, row, field):
+        start = 3 * row + field
+        return self._strings[self._offsets[start]:self._offsets[start + 1]].tobytes().decode('utf-8')
+
+class _TextColumn(object):
+    # one string per row, decoded from the map on access
+    __slots__ = ('_catalog', '_field')
+
+    def __init__(self, catalog, field):
+        self._catalog = catalog
+        self._field = field
+
+    def __len__(self):
+        return self._catalog.rows
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self._catalog.rows
+        if row < 0 or row >= self._catalog.rows:
+            raise IndexError('catalog row out of range')
+        return self._catalog._text(row, self._field)
+
+def readCsv(path):
+    # CSV with a name,sha,dec header -> [(name, shaText, decText)]
+    import csv
+
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        if [field.strip().lower() for field in header] != ['name', 'sha', 'dec']:
+            raise ValueError('%s must start with a name,sha,dec header' % path)
+        return [tuple(field.strip() for field in row) for row in reader if row]
+
+def writeCatalog(rows, path):
+    # [(name, shaText, decText)] -> compiled catalog file at path
+    rows = list(rows)
+    slots = 8
+    while slots < 2 * len(rows):
+        slots *= 2
+
+    columns = dict((column, array.array('d')) for column in COLUMNS)
+    offsets = array.array('I', [0])
+    strings = bytearray()
+    table = array.array('I', [0] * slots)
+    for row, (name, shaStr, decStr) in enumerate(rows):
+        sha = util.degreesFromFormattedAlt(shaStr)
+        dec = util.degreesFromFormattedAlt(decStr)
+        columns['sha'].append(sha)
+        columns['dec'].append(dec)
+        columns['shaRadians'].append(math.radians(sha))
+        columns['decRadians'].append(math.radians(dec))
+        columns['sinDec'].append(math.sin(math.radians(dec)))
+        columns['cosDec'].append(math.cos(math.radians(dec)))
+        for text in (name, shaStr, decStr):
+            strings += text.encode('utf-8')
+            offsets.append(len(strings))
+
+        key = name.lower().encode('utf-8')
+        slot = zlib.crc32(key) & (slots - 1)
+        while table[slot] != 0:
+            if rows[table[slot] - 1][0].lower().encode('utf-8') == key:
+                raise ValueError('%s appears more than once in the catalog' % name)
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = row + 1
+
+    if sys.byteorder != 'little':
+        for section in list(columns.values()) + [offsets, table]:
+            section.byteswap()
+    with open(path, 'wb') as file:
+        file.write(struct.pack(HEADER, MAGIC, len(rows), slots, len(strings)).ljust(HEADER_SIZE, b'\0'))
+        for column in COLUMNS:
+            file.write(columns[column].tobytes())
+        file.write(_pad(offsets.tobytes()))
+        file.write(_pad(table.tobytes()))
+        file.write(bytes(strings))
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def _pad(data):
+    return data + b'\0' * (_align(len(data)) - len(data))
+
+# the catalog predict and the other ops use; STAR_CATALOG points at a larger build.
+# It is mapped on first use so the compiler can run without an existing build.
+_defaultAttributes = ('names', 'shaText', 'decText') + COLUMNS + ('find',)
+
+def defaultCatalog():
+    global default
+    if 'default' not in globals():
+        default = Catalog(os.environ.get('STAR_CATALOG', DEFAULT_PATH))
+        for attribute in _defaultAttributes:
+            globals()[attribute] = getattr(default, attribute)
+    return default
+
+def __getattr__(name):
+    if name == 'default' or name in _defaultAttributes:
+        defaultCatalog()
+        return globals()[name]
+    raise AttributeError("module 'catalog' has no attribute '%s'" % name)
@@ -1,269 +1,118 @@
-import math
-import datetime
 import util
+import reduction
 
-stars = {
-    'Alpheratz': '357d41.7,29d10.9',
-    'Ankaa': '353d14.1,-42d13.4',
-    'Schedar': '349d38.4,56d37.7',
-    'Diphda':'348d54.1,-17d54.1',
-    'Achernar':	'335d25.5,-57d09.7',
-    'Hamal': '327d58.7,23d32.3',
-    'Polaris':'316d41.3,89d20.1',
-    'Akamar':'315d16.8,-40d14.8',
-    'Menkar':'314d13.0,4d09.0',
-    'Mirfak':'308d37.4,49d55.1',
-    'Aldebaran':	'290d47.1,16d32.3',
-    'Rigel':	'281d10.1,-8d11.3',
-    'Capella':	'280d31.4,46d00.7',
-    'Bellatrix':	'278d29.8,6d21.6',
-    'Elnath':	'278d10.1,28d37.1',
-    'Alnilam':	'275d44.3,-1d11.8',
-    'Betelgeuse':'270d59.1,7d24.3',
-    'Canopus':	'263d54.8,-52d42.5',
-    'Sirius':	'258d31.7,-16d44.3',
-    'Adara':	'255d10.8,-28d59.9',
-    'Procyon':	'244d57.5,5d10.9',
-    'Pollux':	'243d25.2,27d59.0',
-    'Avior':	'234d16.6,-59d33.7',
-    'Suhail':'222d50.7,-43d29.8',
-    'Miaplacidus':	'221d38.4,-69d46.9',
-    'Alphard':	'217d54.1,-8d43.8',
-    'Regulus':	'207d41.4,11d53.2',
-    'Dubhe':	'193d49.4,61d39.5',
-    'Denebola':	'182d31.8,14d28.9',
-    'Gienah':	'175d50.4,-17d37.7',
-    'Acrux':	'173d07.2,-63d10.9',
-    'Gacrux':	'171d58.8,-57d11.9',
-    'Alioth':'166d19.4,55d52.1',
-    'Spica':	'158d29.5,-11d14.5',
-    'Alcaid':	'152d57.8,49d13.8',
-    'Hadar':	'148d45.5,-60d26.6',
-    'Menkent':'148d05.6,-36d26.6',
-    'Arcturus':	'145d54.2,19d06.2',
-    'Rigil Kent.':'139d49.6,-60d53.6',
-    'Zubenelg.':	'137d03.7,-16d06.3',
-    'Kochab':	'137d21.0,74d05.2',
-    'Alphecca':'126d09.9,26d39.7',
-    'Antares':	'112d24.4,-26d27.8',
-    'Atria':	'107d25.2,-69d03.0',
-    'Sabik':	'102d10.9,-15d44.4',
-    'Shaula'	:'96d20.0,-37d06.6',
-    'Rasalhague':	'96d05.2,12d33.1',
-    'Etamin'	:'90d45.9,51d29.3',
-    'Kaus Aust.':	'83d41.9,-34d22.4',
-    'Vega'	:'80d38.2,38d48.1',
-    'Nunki'	:'75d56.6,-26d16.4',
-    'Altair'	:'62d06.9,8d54.8',
-    'Peacock'	:'53d17.2,-56d41.0',
-    'Deneb'	:'49d30.7,45d20.5',
-    'Enif'	:'33d45.7,9d57.0',
-    'Alnair'	:'27d42.0,-46d53.1',
-    'Fomalhaut'	:'15d22.4,-29d32.3',
-    'Scheat'	:'13d51.8,28d10.3',
-    'Markab'	:'13d36.7,15d17.6'
-}
+# input keys that determine the keys correct adds to its output
+FIELDS = ('lat', 'long', 'altitude', 'assumedLat', 'assumedLong', 'method', 'correctedDistance', 'correctedAzimuth')
 
-def correct(values):
-    output = values.copy()
-
-    if 'lat' not in values:
-        output['error'] = 'mandatory information is missing'
-        return output
+# the angles correct reads, 'DdM.M' with D in each one's range
+ANGLES = (('lat', -89, 90), ('long', 0, 360), ('altitude', 1, 90), ('assumedLat', -89, 90), ('assumedLong', 0, 360))
 
-    if 'long' not in values:
-        output['error'] = 'mandatory information is missing'
-        return output
-
-    if 'altitude' not in values:
-        output['error'] = 'mandatory information is missing'
-        return output
-
-    if 'assumedLat' not in values:
-        output['error'] = 'mandatory information is missing'
-        return output
-
-    if 'assumedLong' not in values:
-        output['error'] = 'mandatory information is missing'
-        return output
+# 'direct' or 'table', an interpolated lookup in the reduction table that
+# falls back to the direct reduction outside its range; the deployed bundle
+# carries the table only when built with buildBundle.py --table
+METHODS = ('direct', 'table')
 
+def validate(values):
+    # -> (parsed fields, None) or (None, error), written out as adjust.validate is
+    for key, minDegrees, maxDegrees in ANGLES:
+        if key not in values:
+            return None, 'mandatory information is missing'
     if 'correctedDistance' in values:
-        output['error'] = 'correctedDistance already exists'
-        return output
-
+        return None, 'correctedDistance already exists'
     if 'correctedAzimuth' in values:
-        output['error'] = 'correctedAzimuth already exists'
-        return output
-
-    # lat
-    try:
-        degreesAndMinutes = values['lat'].split('d')
-        degrees = int(degreesAndMinutes[0])
-        # print('degrees', degrees)
-        minutesStr = degreesAndMinutes[1]
-        minutes = float(minutesStr)
-        # print('minutes', minutes)
-    except:
-        output['error'] = 'lat is invalid'
-        return output
-    if degrees <= -90 or degrees >= 90:
-        # output['error'] = 'degrees must be an integer (-90, 90)'
-        output['error'] = 'lat is invalid'
-        return output
-    if minutesStr[::-1].find('.') is not 1:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'lat is invalid'
-        return output
-    if minutes < 0.0 or minutes >= 60.0:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'lat is invalid'
-        return output
-    if degrees == 0 and minutes == 0.1:
-        # output['error'] = 'can\'t be less than 0d0.1'
-        output['error'] = 'lat is invalid'
-        return output
-    if degrees >= 0:
-        totalLatDegrees = degrees + util.arcminToDegrees(minutes)
-    else:
-        totalLatDegrees = degrees - util.arcminToDegrees(minutes)
-
-    # long
-    try:
-        degreesAndMinutes = values['long'].split('d')
-        degrees = int(degreesAndMinutes[0])
-        # print('degrees', degrees)
-        minutesStr = degreesAndMinutes[1]
-        minutes = float(minutesStr)
-        # print('minutes', minutes)
-    except:
-        output['error'] = 'long is invalid'
-        return output
-    if degrees < 0 or degrees >= 360:
-        # output['error'] = 'degrees must be an integer [0, 360)'
-        output['error'] = 'long is invalid'
-        return output
-    if minutesStr[::-1].find('.') is not 1:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'long is invalid'
-        return output
-    if minutes < 0.0 or minutes >= 60.0:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'long is invalid'
-        return output
-    if degrees == 0 and minutes == 0.1:
-        # output['error'] = 'can\'t be less than 0d0.1'
-        output['error'] = 'long is invalid'
-        return output
-    totalLongDegrees = degrees + util.arcminToDegrees(minutes)
-
-    # altitude
-    try:
-        degreesAndMinutes = values['altitude'].split('d')
-        degrees = int(degreesAndMinutes[0])
-        # print('degrees', degrees)
-        minutesStr = degreesAndMinutes[1]
-        minutes = float(minutesStr)
-        # print('minutes', minutes)
-    except:
-        output['error'] = 'altitude is invalid'
-        return output
-    if degrees <= 0 or degrees >= 90:
-        # output['error'] = 'degrees must be an integer (0, 90)'
-        output['error'] = 'altitude is invalid'
-        return output
-    if minutesStr[::-1].find('.') is not 1:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'altitude is invalid'
-        return output
-    if minutes < 0.0 or minutes >= 60.0:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'altitude is invalid'
-        return output
-    if degrees == 0 and minutes == 0.1:
-        # output['error'] = 'can\'t be less than 0d0.1'
-        output['error'] = 'altitude is invalid'
-        return output
-    totalAltitudeDegrees = degrees + util.arcminToDegrees(minutes)
-
-    # assumed lat
-    try:
-        degreesAndMinutes = values['assumedLat'].split('d')
-        degrees = int(degreesAndMinutes[0])
-        # print('degrees', degrees)
-        minutesStr = degreesAndMinutes[1]
-        minutes = float(minutesStr)
-        # print('minutes', minutes)
-    except:
-        output['error'] = 'assumedLat is invalid'
-        return output
-    if degrees <= -90 or degrees >= 90:
-        # output['error'] = 'degrees must be an integer (-90, 90)'
-        output['error'] = 'assumedLat is invalid'
-        return output
-    if minutesStr[::-1].find('.') is not 1:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'assumedLat is invalid'
-        return output
-    if minutes < 0.0 or minutes >= 60.0:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'assumedLat is invalid'
-        return output
-    if degrees == 0 and minutes == 0.1:
-        # output['error'] = 'can\'t be less than 0d0.1'
-        output['error'] = 'assumedLat is invalid'
-        return output
-    if degrees >= 0:
-        totalAssumedLatDegrees = degrees + util.arcminToDegrees(minutes)
-    else:
-        totalAssumedLatDegrees = degrees - util.arcminToDegrees(minutes)
+        return None, 'correctedAzimuth already exists'
+    fields = {}
+    for key, minDegrees, maxDegrees in ANGLES:
+        angle = fields[key] = util.parseAngle(values[key], minDegrees, maxDegrees)
+        if angle is None:
+            return None, key + ' is invalid'
+    method = fields['method'] = values.get('method', 'direct')
+    if method not in METHODS:
+        return None, 'method is invalid'
+    return fields, None
 
-    # assumedLong
-    try:
-        degreesAndMinutes = values['assumedLong'].split('d')
-        degrees = int(degreesAndMinutes[0])
-        # print('degrees', degrees)
-        minutesStr = degreesAndMinutes[1]
-        minutes = float(minutesStr)
-        # print('minutes', minutes)
-    except:
-        output['error'] = 'assumedLong is invalid'
-        return output
-    if degrees < 0 or degrees >= 360:
-        # output['error'] = 'degrees must be an integer [0, 360)'
-        output['error'] = 'assumedLong is invalid'
-        return output
-    if minutesStr[::-1].find('.') is not 1:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'assumedLong is invalid'
-        return output
-    if minutes < 0.0 or minutes >= 60.0:
-        # output['error'] = 'minutes must be a float with a mandatory decimal [0.0, 60.0)'
-        output['error'] = 'assumedLong is invalid'
-        return output
-    if degrees == 0 and minutes == 0.1:
-        # output['error'] = 'can\'t be less than 0d0.1'
-        output['error'] = 'assumedLong is invalid'
-        return output
-    totalAssumedLongDegrees = degrees + util.arcminToDegrees(minutes)
-
-    LHA = totalLongDegrees + totalAssumedLongDegrees
-    # print('LHA', util.formatAndNormalizeAlt(LHA))
-    intermediateDistance = (math.sin(math.radians(totalLatDegrees)) * math.sin(math.radians(totalAssumedLatDegrees))) + (math.cos(math.radians(totalLatDegrees)) * math.cos(math.radians(totalAssumedLatDegrees)) * math.cos(math.radians(LHA)))
-    # print('intermediateDistance', intermediateDistance)
-    # print('sin(lat)', round(math.sin(math.radians(totalLatDegrees)), 3))
-    # print('sin(assumedLat)', round(math.sin(math.radians(totalAssumedLatDegrees)), 3))
-    # print('cos(lat)', round(math.cos(math.radians(totalLatDegrees)), 3))
-    # print('cos(assumedLat)', round(math.cos(math.radians(totalAssumedLatDegrees)), 3))
-    # print('cos(LHA)', round(math.cos(math.radians(LHA)), 3))
-    correctedAltitude = math.asin(intermediateDistance)
-    # print('correctedAltitude', correctedAltitude)
-    correctedDistance = str(int(round(util.degreesToArcmin(totalAltitudeDegrees - math.degrees(correctedAltitude)), 0)))
-    correctedAzimuth = util.formatAndNormalizeAlt(math.degrees(math.acos((math.sin(math.radians(totalLatDegrees)) - (math.sin(math.radians(totalAssumedLatDegrees)) * intermediateDistance))/(math.cos(math.radians(totalAssumedLatDegrees)) * math.cos(math.asin(intermediateDistance))))))
-    # print('sin(lat)', math.sin(math.radians(totalLatDegrees)))
-    # print(math.sin(math.radians(totalAssumedLatDegrees)))
-    #
-    # print(correctedDistance)
-    # print(correctedAzimuth)
+def correct(values):
+    return util.Overlay(values, _compute(values))
+
+# distinct requests from one assumed position from which correctBatch reduces
+# them together with vector.correct; below this the scalar path is as fast and a
+# small batch need not import NumPy
+NUMPY_BATCH = 128
+
+def correctBatch(valuesList):
+    return util.memoizeBatch(valuesList, FIELDS, _compute, _computeMany)
+
+def _computeMany(valuesList):
+    # _compute over distinct requests. Direct reductions with every angle a string
+    # go through vector.correct, one call per assumed position; any it rejects, and
+    # all the others, go through _compute, which reports the same first error the
+    # request alone would
+    positions = {}
+    for index, values in enumerate(valuesList):
+        if 'correctedDistance' in values or 'correctedAzimuth' in values:
+            continue
+        if values.get('method', 'direct') != 'direct':
+            continue
+        try:
+            if not all(isinstance(values[key], str) for key in ('lat', 'long', 'altitude')):
+                continue
+            position = (values['assumedLat'], values['assumedLong'])
+        except KeyError:
+            continue
+        if isinstance(position[0], str) and isinstance(position[1], str):
+            positions.setdefault(position, []).append(index)
+
+    groups = [(position, indexes) for position, indexes in positions.items() if len(indexes) >= NUMPY_BATCH]
+    if not groups:
+        return [_compute(values) for values in valuesList]
+
+    import numpy as np
+    import vector
+
+    outputs = [None] * len(valuesList)
+    for (assumedLat, assumedLong), indexes in groups:
+        # the assumed position once, as _compute parses it
+        assumedLat = util.parseAngle(assumedLat, -89, 90)
+        assumedLong = util.parseAngle(assumedLong, 0, 360)
+        if assumedLat is None or assumedLong is None:
+            continue
+        rows = [valuesList[index] for index in indexes]
+        distance, azimuth, errors = vector.correct([values['lat'] for values in rows], [values['long'] for values in rows],
+                                                   [values['altitude'] for values in rows], assumedLat, assumedLong)
+        valid = errors == 0
+        # whole arcminutes, rounded half to even as round() does
+        distances = iter(np.rint(distance[valid]).astype(np.int64).astype(str).tolist())
+        azimuths = iter(vector.formatAndNormalizeAlt(azimuth[valid]).tolist())
+        for index, rowValid in zip(indexes, valid.tolist()):
+            if rowValid:
+                outputs[index] = {'correctedDistance': next(distances), 'correctedAzimuth': next(azimuths)}
+    return [_compute(values) if output is None else output for values, output in zip(valuesList, outputs)]
+
+def correctCached(values, cache):
+    return cache.memoize(values, FIELDS, _compute)
+
+def _compute(values):
+    output = {}
+
+    fields, error = validate(values)
+    if error is not None:
+        output['error'] = error
+        return output
+
+    LHA = fields['long'] + fields['assumedLong']
+    reduced = None
+    if fields['method'] == 'table':
+        try:
+            table = reduction.defaultTable()
+        except (OSError, ValueError):
+            output['error'] = 'reduction table is unavailable'
+            return output
+        reduced = table.lookup(fields['assumedLat'], fields['lat'], LHA)
+    if reduced is None:
+        reduced = reduction.reduce(fields['assumedLat'], fields['lat'], LHA)
+    correctedAltitude, azimuth = reduced
+    correctedDistance = str(int(round(util.degreesToArcmin(fields['altitude'] - correctedAltitude), 0)))
+    correctedAzimuth = util.formatAndNormalizeAlt(azimuth)
 
     output['correctedDistance'] = correctedDistance
     output['correctedAzimuth'] = correctedAzimuth
@@ -1,7 +1,78 @@
-import math
-import adjust
-import predict
-import correct
+import time
+import importlib
+
+# op -> (module, function) that handles it. A module is imported the first time
+# one of its ops is dispatched, so a request loads only the modules it needs;
+# register adds an op without touching dispatch.
+ops = {
+    'adjust': ('adjust', 'adjust'),
+    'predict': ('predict', 'predict'),
+    'predictAll': ('predict', 'predictAll'),
+    'visible': ('sky', 'visible'),
+    'correct': ('correct', 'correct'),
+    'locate': ('locate', 'locate'),
+    'track': ('track', 'track'),
+    'sweep': ('sweep', 'sweep'),
+    'pipeline': ('pipeline', 'pipeline')
+}
+
+# ops whose modules can share parsing and computation across a whole batch
+batchOps = {
+    'adjust': ('adjust', 'adjustBatch'),
+    'predict': ('predict', 'predictBatch'),
+    'correct': ('correct', 'correctBatch')
+}
+
+# ops whose results a util.ResultCache can hold between requests
+cachedOps = {
+    'adjust': ('adjust', 'adjustCached'),
+    'predict': ('predict', 'predictCached'),
+    'correct': ('correct', 'correctCached')
+}
+
+# called as hook(op, seconds, requests) after each handler returns, e.g. an OpTimer
+hooks = []
+
+_handlers = {}
+
+def register(op, module, function, table=ops):
+    # table is ops, batchOps or cachedOps
+    table[op] = (module, function)
+
+def handler(entry):
+    # (module, function) -> the function, importing its module on first use
+    try:
+        return _handlers[entry]
+    except KeyError:
+        module, function = entry
+        _handlers[entry] = getattr(importlib.import_module(module), function)
+        return _handlers[entry]
+
+def _run(op, entry, requests, *args):
+    run = handler(entry)
+    if not hooks:
+        return run(*args)
+    start = time.perf_counter()
+    try:
+        return run(*args)
+    finally:
+        seconds = time.perf_counter() - start
+        for hook in hooks:
+            hook(op, seconds, requests)
+
+class OpTimer(object):
+    # a hook counting the requests each op handled and the seconds it took
+
+    def __init__(self):
+        self.counts = {}
+        self.seconds = {}
+
+    def __call__(self, op, seconds, requests):
+        self.counts[op] = self.counts.get(op, 0) + requests
+        self.seconds[op] = self.seconds.get(op, 0.0) + seconds
+
+    def stats(self):
+        return dict((op, {'count': self.counts[op], 'seconds': self.seconds[op]}) for op in self.counts)
 
 def dispatch(values=None):
 
@@ -15,19 +86,41 @@ def dispatch(values=None):
         return values
 
     #Perform designated function
-    if(values['op'] == 'adjust'):
-        return adjust.adjust(values)
-    elif(values['op'] == 'predict'):
-        return predict.predict(values)    #This calculation is stubbed out
-    elif(values['op'] == 'correct'):
-        return correct.correct(values)    #This calculation is stubbed out
-    elif(values['op'] == 'locate'):
-        return values    #This calculation is stubbed out
+    op = values['op']
+    if(isinstance(op, str) and op in ops):
+        return _run(op, ops[op], 1, values)
     else:
         values['error'] = 'op is not a legal operation'
         return values
 
+def dispatchCached(values=None, cache=None):
+    # dispatch, serving repeated adjust, predict and correct requests from cache
+    op = values.get('op') if isinstance(values, dict) else None
+    if(cache is not None and isinstance(op, str) and op in cachedOps):
+        return _run(op, cachedOps[op], 1, values, cache)
+    return dispatch(values)
 
+def dispatchBatch(valuesList=None):
 
+    #Validate parm
+    if(valuesList == None):
+        return {'error': 'parameter is missing'}
+    if(not(isinstance(valuesList, list))):
+        return {'error': 'parameter is not a list'}
 
+    #Group requests by op, keeping each one's position in the batch
+    results = [None] * len(valuesList)
+    groups = {}
+    for index, values in enumerate(valuesList):
+        op = values.get('op') if isinstance(values, dict) else None
+        if(isinstance(op, str) and op in batchOps):
+            groups.setdefault(op, []).append(index)
+        else:
+            results[index] = dispatch(values)
 
+    #Run each group through its op's shared path
+    for op, indexes in groups.items():
+        outputs = _run(op, batchOps[op], len(indexes), [valuesList[index] for index in indexes])
+        for index, output in zip(indexes, outputs):
+            results[index] = output
+    return results
@@ -1,17 +1,108 @@
 import dispatch as dispatch
-import re
+import util
+import os
+
+# results kept across invocations of a warm container; RESULT_CACHE_SIZE=0 turns it off
+results = util.ResultCache(int(os.environ.get('RESULT_CACHE_SIZE', '1024')))
+
+# most requests one event may carry
+MAX_REQUESTS = 1000
 
 def lambda_handler(event, context):
+    # {'querystring': ...} -> one result; {'requests': [querystring or values, ...]} -> a result for each
+    if isinstance(event, dict) and 'requests' in event:
+        return _handleRequests(event['requests'])
+    if not isinstance(event, dict) or 'querystring' not in event:
+        return {'error': 'querystring is missing'}
+    values, error = parseQuerystring(event['querystring'])
+    if error is not None:
+        return {'error': error}
+    return _dispatch(values)
+
+def _dispatch(values):
     try:
-        if('querystring' in event):
-            eventParms = event['querystring'].strip('{}').replace(',',' ')
-            eventDict = dict(re.findall(r'(\S+)=(".*?"|\S+)', eventParms))
-            returnValue = dispatch.dispatch(eventDict)
-            return returnValue
+        return dispatch.dispatchCached(values, results)
+    except Exception:
+        return {'error': 'op failed'}
+
+def _handleRequests(requests):
+    # a failed request gets its error in its own place and the others still run
+    if not isinstance(requests, list):
+        return {'error': 'requests is invalid'}
+    if len(requests) > MAX_REQUESTS:
+        return {'error': 'requests are too many'}
+
+    outputs = [None] * len(requests)
+    indexes, valuesList = [], []
+    for index, request in enumerate(requests):
+        if isinstance(request, str):
+            values, error = parseQuerystring(request)
+            if error is not None:
+                outputs[index] = {'error': error}
+                continue
+        elif isinstance(request, dict):
+            values = request
         else:
-            return u"None\n"
-    except:
-        return u"None\n"
+            outputs[index] = {'error': 'request is invalid'}
+            continue
+        indexes.append(index)
+        valuesList.append(values)
+
+    # one batch shares parsing across requests; if any op raises, each request
+    # runs again on its own so only the one that failed reports it
+    try:
+        dispatched = dispatch.dispatchBatch(valuesList)
+    except Exception:
+        dispatched = [_dispatch(values) for values in valuesList]
+    for index, output in zip(indexes, dispatched):
+        outputs[index] = output
+    return outputs
+
+def parseQuerystring(querystring):
+    # '{key=value, key="value, with spaces"}', as $input.params().querystring renders
+    # the request -> (values, None) or (None, error). Fields are separated by commas
+    # or spaces; a quoted value keeps its commas and spaces and loses its quotes.
+    # Each stretch between quotes is split once, by str methods rather than a regex.
+    if not isinstance(querystring, str):
+        return None, 'querystring is invalid'
+    text = querystring.strip('{}')
+    values = {}
+    start = 0
+    while True:
+        quote = text.find('"', start)
+        plain = text[start:] if quote < 0 else text[start:quote]
+        fields = plain.replace(',', ' ').split()
+        quotedKey = None
+        if quote >= 0:
+            # the field the quoted value belongs to ends the stretch, as 'key='
+            if not fields or plain[-1] != '=':
+                return None, 'querystring has a quote outside a value'
+            quotedKey = fields.pop()[:-1]
+        for field in fields:
+            key, equals, value = field.partition('=')
+            if key and value and '=' not in value:
+                values[key] = value
+                continue
+            # split at the last '=' that leaves both sides non-empty, as the regex
+            # this replaced did: 'b.==db' is b.= set to db and 'a=b=' is a set to b=
+            equals = field.rfind('=', 1, len(field) - 1)
+            if equals < 0:
+                if field[0] == '=' and '=' not in field[1:]:
+                    return None, 'querystring has a value without a field'
+                return None, 'querystring has a field without a value'
+            values[field[:equals]] = field[equals + 1:]
+        if quote < 0:
+            return values, None
+
+        end = text.find('"', quote + 1)
+        if end < 0:
+            return None, 'querystring has an unterminated quote'
+        if not quotedKey:
+            return None, 'querystring has a value without a field'
+        values[quotedKey] = text[quote + 1:end]
+        start = end + 1
+        if start < len(text) and text[start] != ',' and not text[start].isspace():
+            return None, 'querystring has a quote outside a value'
 
 
 '''
@@ -0,0 +1,122 @@
+import math
+import util
+import reduction
+
+# input keys that determine the keys locate adds to its output
+FIELDS = ('presentLat', 'presentLong', 'assumedLat', 'assumedLong', 'corrections')
+
+# sightings from which solveFix uses NumPy: below this the pure-Python solve is
+# as fast and a cold start need not import NumPy, above it NumPy's is several times
+# faster (3,000 sightings well under a millisecond)
+NUMPY_SIGHTINGS = 16
+
+def locate(values):
+    output = values.copy()
+    output.update(_compute(values))
+    return output
+
+def _compute(values):
+    output = {}
+
+    if 'presentLat' in values or 'presentLong' in values:
+        output['error'] = 'presentLat or presentLong already exists in the input'
+        return output
+
+    if 'assumedLat' not in values or 'assumedLong' not in values or 'corrections' not in values:
+        output['error'] = 'mandatory information is missing'
+        return output
+
+    assumedLat = util.parseAngle(values['assumedLat'], -89, 90)
+    if assumedLat is None:
+        output['error'] = 'assumedLat is invalid'
+        return output
+    assumedLong = util.parseAngle(values['assumedLong'], 0, 360)
+    if assumedLong is None:
+        output['error'] = 'assumedLong is invalid'
+        return output
+
+    # corrections: correct's output for each sighting, reduced from this assumed position
+    distances, azimuths = _parseCorrections(values['corrections'], assumedLong)
+    if distances is None:
+        output['error'] = 'corrections is invalid'
+        return output
+
+    fix = solveFix(distances, azimuths)
+    if fix is None:
+        output['error'] = 'corrections are insufficient'
+        return output
+    north, east, precision = fix
+
+    presentLat, presentLong = presentPosition(assumedLat, assumedLong, north, east)
+    output['presentLat'] = util.formatAlt(presentLat)
+    output['presentLong'] = util.formatAndNormalizeAlt(presentLong % 360.0)
+    output['precision'] = str(int(round(precision)))
+    return output
+
+def solveFix(distances, azimuths):
+    # least-squares offset from the assumed position that best satisfies every line of
+    # position: distances in arcminutes (nautical miles) toward azimuths in degrees
+    # -> (north, east, RMS residual), all in nautical miles, or None when the lines
+    # do not cross (fewer than two, or all parallel)
+    if len(distances) >= NUMPY_SIGHTINGS:
+        return _solveFixNumpy(distances, azimuths)
+    cosines = [math.cos(math.radians(azimuth)) for azimuth in azimuths]
+    sines = [math.sin(math.radians(azimuth)) for azimuth in azimuths]
+    # normal equations of the 2-column system [cos Z, sin Z] x = d
+    nn = _dot(cosines, cosines)
+    ne = _dot(cosines, sines)
+    ee = _dot(sines, sines)
+    bn = _dot(cosines, distances)
+    be = _dot(sines, distances)
+    determinant = nn * ee - ne * ne
+    if len(distances) < 2 or determinant <= 1e-9 * len(distances) ** 2:
+        return None
+    north = (ee * bn - ne * be) / determinant
+    east = (nn * be - ne * bn) / determinant
+    residuals = [cosine * north + sine * east - distance for cosine, sine, distance in zip(cosines, sines, distances)]
+    return north, east, math.sqrt(_dot(residuals, residuals) / len(distances))
+
+def _dot(first, second):
+    return math.fsum(a * b for a, b in zip(first, second))
+
+def _solveFixNumpy(distances, azimuths):
+    import numpy as np
+
+    distances = np.asarray(distances, dtype=float)
+    azimuths = np.radians(azimuths)
+    cosines = np.cos(azimuths)
+    sines = np.sin(azimuths)
+    nn = np.dot(cosines, cosines)
+    ne = np.dot(cosines, sines)
+    ee = np.dot(sines, sines)
+    bn = np.dot(cosines, distances)
+    be = np.dot(sines, distances)
+    determinant = nn * ee - ne * ne
+    if determinant <= 1e-9 * len(distances) ** 2:
+        return None
+    north = (ee * bn - ne * be) / determinant
+    east = (nn * be - ne * bn) / determinant
+    residuals = cosines * north + sines * east - distances
+    return float(north), float(east), math.sqrt(np.dot(residuals, residuals) / len(distances))
+
+def presentPosition(assumedLat, assumedLong, north, east):
+    # the assumed position moved north and east nautical miles -> (lat, long) degrees
+    presentLat = assumedLat + util.arcminToDegrees(north)
+    return presentLat, assumedLong + util.arcminToDegrees(east) / math.cos(math.radians(presentLat))
+
+def _parseCorrections(corrections, assumedLong):
+    # [{'long': '95d41.6', 'correctedDistance': '104', 'correctedAzimuth': '0d36.8'}, ...]
+    # -> (distances, true bearings). correctedAzimuth is Z, 0..180 either side of the
+    # meridian, so each correction keeps the body's long (GHA) that correct reduced
+    # it with, and with assumedLong that gives the LHA that says which side it is on
+    if not isinstance(corrections, list):
+        return None, None
+    try:
+        distances = [float(int(correction['correctedDistance'])) for correction in corrections]
+        azimuths = [util.parseAzimuth(correction['correctedAzimuth']) for correction in corrections]
+        longs = [util.parseAngle(correction['long'], 0, 360) for correction in corrections]
+    except (KeyError, TypeError, ValueError):
+        return None, None
+    if None in azimuths or None in longs:
+        return None, None
+    return distances, [reduction.bearing(azimuth, long + assumedLong) for azimuth, long in zip(azimuths, longs)]
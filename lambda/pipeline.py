@@ -0,0 +1,97 @@
+import util
+import adjust
+import predict
+import catalog
+import reduction
+import locate
+
+# adjust -> predict -> correct -> locate in one request. Each sighting's altitude,
+# star position and line of position stay in degrees from one step to the next;
+# only the fix is formatted, where chaining the ops would format and re-parse
+# every intermediate angle.
+
+def pipeline(values):
+    output = values.copy()
+    output.update(_compute(values))
+    return output
+
+def _compute(values):
+    output = {}
+
+    if 'presentLat' in values or 'presentLong' in values:
+        output['error'] = 'presentLat or presentLong already exists in the input'
+        return output
+
+    if 'assumedLat' not in values or 'assumedLong' not in values or 'sightings' not in values:
+        output['error'] = 'mandatory information is missing'
+        return output
+
+    assumedLat = util.parseAngle(values['assumedLat'], -89, 90)
+    if assumedLat is None:
+        output['error'] = 'assumedLat is invalid'
+        return output
+    assumedLong = util.parseAngle(values['assumedLong'], 0, 360)
+    if assumedLong is None:
+        output['error'] = 'assumedLong is invalid'
+        return output
+
+    # sightings: one dict per sight with adjust's and predict's inputs
+    sightings = values['sightings']
+    if not isinstance(sightings, list):
+        output['error'] = 'sightings is invalid'
+        return output
+
+    distances, azimuths = [], []
+    ariesCache = {}
+    for sighting in sightings:
+        if not isinstance(sighting, dict):
+            output['error'] = 'sightings is invalid'
+            return output
+
+        # adjust
+        altitude, error = adjust.altitudeFromValues(sighting)
+        if error is not None:
+            output['error'] = error
+            return output
+        # correct takes altitudes in [1, 90) degrees
+        if altitude < 1.0 or altitude >= 90.0:
+            output['error'] = 'altitude is invalid'
+            return output
+
+        # predict
+        if 'body' not in sighting:
+            output['error'] = 'mandatory information is missing'
+            return output
+        key = (sighting.get('date'), sighting.get('time'))
+        try:
+            ghaAries, error = ariesCache[key]
+        except KeyError:
+            ghaAries, error = ariesCache[key] = predict.ghaAriesFromValues(sighting)
+        except TypeError:
+            ghaAries, error = predict.ghaAriesFromValues(sighting)
+        if error is not None:
+            output['error'] = error
+            return output
+        star = catalog.find(sighting['body'])
+        if star is None:
+            output['error'] = 'star not in catalog'
+            return output
+
+        # correct; locate takes the true bearing, not Z
+        LHA = ghaAries + catalog.sha[star] + assumedLong
+        hc, azimuth = reduction.reduce(assumedLat, catalog.dec[star], LHA)
+        distances.append(util.degreesToArcmin(altitude - hc))
+        azimuths.append(reduction.bearing(azimuth, LHA))
+
+    # locate
+    fix = locate.solveFix(distances, azimuths)
+    if fix is None:
+        output['error'] = 'sightings are insufficient'
+        return output
+    north, east, precision = fix
+
+    presentLat, presentLong = locate.presentPosition(assumedLat, assumedLong, north, east)
+    output['presentLat'] = util.formatAlt(presentLat)
+    output['presentLong'] = util.formatAndNormalizeAlt(presentLong % 360.0)
+    output['precision'] = str(int(round(precision)))
+    return output
@@ -1,176 +1,210 @@
 import math
-import datetime
+import functools
 import util
+import schema
+import catalog
 
-stars = {
-    'Alpheratz': '357d41.7,29d10.9',
-    'Ankaa': '353d14.1,-42d13.4',
-    'Schedar': '349d38.4,56d37.7',
-    'Diphda':'348d54.1,-17d54.1',
-    'Achernar':	'335d25.5,-57d09.7',
-    'Hamal': '327d58.7,23d32.3',
-    'Polaris':'316d41.3,89d20.1',
-    'Akamar':'315d16.8,-40d14.8',
-    'Menkar':'314d13.0,4d09.0',
-    'Mirfak':'308d37.4,49d55.1',
-    'Aldebaran':	'290d47.1,16d32.3',
-    'Rigel':	'281d10.1,-8d11.3',
-    'Capella':	'280d31.4,46d00.7',
-    'Bellatrix':	'278d29.8,6d21.6',
-    'Elnath':	'278d10.1,28d37.1',
-    'Alnilam':	'275d44.3,-1d11.8',
-    'Betelgeuse':'270d59.1,7d24.3',
-    'Canopus':	'263d54.8,-52d42.5',
-    'Sirius':	'258d31.7,-16d44.3',
-    'Adara':	'255d10.8,-28d59.9',
-    'Procyon':	'244d57.5,5d10.9',
-    'Pollux':	'243d25.2,27d59.0',
-    'Avior':	'234d16.6,-59d33.7',
-    'Suhail':'222d50.7,-43d29.8',
-    'Miaplacidus':	'221d38.4,-69d46.9',
-    'Alphard':	'217d54.1,-8d43.8',
-    'Regulus':	'207d41.4,11d53.2',
-    'Dubhe':	'193d49.4,61d39.5',
-    'Denebola':	'182d31.8,14d28.9',
-    'Gienah':	'175d50.4,-17d37.7',
-    'Acrux':	'173d07.2,-63d10.9',
-    'Gacrux':	'171d58.8,-57d11.9',
-    'Alioth':'166d19.4,55d52.1',
-    'Spica':	'158d29.5,-11d14.5',
-    'Alcaid':	'152d57.8,49d13.8',
-    'Hadar':	'148d45.5,-60d26.6',
-    'Menkent':'148d05.6,-36d26.6',
-    'Arcturus':	'145d54.2,19d06.2',
-    'Rigil Kent.':'139d49.6,-60d53.6',
-    'Zubenelg.':	'137d03.7,-16d06.3',
-    'Kochab':	'137d21.0,74d05.2',
-    'Alphecca':'126d09.9,26d39.7',
-    'Antares':	'112d24.4,-26d27.8',
-    'Atria':	'107d25.2,-69d03.0',
-    'Sabik':	'102d10.9,-15d44.4',
-    'Shaula'	:'96d20.0,-37d06.6',
-    'Rasalhague':	'96d05.2,12d33.1',
-    'Etamin'	:'90d45.9,51d29.3',
-    'Kaus Aust.':	'83d41.9,-34d22.4',
-    'Vega'	:'80d38.2,38d48.1',
-    'Nunki'	:'75d56.6,-26d16.4',
-    'Altair'	:'62d06.9,8d54.8',
-    'Peacock'	:'53d17.2,-56d41.0',
-    'Deneb'	:'49d30.7,45d20.5',
-    'Enif'	:'33d45.7,9d57.0',
-    'Alnair'	:'27d42.0,-46d53.1',
-    'Fomalhaut'	:'15d22.4,-29d32.3',
-    'Scheat'	:'13d51.8,28d10.3',
-    'Markab'	:'13d36.7,15d17.6'
-}
+# input keys that determine the keys predict adds to its output
+FIELDS = ('lat', 'long', 'body', 'date', 'time', 'times', 'start', 'end', 'step')
+
+# longest series a single request may ask for
+MAX_SERIES = 100000
+
+SCHEMA = schema.build(
+    schema.absent('lat', 'lat or long already exists in the input'),
+    schema.absent('long', 'lat or long already exists in the input'),
+    schema.required('body'))
 
 def predict(values):
-    output = values.copy()
+    return util.Overlay(values, _compute(values))
 
-    if 'lat' in values or 'long' in values:
-        output['error'] = 'lat or long already exists in the input'
-        return output
+def predictBatch(valuesList):
+    # the date/time parse and GHA Aries are shared by every body observed at the
+    # same instant, and the catalog lookup by every request for the same body
+    ariesCache = {}
+    starCache = {}
+    return util.memoizeBatch(valuesList, FIELDS, lambda values: _compute(values, ariesCache, starCache))
 
-    # body
-    if 'body' not in values:
-        output['error'] = 'mandatory information is missing'
+def predictCached(values, cache):
+    return cache.memoize(values, FIELDS, _compute)
+
+def _compute(values, ariesCache=None, starCache=None):
+    output = {}
+
+    fields, error = SCHEMA(values)
+    if error is not None:
+        output['error'] = error
         return output
 
     # if not isinstance(values['body'], str):
     #         output['error'] = 'body is invalid'
     #         return output
 
-    # date (this will default to the correct time also)
-    # Always use actual types within code; use the correct format to output
-    dateAndTime = datetime.datetime.strptime('2001-01-01', '%Y-%m-%d')
+    # series mode: one body at many instants
+    if 'times' in values or 'start' in values:
+        return _computeSeries(values)
 
-    if 'date' in values:
-        # if not isinstance(values['date'], str):
-        #     output['error'] = 'date is invalid'
-        #     return output
+    if ariesCache is None:
+        totalGHA, error = ghaAriesFromValues(values)
+    else:
+        key = (values.get('date'), values.get('time'))
+        try:
+            totalGHA, error = ariesCache[key]
+        except KeyError:
+            totalGHA, error = ariesCache[key] = ghaAriesFromValues(values)
+        except TypeError:
+            totalGHA, error = ghaAriesFromValues(values)
+    if error is not None:
+        output['error'] = error
+        return output
 
+    # lat, sha
+    if starCache is None:
+        star = _findStar(values['body'])
+    else:
+        body = values['body']
         try:
-            date = values['date'].split('-')
-
-            if len(date) != 3:
-                output['error'] = 'date is invalid'
-                return output
-
-            # validate year (length of 4)
-            year = date[0]
-            if len(year) is not 4 or int(year) < 2001:
-                output['error'] = 'date is invalid'
-                return output
-
-            # validate month (no need to check if valid month - strptime does it)
-            month = date[1]
-            if len(month) is not 2:
-                output['error'] = 'date is invalid'
-                return output
-
-            # validate day
-            day = date[2]
-            if len(day) is not 2:
-                output['error'] = 'date is invalid'
-                return output
-
-            dateAndTime = datetime.datetime.strptime(values['date'], '%Y-%m-%d')
-        except ValueError:
-            output['error'] = 'date is invalid'
-            return output
+            star = starCache[body]
+        except KeyError:
+            star = starCache[body] = _findStar(body)
+        except TypeError:
+            star = _findStar(body)
+    if star is None:
+        output['error'] = 'star not in catalog'
+        return output
+    lat, sha = star
+
+    # star's GHA
+    ghaStar = totalGHA + sha
+    ghaStar = util.formatAndNormalizeAlt(ghaStar)
+    # print('ghaStar', ghaStar)
+
+    output['lat'] = lat
+    output['long'] = ghaStar
+
+    return output
+
+def _findStar(body):
+    # -> the star's (declination text, SHA degrees), or None if it is not in the catalog
+    star = catalog.find(body)
+    if star is None:
+        return None
+    return catalog.decText[star], catalog.sha[star]
+
+def predictAll(values):
+    output = values.copy()
+    output.update(_computeAll(values))
+    return output
 
-    # time
-    if 'time' in values:
-        # if not isinstance(values['time'], str):
-        #     output['error'] = 'time is invalid'
-        #     return output
+def _computeAll(values):
+    import vector
 
+    output = {}
+
+    if 'stars' in values:
+        output['error'] = 'stars already exists in the input'
+        return output
+
+    # the Aries angle is shared by every star in the catalog
+    totalGHA, error = ghaAriesFromValues(values)
+    if error is not None:
+        output['error'] = error
+        return output
+
+    names, lats, longs = vector.predictAll(totalGHA)
+    longs = vector.formatAndNormalizeAlt(longs).tolist()
+    output['stars'] = dict((name, {'lat': lat, 'long': long}) for name, lat, long in zip(names, lats, longs))
+    return output
+
+def _computeSeries(values):
+    import vector
+
+    output = {}
+    if 'times' in values:
         try:
-            time = values['time'].split(':')
-
-            if len(time) != 3:
-                output['error'] = 'time is invalid'
-                return output
-
-            # validate hour (length of 2)
-            hour = time[0]
-            if len(hour) is not 2:
-                output['error'] = 'time is invalid'
-                return output
-
-            # validate min
-            min = time[1]
-            if len(min) is not 2:
-                output['error'] = 'time is invalid'
-                return output
-
-            # validate sec
-            sec = time[2]
-            if len(sec) is not 2:
-                output['error'] = 'time is invalid'
-                return output
-
-            dateAndTime = dateAndTime.replace(hour=int(hour), minute=int(min), second=int(sec))
-        except ValueError:
-            output['error'] = 'time is invalid'
+            times = vector.parseTimes(values['times'])
+        except (ValueError, TypeError):
+            output['error'] = 'times is invalid'
+            return output
+    else:
+        times, error = _parseRange(values, vector)
+        if error is not None:
+            output['error'] = error
             return output
+    if len(times) > MAX_SERIES:
+        output['error'] = 'series is too long'
+        return output
 
-    # lat, sha
-    star = values['body'][0].upper() + values['body'].lower()[1:]
-    if star not in stars:
+    lat, long, errors = vector.predict(values['body'], times)
+    if lat is None:
         output['error'] = 'star not in catalog'
         return output
-    lat = stars[star].split(',')[1]
-    sha = stars[star].split(',')[0]
+    if errors.any():
+        output['error'] = vector.PREDICT_ERRORS[errors.max()]
+        return output
 
-    # greenwich hour angle of aries
+    output['lat'] = lat
+    output['long'] = vector.formatAndNormalizeAlt(long).tolist()
+    return output
+
+def _parseRange(values, vector):
+    if 'end' not in values or 'step' not in values:
+        return None, 'mandatory information is missing'
+    try:
+        start = vector.parseTimes(values['start'])[0]
+    except (ValueError, TypeError):
+        return None, 'start is invalid'
+    try:
+        end = vector.parseTimes(values['end'])[0]
+    except (ValueError, TypeError):
+        return None, 'end is invalid'
+    try:
+        step = int(values['step'])
+    except (ValueError, TypeError, OverflowError):
+        return None, 'step is invalid'
+    if step <= 0:
+        return None, 'step is invalid'
+    if end < start:
+        return None, 'end is invalid'
+    if (end - start).astype(int) // step >= MAX_SERIES:
+        return None, 'series is too long'
+    # the end of the range is included when the steps land on it
+    return vector.timeRange(start, end, step), None
+
+def ghaAriesFromValues(values):
+    year, delta, error = parseDateAndTime(values)
+    if error is not None:
+        return None, error
+    return ghaAries(year, delta), None
+
+# date and time; a missing date is the start of 2001 and a missing time is midnight
+TIME_SCHEMA = schema.build(
+    schema.field('date', util.parseDate, default=(2001, 0)),
+    schema.check('date', lambda date: date[0] >= 2001, 'date is invalid'),
+    schema.field('time', util.parseTime, default=0))
+
+def parseDateAndTime(values):
+    # -> (year, seconds since the start of that year, error)
+    fields, error = TIME_SCHEMA(values)
+    if error is not None:
+        return None, None, error
+    year, day = fields['date']
+    return year, day * 86400 + fields['time'], None
+
+def ghaAries(year, delta):
+    # delta is seconds since the start of year
+    return ghaAriesBase(year) + rotation(delta)
+
+# one entry per year; predict requests cluster on a handful of recent years
+@functools.lru_cache(maxsize=512)
+def ghaAriesBase(year):
+    # greenwich hour angle of aries at the start of year
     ghaAries = util.degreesFromFormattedAlt('100d42.6')
-    refDateAndTime = datetime.datetime.strptime('2001', '%Y')
-    refYear = refDateAndTime.year
+    refYear = 2001
 
-    cumulativeProgression = (util.degreesFromFormattedAlt('-0d14.31667') * (dateAndTime.year - refYear))
+    cumulativeProgression = (util.degreesFromFormattedAlt('-0d14.31667') * (year - refYear))
     # print('cumulativeProgression', util.formatAlt(cumulativeProgression))
-    leapYears = util.numOfLeapYears(refYear, dateAndTime.year)
+    leapYears = util.numOfLeapYears(refYear, year)
     earthRotation = 86164.1
     earthClock = 86400
     earthDegrees = util.degreesFromFormattedAlt('360d0.00')
@@ -180,26 +214,14 @@ def predict(values):
 
     newGhaghaAries = ghaAries + cumulativeProgression + leapProgression
     # print('newGHA', util.formatAlt(newGhaghaAries))
+    return newGhaghaAries
 
-    # get dateAndTime - refDateAndTime in seconds
-    delta = (dateAndTime-datetime.datetime.strptime(str(dateAndTime.year), '%Y')).total_seconds()
-    # print('delta', delta)
+def rotation(delta):
+    # earth's rotation (degrees) delta seconds into the year
     # rotation = earthRotation / delta * degreesFromFormattedAlt('360d0.00')
     rotation = delta / 86164.1 * util.degreesFromFormattedAlt('360d0.00')
     # print('rotation', util.formatAndNormalizeAlt(rotation))
-
-    totalGHA = newGhaghaAries + rotation
-    # print('final gha of aries', util.formatAndNormalizeAlt(totalGHA))
-
-    # star's GHA
-    ghaStar = totalGHA + util.degreesFromFormattedAlt(sha)
-    ghaStar = util.formatAndNormalizeAlt(ghaStar)
-    # print('ghaStar', ghaStar)
-
-    output['lat'] = lat
-    output['long'] = ghaStar
-
-    return output
+    return rotation
 
 
 # input = {
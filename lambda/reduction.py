@@ -0,0 +1,127 @@
+import os
+import sys
+import math
+import mmap
+import struct
+
+# Sight reduction tables in the style of HO-229: computed altitude (Hc) and
+# azimuth (Z) tabulated by the assumed latitude, the declination and the LHA,
+# written once by scripts/compileReduction.py and memory-mapped for lookups
+# that interpolate between the eight surrounding entries. Layout, little-endian:
+#
+#   header   magic, step in degrees, latitude/declination/LHA counts   HEADER_SIZE bytes
+#   hc       float32[latitudes][declinations][LHAs], degrees
+#   z        float32[latitudes][declinations][LHAs], degrees
+#
+# Only latitudes 0..90 and LHAs 0..180 are stored: a southern latitude is the
+# northern one with the declination negated and Z taken from 180, and Hc and Z
+# (correct's azimuth runs 0..180 either side of the meridian) repeat in 360 - LHA.
+
+MAGIC = b'CSSERED1'
+HEADER = '<8sdIII'
+HEADER_SIZE = 32
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reduction.tab')
+DEFAULT_STEP = 1.0
+
+# above this altitude the interpolated azimuth degrades quickly toward the
+# zenith, so lookups there return None and the caller reduces directly
+MAX_ALTITUDE = 80.0
+
+class Table(object):
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise ValueError('reduction tables can only be mapped on little-endian hosts')
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, step, latCount, decCount, lhaCount = struct.unpack_from(HEADER, self._map)
+        if magic != MAGIC:
+            raise ValueError('%s is not a reduction table' % path)
+        self.step = step
+        self.shape = (latCount, decCount, lhaCount)
+        cells = latCount * decCount * lhaCount
+        view = memoryview(self._map)
+        self.hc = view[HEADER_SIZE:HEADER_SIZE + 4 * cells].cast('f')
+        self.z = view[HEADER_SIZE + 4 * cells:HEADER_SIZE + 8 * cells].cast('f')
+
+    def lookup(self, lat, dec, lha):
+        # degrees -> (Hc, Z) in degrees, or None outside the table's reliable range
+        south = lat < 0
+        if south:
+            lat, dec = -lat, -dec
+        lha = lha % 360.0
+        if lha > 180.0:
+            lha = 360.0 - lha
+        latCount, decCount, lhaCount = self.shape
+        fi, fj, fk = lat / self.step, (dec + 90.0) / self.step, lha / self.step
+        i, j, k = int(fi), min(int(fj), decCount - 2), min(int(fk), lhaCount - 2)
+        # the last latitude row is the pole, where Z is undefined
+        if i >= latCount - 2 or j < 0:
+            return None
+        a, b, c = fi - i, fj - j, fk - k
+
+        # the eight entries around the point, weighted by their opposite volumes
+        base = (i * decCount + j) * lhaCount + k
+        hc = z = 0.0
+        for offset, weight in ((0, (1 - a) * (1 - b)), (lhaCount, (1 - a) * b),
+                               (decCount * lhaCount, a * (1 - b)), ((decCount + 1) * lhaCount, a * b)):
+            corner = base + offset
+            hc += weight * ((1 - c) * self.hc[corner] + c * self.hc[corner + 1])
+            z += weight * ((1 - c) * self.z[corner] + c * self.z[corner + 1])
+        if abs(hc) > MAX_ALTITUDE or z != z:
+            return None
+        if south:
+            z = 180.0 - z
+        return hc, z
+
+def reduce(lat, dec, lha):
+    # the direct reduction correct performs: assumed latitude, declination and
+    # LHA in degrees -> (Hc, Z) in degrees, Z from 0 to 180 either side of the meridian
+    sinLat, cosLat = math.sin(math.radians(lat)), math.cos(math.radians(lat))
+    sinDec = math.sin(math.radians(dec))
+    intermediateDistance = sinDec * sinLat + math.cos(math.radians(dec)) * cosLat * math.cos(math.radians(lha))
+    hc = math.asin(intermediateDistance)
+    return math.degrees(hc), math.degrees(math.acos((sinDec - sinLat * intermediateDistance) / (cosLat * math.cos(hc))))
+
+def bearing(z, lha):
+    # Z from reduce (or correct's correctedAzimuth) and the LHA it was reduced at
+    # -> the true bearing Zn from 0 to 360: a body is east of the meridian while its
+    # LHA is past 180 and west of it before, where Z is measured the other way
+    if lha % 360.0 > 180.0:
+        return z
+    return (360.0 - z) % 360.0
+
+def writeTable(path, step=DEFAULT_STEP):
+    # tabulates Hc and Z every step degrees; step must divide 90
+    import numpy as np
+
+    if step <= 0 or abs(90.0 / step - round(90.0 / step)) > 1e-9:
+        raise ValueError('step must divide 90 degrees')
+    latCount = int(round(90.0 / step)) + 1
+    decCount = lhaCount = 2 * latCount - 1
+    lat = np.radians(np.arange(latCount) * step)[:, np.newaxis, np.newaxis]
+    dec = np.radians(np.arange(decCount) * step - 90.0)[np.newaxis, :, np.newaxis]
+    lha = np.radians(np.arange(lhaCount) * step)
+    with np.errstate(all='ignore'):
+        intermediateDistance = np.clip(np.sin(dec) * np.sin(lat) + np.cos(dec) * np.cos(lat) * np.cos(lha), -1.0, 1.0)
+        hc = np.degrees(np.arcsin(intermediateDistance)).astype('<f4')
+        # NaN where Z is undefined: at the pole and at the zenith
+        z = np.degrees(np.arccos(np.clip((np.sin(dec) - np.sin(lat) * intermediateDistance)
+                                         / (np.cos(lat) * np.sqrt(1.0 - intermediateDistance * intermediateDistance)),
+                                         -1.0, 1.0)))
+    z[~np.isfinite(z)] = np.nan
+    z[latCount - 1] = np.nan
+    with open(path, 'wb') as file:
+        file.write(struct.pack(HEADER, MAGIC, step, latCount, decCount, lhaCount).ljust(HEADER_SIZE, b'\0'))
+        file.write(hc.tobytes())
+        file.write(z.astype('<f4').tobytes())
+
+_defaultTable = None
+
+def defaultTable():
+    # mapped on first use; REDUCTION_TABLE points at a table built elsewhere
+    global _defaultTable
+    if _defaultTable is None:
+        _defaultTable = Table(os.environ.get('REDUCTION_TABLE', DEFAULT_PATH))
+    return _defaultTable
@@ -0,0 +1,136 @@
+import util
+
+# Declarative request validation. An op lists its rules once, at import:
+#
+#   SCHEMA = schema.build(
+#       schema.absent('altitude', 'altitude already exists in the input'),
+#       schema.required('observation'),
+#       schema.field('observation', schema.angle(0, 90)),
+#       schema.field('height', schema.number(float), default=0.0),
+#       schema.check('height', lambda height: height >= 0, 'height must be greater than 0'))
+#
+# and SCHEMA(values) applies them in order -> (parsed fields, None), or
+# (None, error) for the first rule that fails. Every field is parsed exactly
+# once and the op computes from the parsed values. A field parser takes the
+# raw value and returns the parsed one, or None when it is invalid, which
+# reports '<key> is invalid'.
+#
+# build turns each rule into a small function of (values, fields) that parses
+# into fields and returns an error, or None to go on to the next rule. That is a
+# call per rule, so adjust and correct, which validate every request, write the
+# same checks out instead (scripts/benchValidation.py compares the two).
+
+MISSING = 'mandatory information is missing'
+
+def build(*rules):
+    steps = []
+    fields = set()
+    for rule in rules:
+        kind, key = rule[0], rule[1]
+        if kind == 'required':
+            steps.append(_required(key))
+        elif kind == 'absent':
+            steps.append(_absent(key, rule[2]))
+        elif kind == 'field':
+            fields.add(key)
+            steps.append(_field(key, rule[2], rule[3]))
+        elif kind == 'check':
+            if key not in fields:
+                raise ValueError('check on %s comes before its field' % key)
+            steps.append(_check(key, rule[2], rule[3]))
+        else:
+            raise ValueError('unknown rule %r' % (kind,))
+    steps = tuple(steps)
+
+    def validate(values):
+        fields = {}
+        for step in steps:
+            error = step(values, fields)
+            if error is not None:
+                return None, error
+        return fields, None
+    return validate
+
+def _required(keys):
+    def step(values, fields):
+        for key in keys:
+            if key not in values:
+                return MISSING
+    return step
+
+def _absent(key, error):
+    def step(values, fields):
+        if key in values:
+            return error
+    return step
+
+def _field(key, parse, default):
+    invalid = key + ' is invalid'
+    def step(values, fields):
+        if key in values:
+            value = parse(values[key])
+            if value is None:
+                return invalid
+            fields[key] = value
+        else:
+            fields[key] = default
+    return step
+
+def _check(key, predicate, error):
+    def step(values, fields):
+        if not predicate(fields[key]):
+            return error
+    return step
+
+def required(*keys):
+    return ('required', keys)
+
+def absent(key, error):
+    # key is one the op adds to its output
+    return ('absent', key, error)
+
+def field(key, parse, default=None):
+    return ('field', key, parse, default)
+
+def check(key, predicate, error):
+    # a further condition on a field already parsed
+    return ('check', key, predicate, error)
+
+# field parsers
+
+def angle(minDegrees, maxDegrees):
+    # 'DdM.M' with minDegrees <= D < maxDegrees -> signed degrees
+    parseAngle = util.parseAngle
+    def parse(value):
+        return parseAngle(value, minDegrees, maxDegrees)
+    return parse
+
+def number(convert, minimum=None, maximum=None):
+    # anything convert (int or float) accepts, within [minimum, maximum] when given
+    def parse(value):
+        try:
+            value = convert(value)
+        except (TypeError, ValueError, OverflowError):
+            # OverflowError from int(float('inf')), as JSON's Infinity reads
+            return None
+        if minimum is not None and value < minimum:
+            return None
+        if maximum is not None and value > maximum:
+            return None
+        return value
+    return parse
+
+def choice(options, lower=False):
+    # one of options, compared in lower case when lower is set
+    options = frozenset(options)
+    def parse(value):
+        if lower:
+            try:
+                value = value.lower()
+            except AttributeError:
+                return None
+        try:
+            return value if value in options else None
+        except TypeError:
+            return None
+    return parse
@@ -0,0 +1,46 @@
+# dispatchBatch against a loop over dispatch on distinct requests.
+# Usage: python scripts/benchBatch.py [requests] [number]
+# Times adjust, correct and predict batches in which no two requests are alike,
+# so nothing is shared and the batch path has only its own work to win on:
+# adjust and correct through vector.adjust and vector.correct, predict through
+# the catalog lookups its bodies share. The parsed-angle cache is cleared before
+# each run, as angles a batch has not seen before would find it.
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import util
+import dispatch
+
+BODIES = ('Sirius', 'Vega', 'Altair', 'Deneb', 'Procyon', 'Betelgeuse', 'Rigel', 'Capella')
+
+def angle(degrees, index):
+    return '%dd%d.%d' % (degrees, index % 60, index // 60 % 10)
+
+def batches(requests):
+    adjust = [{'op': 'adjust', 'observation': angle(10 + index % 70, index), 'height': '%d.0' % (index % 30),
+               'temperature': str(40 + index % 50), 'horizon': ('natural', 'artificial')[index % 2]}
+              for index in range(requests)]
+    correct = [{'op': 'correct', 'lat': angle(index % 120 - 60, index), 'long': angle(index % 360, index // 7),
+                'altitude': angle(10 + index % 70, index // 3), 'assumedLat': '35d0.0', 'assumedLong': '74d0.0'}
+               for index in range(requests)]
+    predict = [{'op': 'predict', 'body': BODIES[index % len(BODIES)], 'date': '2016-01-%02d' % (1 + index % 28),
+                'time': '%02d:%02d:%02d' % (index // 3600 % 24, index // 60 % 60, index % 60)}
+               for index in range(requests)]
+    return (('adjust', adjust), ('correct', correct), ('predict', predict))
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for op, valuesList in batches(requests):
+        assert dispatch.dispatchBatch(valuesList) == [dispatch.dispatch(values) for values in valuesList]
+        loop = min(timeit.repeat(lambda: (util._parseTenths.cache_clear(), [dispatch.dispatch(values) for values in valuesList]),
+                                 number=number, repeat=5)) / number
+        batch = min(timeit.repeat(lambda: (util._parseTenths.cache_clear(), dispatch.dispatchBatch(valuesList)),
+                                  number=number, repeat=5)) / number
+        print('%-8s %d requests   loop %7.2f ms   batch %7.2f ms   %5.2fx'
+              % (op, requests, loop * 1e3, batch * 1e3, loop / batch))
+
+if __name__ == '__main__':
+    main()
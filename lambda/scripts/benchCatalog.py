@@ -0,0 +1,48 @@
+# Open time, memory and lookup cost of compiled star catalogs by size.
+# Usage: python scripts/benchCatalog.py [rows ...]
+# Builds synthetic catalogs of the given sizes (default 10000 and 100000) in a
+# temporary directory and reports them next to the bundled stars.cat.
+import os
+import sys
+import random
+import shutil
+import tempfile
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import catalog
+
+def syntheticRows(count):
+    random.seed(count)
+    for row in range(count):
+        sha = random.uniform(0, 360)
+        dec = random.uniform(-89.9, 89.9)
+        yield ('Star %06d' % row,
+               '%dd%.1f' % (int(sha), (sha - int(sha)) * 59.9),
+               '%s%dd%.1f' % ('-' if dec < 0 else '', int(abs(dec)), (abs(dec) - int(abs(dec))) * 59.9))
+
+def bench(path, name):
+    openTime = min(timeit.repeat(lambda: catalog.Catalog(path), number=100, repeat=5)) / 100
+    tracemalloc.start()
+    opened = catalog.Catalog(path)
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    findTime = min(timeit.repeat(lambda: opened.find(name), number=10000, repeat=5)) / 10000
+    print('%8d rows %10d bytes  open %7.1f us  %7d bytes allocated  find %5.2f us'
+          % (len(opened), os.path.getsize(path), openTime * 1e6, allocated, findTime * 1e6))
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000]
+    bench(catalog.DEFAULT_PATH, 'betelgeuse')
+    directory = tempfile.mkdtemp()
+    try:
+        for size in sizes:
+            path = os.path.join(directory, 'stars%d.cat' % size)
+            catalog.writeCatalog(syntheticRows(size), path)
+            bench(path, 'star %06d' % (size // 2))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
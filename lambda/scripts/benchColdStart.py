@@ -0,0 +1,115 @@
+# Cold start of the Lambda bundle: what a new container pays before its first answer.
+# Usage: python scripts/benchColdStart.py [repeats]
+# Starts a fresh interpreter per run, imports lambda_function and handles one
+# event, and reports the median wall time of each step along with what
+# python -X importtime attributes to the modules that import and that request load.
+# Each case runs against the bundle as source, with bytecode compiled, and as
+# buildBundle.py ships it: compiled, with NumPy installed in the bundle and no
+# site-packages to fall back on. All run on a file system that cannot cache
+# bytecode, as on Lambda. A case whose response carries an error fails the run.
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from buildBundle import stageBundle
+
+def querystring(text):
+    return {'querystring': '{%s}' % text}
+
+CASES = (
+    ('import only', None),
+    ('adjust', querystring('op=adjust, observation=30d1.5, height=19.0, horizon=artificial')),
+    ('predict', querystring('op=predict, body=Betelgeuse, date=2016-01-17, time=03:15:42')),
+    ('correct', querystring('op=correct, lat=16d32.3, long=95d41.6, altitude=13d42.3, assumedLat=-53d38.4, '
+                            'assumedLong=74d35.3')),
+    # a querystring cannot carry the corrections list, so this one is a requests event
+    ('locate', {'requests': [{'op': 'locate', 'assumedLat': '35d59.7', 'assumedLong': '74d35.3', 'corrections': [
+        {'long': '200d0.0', 'correctedDistance': '6', 'correctedAzimuth': '30d0.0'},
+        {'long': '200d0.0', 'correctedDistance': '-11', 'correctedAzimuth': '150d0.0'},
+        {'long': '50d0.0', 'correctedDistance': '5', 'correctedAzimuth': '90d0.0'}]}]}),
+    # imports NumPy
+    ('visible', querystring('op=visible, assumedLat=30d0.0, assumedLong=290d0.0, date=2016-01-17, time=03:15:42')),
+)
+
+# how each bundle is staged and the interpreter options it runs with
+BUNDLES = (
+    ('source', {'compiled': False, 'requirements': False}, []),
+    ('compiled', {'compiled': True, 'requirements': False}, []),
+    # -S: Lambda's runtime has no NumPy of its own, only the bundle's
+    ('shipped', {'compiled': True, 'requirements': True}, ['-S']),
+)
+
+PROGRAM = '''
+import sys, time
+sys.stderr.write('-- start\\n')
+start = time.perf_counter()
+import lambda_function
+imported = time.perf_counter()
+sys.stderr.write('-- request\\n')
+if %(event)r is not None:
+    response = lambda_function.lambda_handler(%(event)r, None)
+    for output in response if isinstance(response, list) else [response]:
+        if 'error' in output:
+            sys.exit('%%r answered %%r' %% (%(event)r, output))
+answered = time.perf_counter()
+print('%%f %%f' %% (imported - start, answered - imported))
+'''
+
+def run(bundle, options, event):
+    # -> (import seconds, request seconds, {phase: [(self us, module), ...]})
+    environment = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run([sys.executable] + options + ['-X', 'importtime', '-W', 'ignore', '-c', PROGRAM % {'event': event}],
+                            cwd=bundle, env=environment, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr.splitlines()[-1])
+    importSeconds, requestSeconds = [float(field) for field in result.stdout.split()]
+    phases, phase = {'start': [], 'request': []}, None
+    for line in result.stderr.splitlines():
+        if line.startswith('-- '):
+            phase = line[3:]
+        elif phase is not None and line.startswith('import time:') and 'self [us]' not in line:
+            selfTime, cumulative, module = line[len('import time:'):].split('|')
+            phases[phase].append((int(selfTime), module.strip()))
+    return importSeconds, requestSeconds, phases
+
+def median(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2]
+
+def size(directory):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, subdirectories, names in os.walk(directory)
+               for name in names)
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    bundles = {}
+    try:
+        for kind, staging, options in BUNDLES:
+            bundles[kind] = tempfile.mkdtemp()
+            stageBundle(bundles[kind], **staging)
+        print('bundle sizes: %s' % ', '.join('%s %.1f MB' % (kind, size(bundles[kind]) / 1e6)
+                                             for kind, staging, options in BUNDLES))
+        print('%-12s' % '' + ''.join(' %21s' % (kind + ' ms') for kind, staging, options in BUNDLES))
+        print('%-12s' % 'case' + ' %10s %10s' % ('import', 'first') * len(BUNDLES) + ' %8s  %s'
+              % ('modules', 'slowest request-time imports'))
+        for name, event in CASES:
+            line = '%-12s' % name
+            for kind, staging, options in BUNDLES:
+                runs = [run(bundles[kind], options, event) for repeat in range(repeats)]
+                importMs = median([importSeconds for importSeconds, requestSeconds, phases in runs]) * 1e3
+                requestMs = median([requestSeconds for importSeconds, requestSeconds, phases in runs]) * 1e3
+                line += ' %10.2f %10.2f' % (importMs, requestMs)
+            phases = runs[-1][2]
+            slowest = sorted(phases['request'], reverse=True)[:3]
+            line += ' %8d  %s' % (len(phases['start']) + len(phases['request']),
+                                  ', '.join('%s %.1fms' % (module, selfTime / 1e3) for selfTime, module in slowest))
+            print(line)
+    finally:
+        for bundle in bundles.values():
+            shutil.rmtree(bundle)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# Sightings per second through correct.correct and vector.correct.
+# Usage: python scripts/benchCorrect.py [rows]
+# Reduces random sightings against one assumed position, passing the vector
+# kernel both 'DdM.M' strings and degrees.
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import correct
+import vector
+
+def best(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random = np.random.default_rng(0)
+    lat = random.uniform(-80, 80, rows)
+    long = random.uniform(0, 360, rows)
+    altitude = random.uniform(5, 85, rows)
+    latText, longText, altitudeText = (vector.formatAlt(np.abs(column)) for column in (lat, long, altitude))
+    latText = np.where(lat < 0, np.char.add('-', latText), latText)
+
+    scalarRows = min(rows, 20000)
+    requests = [{'lat': str(latText[row]), 'long': str(longText[row]), 'altitude': str(altitudeText[row]),
+                 'assumedLat': '35d59.7', 'assumedLong': '74d35.3'} for row in range(scalarRows)]
+    scalar = best(lambda: [correct.correct(values) for values in requests], 3) / scalarRows
+    strings = best(lambda: vector.correct(latText, longText, altitudeText, '35d59.7', '74d35.3')) / rows
+    degrees = best(lambda: vector.correct(lat, long, altitude, 35.995, 74.58833)) / rows
+    for label, perRow in (('correct.correct', scalar), ('vector strings', strings), ('vector degrees', degrees)):
+        print('%-16s %12.0f sightings/s' % (label, 1.0 / perRow))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+# Handler cost of one event per request against one event per batch.
+# Usage: python scripts/benchEvents.py [requests] [number]
+# Times lambda_handler on requests adjust sightings sent one querystring per
+# event and all in one {'requests': [...]} event. Lambda's own per-invocation
+# overhead comes on top of the first figure once per request and of the second once.
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import lambda_function
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    # distinct sightings, so neither path is served from the result cache
+    querystrings = ['{op=adjust, observation=%dd%d.%d, height=%d.0, temperature=%d, horizon=natural}'
+                    % (10 + index % 70, index % 60, index % 10, index % 30, 40 + index % 50) for index in range(requests)]
+    lambda_function.results.maxsize = 0
+    single = [lambda_function.lambda_handler({'querystring': querystring}, None) for querystring in querystrings]
+    assert lambda_function.lambda_handler({'requests': querystrings}, None) == single
+
+    each = min(timeit.repeat(lambda: [lambda_function.lambda_handler({'querystring': querystring}, None)
+                                      for querystring in querystrings], number=number, repeat=5)) / number
+    batched = min(timeit.repeat(lambda: lambda_function.lambda_handler({'requests': querystrings}, None),
+                                number=number, repeat=5)) / number
+    print('%d requests, one event each   %8.1f us' % (requests, each * 1e6))
+    print('%d requests, one event        %8.1f us' % (requests, batched * 1e6))
+
+if __name__ == '__main__':
+    main()
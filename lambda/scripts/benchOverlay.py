@@ -0,0 +1,60 @@
+# Allocation per request in adjust, predict and correct.
+# Usage: python scripts/benchOverlay.py [extra keys] [requests]
+# Compares building each output as values.copy() plus the added keys, as the
+# ops used to, with util.Overlay, for requests carrying extra query keys the op
+# does not read. Memory is what tracemalloc sees allocated by the outputs.
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import util
+import adjust
+import predict
+import correct
+
+def copyOutput(values, compute):
+    output = values.copy()
+    output.update(compute(values))
+    return output
+
+def overlayOutput(values, compute):
+    return util.Overlay(values, compute(values))
+
+def allocated(build, valuesList, compute):
+    # bytes per request held by the outputs once they are all built
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    outputs = [build(values, compute) for values in valuesList]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del outputs
+    return (after - before) / float(len(valuesList))
+
+def main():
+    extra = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    padding = dict(('key%d' % index, 'value%d' % index) for index in range(extra))
+    cases = (
+        ('adjust', adjust._compute,
+         {'observation': '30d1.5', 'height': '19.0', 'pressure': '1000', 'horizon': 'artificial', 'temperature': '85'}),
+        ('predict', predict._compute, {'body': 'Betelgeuse', 'date': '2016-01-17', 'time': '03:15:42'}),
+        ('correct', correct._compute,
+         {'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3', 'assumedLat': '-53d38.4', 'assumedLong': '74d35.3'}),
+        ('error', correct._compute, {'lat': '16d32.3'}),
+    )
+    print('%d extra keys per request' % extra)
+    for name, compute, values in cases:
+        values = dict(padding, **values)
+        valuesList = [dict(values) for index in range(requests)]
+        assert copyOutput(values, compute) == overlayOutput(values, compute)
+        copyBytes = allocated(copyOutput, valuesList, compute)
+        overlayBytes = allocated(overlayOutput, valuesList, compute)
+        copyTime = min(timeit.repeat(lambda: copyOutput(values, compute), number=requests, repeat=5)) / requests
+        overlayTime = min(timeit.repeat(lambda: overlayOutput(values, compute), number=requests, repeat=5)) / requests
+        print('%-8s copy %7.0f B %7.3f us   overlay %7.0f B %7.3f us' % (
+            name, copyBytes, copyTime * 1e6, overlayBytes, overlayTime * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# Date/time parse cost in predict.
+# Usage: python scripts/benchParse.py [number]
+# Compares the strptime-based parse predict used to do with util.parseDate and
+# util.parseTime on the same 'YYYY-MM-DD' / 'HH:MM:SS' strings.
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import util
+
+def strptimeParse(date, time):
+    # what predict did before util.parseDate/parseTime, minus the error handling
+    dateAndTime = datetime.datetime.strptime('2001-01-01', '%Y-%m-%d')
+    parts = date.split('-')
+    if len(parts) != 3 or len(parts[0]) != 4 or int(parts[0]) < 2001 or len(parts[1]) != 2 or len(parts[2]) != 2:
+        return None
+    dateAndTime = datetime.datetime.strptime(date, '%Y-%m-%d')
+    parts = time.split(':')
+    if len(parts) != 3 or len(parts[0]) != 2 or len(parts[1]) != 2 or len(parts[2]) != 2:
+        return None
+    dateAndTime = dateAndTime.replace(hour=int(parts[0]), minute=int(parts[1]), second=int(parts[2]))
+    delta = (dateAndTime - datetime.datetime.strptime(str(dateAndTime.year), '%Y')).total_seconds()
+    return dateAndTime.year, delta
+
+def fastParse(date, time):
+    year, day = util.parseDate(date)
+    return year, day * 86400 + util.parseTime(time)
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    date, time = '2016-01-17', '03:15:42'
+    assert strptimeParse(date, time) == fastParse(date, time)
+    before = min(timeit.repeat(lambda: strptimeParse(date, time), number=number, repeat=5)) / number
+    after = min(timeit.repeat(lambda: fastParse(date, time), number=number, repeat=5)) / number
+    print('strptime parse  %8.3f us' % (before * 1e6))
+    print('util.parse*     %8.3f us' % (after * 1e6))
+    print('speedup         %8.1fx' % (before / after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# Predict latency by requested year.
+# Usage: python scripts/benchPredict.py [repeat]
+# Reports microseconds per predict call for dates from 2001 to 2500, both with
+# the per-year GHA Aries table warm and with it cleared before every call; both
+# columns should stay flat as the year grows.
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import predict
+
+def bench(year, repeat):
+    values = {'op': 'predict', 'body': 'Betelgeuse', 'date': '%04d-06-15' % year, 'time': '03:15:42'}
+
+    def cold():
+        predict.ghaAriesBase.cache_clear()
+        predict.predict(values)
+
+    predict.predict(values)
+    warm = min(timeit.repeat(lambda: predict.predict(values), number=repeat, repeat=5)) / repeat
+    cleared = min(timeit.repeat(cold, number=repeat, repeat=5)) / repeat
+    return warm * 1e6, cleared * 1e6
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print('%6s %12s %12s' % ('year', 'warm us', 'cleared us'))
+    for year in list(range(2001, 2501, 50)) + [2500]:
+        warm, cleared = bench(year, repeat)
+        print('%6d %12.2f %12.2f' % (year, warm, cleared))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Request rate of the pre-forked server from 1 to N worker processes.
+# Usage: python scripts/benchPrefork.py [max processes] [connections] [requests per connection]
+# For 1, 2, 4, ... processes up to [max processes] (the core count by default)
+# starts server.py on a free port and drives it with single GETs from as many
+# client processes as there are cores, so the clients are not what saturates.
+# Reports requests/s and the speedup over one process. The rate only scales
+# while there are idle cores for the workers: on one core every figure is the same.
+import asyncio
+import concurrent.futures
+import os
+import signal
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadServer import here, load
+
+def drive(port, connections, requests):
+    # one client process -> requests it sent
+    seconds, latencies = asyncio.run(load(port, connections, requests, 0))
+    return sum(len(samples) for samples in latencies.values())
+
+def rate(processes, clients, connections, requests):
+    server = subprocess.Popen([sys.executable, '-W', 'ignore', 'server.py', '0', '127.0.0.1', str(processes)],
+                              cwd=here, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline().split(':')[2].split(' ')[0])
+        with concurrent.futures.ProcessPoolExecutor(clients) as pool:
+            start = time.perf_counter()
+            total = sum(pool.map(drive, [port] * clients, [connections] * clients, [requests] * clients))
+            seconds = time.perf_counter() - start
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return total / seconds
+
+def main():
+    cores = os.cpu_count() or 1
+    maxProcesses = int(sys.argv[1]) if len(sys.argv) > 1 else max(2, cores)
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    requests = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    counts = [1]
+    while counts[-1] * 2 <= maxProcesses:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != maxProcesses:
+        counts.append(maxProcesses)
+    clients = max(2, cores)
+    print('%d cores, %d client processes x %d connections x %d requests' % (cores, clients, connections, requests))
+    single = None
+    for processes in counts:
+        perSecond = rate(processes, clients, connections, requests)
+        single = single or perSecond
+        print('%3d processes %8.0f requests/s   speedup %4.2fx' % (processes, perSecond, perSecond / single))
+
+if __name__ == '__main__':
+    main()
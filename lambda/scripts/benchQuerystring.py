@@ -0,0 +1,37 @@
+# Querystring parse cost per Lambda event.
+# Usage: python scripts/benchQuerystring.py [number]
+# Compares the regex lambda_handler used to run with parseQuerystring on the
+# strings API Gateway's $input.params().querystring mapping produces.
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import lambda_function
+
+PAYLOADS = (
+    ('adjust', '{op=adjust, observation=30d1.5, height=19.0, temperature=85, pressure=1000, horizon=artificial}'),
+    ('predict', '{op=predict, body=Betelgeuse, date=2016-01-17, time=03:15:42}'),
+    ('quoted', '{op=predict, body="Kaus Aust.", date=2016-01-17, time=03:15:42}'),
+    ('correct', '{op=correct, lat=16d32.3, long=95d41.6, altitude=13d42.3, assumedLat=-53d38.4, assumedLong=74d35.3}'),
+    ('40 params', '{op=adjust, observation=30d1.5, %s}' % ', '.join('utm%d=campaign%d' % (index, index) for index in range(38))),
+)
+
+def regexParse(querystring):
+    # what lambda_handler did before parseQuerystring
+    eventParms = querystring.strip('{}').replace(',', ' ')
+    return dict(re.findall(r'(\S+)=(".*?"|\S+)', eventParms))
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for name, querystring in PAYLOADS:
+        values, error = lambda_function.parseQuerystring(querystring)
+        if '"' not in querystring:
+            assert regexParse(querystring) == values
+        before = min(timeit.repeat(lambda: regexParse(querystring), number=number, repeat=5)) / number
+        after = min(timeit.repeat(lambda: lambda_function.parseQuerystring(querystring), number=number, repeat=5)) / number
+        print('%-10s regex %7.3f us   parseQuerystring %7.3f us   speedup %4.1fx' % (name, before * 1e6, after * 1e6, before / after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Accuracy and latency of correct's table lookup against the direct reduction.
+# Usage: python scripts/benchReduction.py [samples] [reduction.tab]
+# Build the table first with scripts/compileReduction.py. Errors are in
+# arcminutes over random assumed latitudes, declinations and LHAs; points
+# the table declines (near the pole or the zenith) count as fallbacks.
+import os
+import sys
+import math
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import correct
+import reduction
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(fraction * len(values)))]
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    table = reduction.Table(sys.argv[2] if len(sys.argv) > 2 else reduction.DEFAULT_PATH)
+    random.seed(0)
+    points = [(random.uniform(-89.9, 89.9), random.uniform(-89.9, 89.9), random.uniform(0, 360)) for _ in range(samples)]
+
+    hcErrors, zErrors, fallbacks, flipped = [], [], 0, 0
+    for lat, dec, lha in points:
+        looked = table.lookup(lat, dec, lha)
+        if looked is None:
+            fallbacks += 1
+            continue
+        hc, z = reduction.reduce(lat, dec, lha)
+        hcErrors.append(abs(looked[0] - hc) * 60.0)
+        zErrors.append(abs(looked[1] - z) * 60.0)
+        # how often the rounded correctedDistance would change for a sight at 30 degrees
+        flipped += round((30.0 - looked[0]) * 60.0) != round((30.0 - hc) * 60.0)
+    print('table %s every %g degrees, %d samples, %.2f%% fall back to the direct reduction'
+          % (table.shape, table.step, samples, 100.0 * fallbacks / samples))
+    for label, errors in (('Hc', hcErrors), ('Z', zErrors)):
+        print('%-3s error  rms %6.3f\'  p99 %6.3f\'  max %6.3f\''
+              % (label, math.sqrt(sum(error * error for error in errors) / len(errors)),
+                 percentile(errors, 0.99), max(errors)))
+    print('correctedDistance differs in %.2f%% of looked-up sights' % (100.0 * flipped / len(hcErrors)))
+
+    number = min(samples, 20000)
+    direct = min(timeit.repeat(lambda: [reduction.reduce(*point) for point in points[:number]], number=1, repeat=5)) / number
+    lookup = min(timeit.repeat(lambda: [table.lookup(*point) for point in points[:number]], number=1, repeat=5)) / number
+    request = {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3',
+               'assumedLat': '-53d38.4', 'assumedLong': '74d35.3'}
+    tableRequest = dict(request, method='table')
+    reduction._defaultTable = table
+    directRequest = min(timeit.repeat(lambda: correct.correct(request), number=number, repeat=5)) / number
+    tableRequest = min(timeit.repeat(lambda: correct.correct(tableRequest), number=number, repeat=5)) / number
+    print('reduction  direct %6.2f us  table %6.2f us' % (direct * 1e6, lookup * 1e6))
+    print('correct    direct %6.2f us  table %6.2f us' % (directRequest * 1e6, tableRequest * 1e6))
+
+if __name__ == '__main__':
+    main()
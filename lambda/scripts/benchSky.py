@@ -0,0 +1,53 @@
+# Window query latency with the sky index against a linear scan.
+# Usage: python scripts/benchSky.py [rows]
+# Builds a synthetic catalog (default 100000 stars) and times typical planning
+# queries both ways, checking that they return the same stars.
+import os
+import sys
+import random
+import shutil
+import tempfile
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import catalog
+import sky
+from benchCatalog import syntheticRows
+
+WINDOWS = (
+    ('15-65 whole horizon', 15.0, 65.0, None, None),
+    ('15-65 east quadrant', 15.0, 65.0, 45.0, 135.0),
+    ('30-40 north 20deg', 30.0, 40.0, 350.0, 10.0),
+)
+
+def linearScan(stars, ghaAries, lat, long, minAltitude, maxAltitude, minAzimuth, maxAzimuth):
+    altitude, azimuth = sky._altitudeAzimuth(ghaAries + long, lat, np.frombuffer(stars.sha),
+                                             np.frombuffer(stars.sinDec), np.frombuffer(stars.cosDec))
+    inside = (altitude >= minAltitude) & (altitude <= maxAltitude)
+    if minAzimuth is not None:
+        inside &= sky._inSector(azimuth, minAzimuth, maxAzimuth)
+    return np.nonzero(inside)[0]
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'stars.cat')
+        catalog.writeCatalog(syntheticRows(rows), path)
+        stars = catalog.Catalog(path)
+        index = sky.SkyIndex(stars)
+        random.seed(rows)
+        print('%d stars' % rows)
+        for name, minAltitude, maxAltitude, minAzimuth, maxAzimuth in WINDOWS:
+            query = (random.uniform(0, 360), 35.5, 285.0, minAltitude, maxAltitude, minAzimuth, maxAzimuth)
+            found = index.query(*query)[0]
+            assert sorted(found) == list(linearScan(stars, *query))
+            indexed = min(timeit.repeat(lambda: index.query(*query), number=20, repeat=5)) / 20
+            scanned = min(timeit.repeat(lambda: linearScan(stars, *query), number=20, repeat=5)) / 20
+            print('%-22s %6d stars  index %8.3f ms  scan %8.3f ms' % (name, len(found), indexed * 1e3, scanned * 1e3))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# Input validation cost in adjust and correct.
+# Usage: python scripts/benchValidation.py [number]
+# Compares the checks adjust and correct write out with the same rules built by
+# schema.build, on the same valid inputs.
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import schema
+import adjust
+import correct
+
+# adjust.validate and correct.validate as schema rules
+ADJUST = schema.build(
+    schema.required('observation'),
+    schema.field('observation', schema.angle(0, 90)),
+    schema.check('observation', lambda observation: observation > 0, 'observation is invalid'),
+    schema.field('height', schema.number(float), default=0),
+    schema.check('height', lambda height: height >= 0, 'height must be greater than 0'),
+    schema.field('temperature', schema.number(int, -20, 120), default=72),
+    schema.field('pressure', schema.number(int, 100, 1100), default=1010),
+    schema.field('horizon', schema.choice(('artificial', 'natural'), lower=True), default='natural'))
+
+CORRECT = schema.build(
+    schema.required(*[key for key, minDegrees, maxDegrees in correct.ANGLES]),
+    schema.absent('correctedDistance', 'correctedDistance already exists'),
+    schema.absent('correctedAzimuth', 'correctedAzimuth already exists'),
+    *[schema.field(key, schema.angle(minDegrees, maxDegrees)) for key, minDegrees, maxDegrees in correct.ANGLES]
+    + [schema.field('method', schema.choice(correct.METHODS), default='direct')])
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cases = (
+        ('adjust', adjust.validate, ADJUST,
+         {'observation': '30d1.5', 'height': '19.0', 'pressure': '1000', 'horizon': 'artificial', 'temperature': '85'}),
+        ('correct', correct.validate, CORRECT,
+         {'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3', 'assumedLat': '-53d38.4', 'assumedLong': '74d35.3'}),
+    )
+    for name, inline, built, values in cases:
+        assert inline(values) == built(values)
+        before = min(timeit.repeat(lambda: built(values), number=number, repeat=9)) / number
+        after = min(timeit.repeat(lambda: inline(values), number=number, repeat=9)) / number
+        print('%-8s schema %8.3f us   inline %8.3f us   ratio %5.2fx' % (name, before * 1e6, after * 1e6, before / after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# Build the Lambda deployment zip.
+# Usage: python scripts/buildBundle.py [--table] [lambda.zip]
+# Packs the op modules, the compiled star catalog and the packages in
+# requirements.txt (NumPy, for the vector, sweep and batch paths), together with
+# their bytecode. --table adds the ~24 MB sight reduction table that only
+# correct's opt-in method=table reads; without it that method reports the table
+# unavailable and the default direct reduction is unaffected. Lambda's file
+# system is read-only, so a bundle without __pycache__ compiles every module it
+# imports again on each cold start. The bytecode is written as unchecked-hash .pyc
+# so the timestamps zip stores do not invalidate it.
+import compileall
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, here)
+
+# Lambda's x86_64 runtime; wheels are fetched for it rather than for this machine,
+# and for this interpreter's version, which must be the function's runtime
+PLATFORM = 'manylinux2014_x86_64'
+
+def bundleFiles():
+    # the modules and data a deployed handler reads: no tests, scripts, CSV sources
+    # or the on-board server
+    return sorted(name for name in os.listdir(here)
+                  if (name.endswith('.py') and name != 'server.py') or name == 'stars.cat')
+
+def installRequirements(directory):
+    # the binary wheels of requirements.txt for Lambda, unpacked into directory
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', '--quiet', '--target', directory,
+                           '--platform', PLATFORM, '--implementation', 'cp',
+                           '--python-version', '%d.%d' % sys.version_info[:2], '--only-binary=:all:',
+                           '--requirement', os.path.join(here, 'requirements.txt')])
+
+def stageBundle(directory, compiled=True, requirements=True, table=False):
+    # copies the bundle into directory, compiling its bytecode unless compiled is False,
+    # installing requirements.txt unless requirements is False and adding the reduction
+    # table only when table is True
+    if requirements:
+        installRequirements(directory)
+    for name in bundleFiles():
+        shutil.copy2(os.path.join(here, name), directory)
+    if table:
+        # reduction.tab is too large to keep in git, so it is tabulated here unless
+        # scripts/compileReduction.py has already written one
+        path = os.path.join(here, 'reduction.tab')
+        if os.path.exists(path):
+            shutil.copy2(path, directory)
+        else:
+            import reduction
+            reduction.writeTable(os.path.join(directory, 'reduction.tab'))
+    if compiled:
+        compileall.compile_dir(directory, quiet=1, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+
+def main():
+    arguments = sys.argv[1:]
+    table = '--table' in arguments
+    if table:
+        arguments.remove('--table')
+    target = arguments[0] if arguments else os.path.join(here, 'lambda.zip')
+    staging = tempfile.mkdtemp()
+    try:
+        stageBundle(staging, table=table)
+        with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for directory, subdirectories, names in os.walk(staging):
+                for name in sorted(names):
+                    path = os.path.join(directory, name)
+                    bundle.write(path, os.path.relpath(path, staging))
+    finally:
+        shutil.rmtree(staging)
+    print('%s (%d bytes)' % (target, os.path.getsize(target)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+# Compile a star catalog CSV into the memory-mapped format catalog.py reads.
+# Usage: python scripts/compileCatalog.py [stars.csv] [stars.cat]
+# The CSV needs a name,sha,dec header with angles written as 'DdM.M'; the
+# defaults rebuild the bundled navigational star table.
+import os
+import sys
+
+here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, here)
+import catalog
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(here, 'stars.csv')
+    target = sys.argv[2] if len(sys.argv) > 2 else catalog.DEFAULT_PATH
+    rows = catalog.readCsv(source)
+    catalog.writeCatalog(rows, target)
+    print('%d stars -> %s (%d bytes)' % (len(rows), target, os.path.getsize(target)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+# Tabulate the sight reduction into the memory-mapped table reduction.py reads.
+# Usage: python scripts/compileReduction.py [step] [reduction.tab]
+# step is the spacing in degrees of latitude, declination and LHA and must
+# divide 90; the default 1 degree table is about 24 MB.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import reduction
+
+def main():
+    step = float(sys.argv[1]) if len(sys.argv) > 1 else reduction.DEFAULT_STEP
+    target = sys.argv[2] if len(sys.argv) > 2 else reduction.DEFAULT_PATH
+    reduction.writeTable(target, step)
+    print('%s every %g degrees -> %s (%d bytes)' % (reduction.Table(target).shape, step, target, os.path.getsize(target)))
+
+if __name__ == '__main__':
+    main()
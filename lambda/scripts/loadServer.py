@@ -0,0 +1,77 @@
+# Loopback load test of server.py.
+# Usage: python scripts/loadServer.py [connections] [requests per connection] [batch every]
+# Starts the server on a free port, then has each connection send its requests
+# one after another over one kept-alive socket: single adjust/predict/correct
+# GETs, and every [batch every]th request a 100-request POST /lambda event,
+# which the server runs in its process pool. Reports latency percentiles for
+# each kind of request and the overall request rate.
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SINGLES = (
+    '/dispatch?op=adjust&observation=30d1.5&height=19.0&horizon=artificial',
+    '/dispatch?op=predict&body=Betelgeuse&date=2016-01-17&time=03:15:42',
+    '/dispatch?op=correct&lat=16d32.3&long=95d41.6&altitude=13d42.3&assumedLat=-53d38.4&assumedLong=74d35.3',
+)
+BATCH = json.dumps({'requests': ['{op=adjust, observation=%dd%d.0, height=%d.0}' % (10 + index % 70, index % 60, index % 30)
+                                 for index in range(100)]}).encode('utf-8')
+
+async def exchange(reader, writer, method, target, body=b''):
+    writer.write(('%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n' % (method, target, len(body))).encode('latin-1') + body)
+    head = await reader.readuntil(b'\r\n\r\n')
+    length = 0
+    for line in head.decode('latin-1').split('\r\n'):
+        if line.lower().startswith('content-length:'):
+            length = int(line.split(':', 1)[1])
+    return json.loads(await reader.readexactly(length))
+
+async def client(port, requests, batchEvery, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for index in range(requests):
+        start = time.perf_counter()
+        if batchEvery and index % batchEvery == batchEvery - 1:
+            output = await exchange(reader, writer, 'POST', '/lambda', BATCH)
+            kind = 'batch'
+        else:
+            output = await exchange(reader, writer, 'GET', SINGLES[index % len(SINGLES)])
+            kind = 'single'
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        assert 'error' not in output, output
+    writer.close()
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+async def load(port, connections, requests, batchEvery):
+    latencies = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[client(port, requests, batchEvery, latencies) for connection in range(connections)])
+    return time.perf_counter() - start, latencies
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    batchEvery = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    server = subprocess.Popen([sys.executable, '-W', 'ignore', 'server.py', '0'], cwd=here, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline().rsplit(':', 1)[1])
+        seconds, latencies = asyncio.run(load(port, connections, requests, batchEvery))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    total = sum(len(samples) for samples in latencies.values())
+    print('%d connections x %d requests: %d requests in %.2f s, %.0f requests/s'
+          % (connections, requests, total, seconds, total / seconds))
+    for kind, samples in sorted(latencies.items()):
+        print('%-7s %6d   p50 %8.2f ms   p99 %8.2f ms' % (kind, len(samples), percentile(samples, 0.5) * 1e3, percentile(samples, 0.99) * 1e3))
+
+if __name__ == '__main__':
+    main()
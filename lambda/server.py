@@ -0,0 +1,370 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import urllib.parse
+import concurrent.futures
+import dispatch
+import lambda_function
+
+# A local HTTP/1.1 server for ships that cannot reach AWS:
+#
+#   GET  /dispatch?op=adjust&observation=30d1.5    dispatch on the query's values
+#   POST /dispatch                                 a JSON values dict, or a list for dispatchBatch
+#   POST /lambda                                   a JSON event for lambda_handler
+#
+# Connections are kept alive between requests. Batches of at least
+# BATCH_THRESHOLD requests, and requests for the ops in HEAVY_OPS, run in a
+# process pool so that the rest, which take microseconds, are answered from the
+# event loop without waiting behind them. Every response is 200 with the op's
+# output as JSON, as from the Lambda, except for requests the server cannot read.
+#
+# With more than one process, prefork runs that many copies of the server, each
+# accepting on its own SO_REUSEPORT socket at the same port so the kernel spreads
+# connections across them and throughput scales with cores. The parent loads
+# the op modules, maps the star catalog and builds the sky index once before
+# forking; the workers share those pages rather than each loading its own, and
+# run batches themselves instead of through a process pool.
+
+# requests handled at once; others wait for a slot
+MAX_CONCURRENT = 64
+# requests in a batch, or an event's requests, that go to the process pool
+BATCH_THRESHOLD = 16
+# ops that can take milliseconds to seconds, which go to the process pool however
+# few there are; a predict goes there when it asks for a series
+HEAVY_OPS = frozenset(('sweep', 'track', 'locate', 'pipeline', 'predictAll'))
+SERIES_KEYS = ('times', 'start')
+# seconds a kept-alive connection may sit idle, and a shutdown may wait for requests in flight
+IDLE_TIMEOUT = 30.0
+SHUTDOWN_GRACE = 10.0
+# a pre-forked worker that exits within RESPAWN_UPTIME seconds of starting is
+# replaced after a delay that doubles from RESPAWN_BACKOFF up to MAX_RESPAWN_BACKOFF
+RESPAWN_UPTIME = 5.0
+RESPAWN_BACKOFF = 0.1
+MAX_RESPAWN_BACKOFF = 10.0
+MAX_BODY = 4 * 1024 * 1024
+MAX_HEAD = 64 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 501: 'Not Implemented'}
+
+class Server(object):
+
+    # batchThreshold None runs every batch on the event loop, without a process pool
+    def __init__(self, host='127.0.0.1', port=8080, maxConcurrent=MAX_CONCURRENT, workers=None,
+                 batchThreshold=BATCH_THRESHOLD, idleTimeout=IDLE_TIMEOUT, reusePort=False):
+        self.host = host
+        self.port = port
+        self.batchThreshold = batchThreshold
+        self.idleTimeout = idleTimeout
+        self.reusePort = reusePort
+        self._slots = asyncio.Semaphore(maxConcurrent)
+        self._pool = None
+        if batchThreshold is not None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(workers)
+        self._server = None
+        self._connections = {}
+        self._inFlight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+
+    async def start(self):
+        # binds, setting port to the one bound when it was 0
+        self._server = await asyncio.start_server(self._connection, self.host, self.port, limit=MAX_HEAD,
+                                                  reuse_port=self.reusePort or None)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def shutdown(self, grace=SHUTDOWN_GRACE):
+        # stop accepting, let requests in flight answer, then close idle connections
+        self._closing = True
+        self._server.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), grace)
+        except asyncio.TimeoutError:
+            pass
+        tasks = list(self._connections.values())
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    async def _connection(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while not self._closing:
+                keepAlive = await self._exchange(reader, writer)
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _exchange(self, reader, writer):
+        # one request and its response -> whether the connection stays open
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.idleTimeout)
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.IncompleteReadError:
+            return False
+        except asyncio.LimitOverrunError:
+            await _respond(writer, 431, {'error': 'request head is too large'}, False)
+            return False
+        request = _parseHead(head)
+        if request is None:
+            await _respond(writer, 400, {'error': 'request is invalid'}, False)
+            return False
+        method, target, version, headers = request
+        if headers.get('connection', '').lower() == 'close':
+            keepAlive = False
+        else:
+            keepAlive = version == 'HTTP/1.1' or headers.get('connection', '').lower() == 'keep-alive'
+
+        if 'transfer-encoding' in headers:
+            await _respond(writer, 501, {'error': 'chunked bodies are not supported'}, False)
+            return False
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            length = -1
+        if length < 0:
+            await _respond(writer, 400, {'error': 'content-length is invalid'}, False)
+            return False
+        if length > MAX_BODY:
+            await _respond(writer, 413, {'error': 'body is too large'}, False)
+            return False
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), self.idleTimeout)
+        except asyncio.TimeoutError:
+            return False
+
+        self._inFlight += 1
+        self._idle.clear()
+        try:
+            async with self._slots:
+                try:
+                    status, output = await self._handle(method, target, body)
+                except Exception:
+                    status, output = 200, {'error': 'op failed'}
+            keepAlive = keepAlive and not self._closing
+            await _respond(writer, status, output, keepAlive)
+        finally:
+            self._inFlight -= 1
+            if self._inFlight == 0:
+                self._idle.set()
+        return keepAlive
+
+    async def _handle(self, method, target, body):
+        # -> (status, output)
+        path, _, query = target.partition('?')
+        if path not in ('/dispatch', '/lambda'):
+            return 404, {'error': 'path is not served'}
+        if path == '/dispatch' and method == 'GET':
+            values = dict(urllib.parse.parse_qsl(query, keep_blank_values=True))
+            if _isHeavy(values):
+                return 200, await self._offload(dispatch.dispatch, values)
+            return 200, dispatch.dispatch(values)
+        if method != 'POST':
+            return 405, {'error': 'method is not allowed'}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {'error': 'body is not JSON'}
+
+        if path == '/dispatch':
+            if isinstance(payload, list):
+                if self._isLarge(payload) or any(_isHeavy(values) for values in payload):
+                    return 200, await self._offload(dispatch.dispatchBatch, payload)
+                return 200, dispatch.dispatchBatch(payload)
+            if _isHeavy(payload):
+                return 200, await self._offload(dispatch.dispatch, payload)
+            return 200, dispatch.dispatch(payload)
+        if (isinstance(payload, dict) and self._isLarge(payload.get('requests'))) or _isHeavyEvent(payload):
+            return 200, await self._offload(lambda_function.lambda_handler, payload, None)
+        return 200, lambda_function.lambda_handler(payload, None)
+
+    def _isLarge(self, requests):
+        return isinstance(requests, list) and self.batchThreshold is not None and len(requests) >= self.batchThreshold
+
+    async def _offload(self, function, *args):
+        if self._pool is None:
+            return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, function, *args)
+
+def _isHeavy(values):
+    # a request, as values or a querystring, for one of HEAVY_OPS or a predict series
+    if isinstance(values, str):
+        values = lambda_function.parseQuerystring(values)[0]
+    if not isinstance(values, dict):
+        return False
+    op = values.get('op')
+    if op == 'predict':
+        return any(key in values for key in SERIES_KEYS)
+    try:
+        return op in HEAVY_OPS
+    except TypeError:
+        return False
+
+def _isHeavyEvent(event):
+    # a Lambda event carrying a heavy request
+    if not isinstance(event, dict):
+        return False
+    if 'requests' in event:
+        return isinstance(event['requests'], list) and any(_isHeavy(request) for request in event['requests'])
+    return _isHeavy(event.get('querystring'))
+
+def _parseHead(head):
+    # 'METHOD target HTTP/1.x' and its headers -> (method, target, version, {name: value}) or None
+    try:
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        return None
+    if version not in ('HTTP/1.0', 'HTTP/1.1'):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, colon, value = line.partition(':')
+        if not colon:
+            return None
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+async def _respond(writer, status, output, keepAlive):
+    body = json.dumps(output).encode('utf-8')
+    # X-Worker names the process that answered, one of several when pre-forked
+    head = ('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n'
+            'X-Worker: %d\r\n\r\n' % (status, REASONS[status], len(body), 'keep-alive' if keepAlive else 'close',
+                                       os.getpid()))
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+async def serve(host, port, ready=None, **options):
+    # runs until SIGINT or SIGTERM, then shuts down gracefully; ready(server) is called
+    # once it is listening, which by default prints the address
+    server = Server(host, port, **options)
+    await server.start()
+    if ready is None:
+        print('serving on http://%s:%d' % (server.host, server.port), flush=True)
+    else:
+        ready(server)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signalNumber in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signalNumber, stop.set)
+    await stop.wait()
+    await server.shutdown()
+
+def warm():
+    # what every worker would otherwise load for itself: the op modules, the
+    # star catalog's mapping and the sky index built over it
+    import catalog
+    import sky
+
+    for table in (dispatch.ops, dispatch.batchOps, dispatch.cachedOps):
+        for entry in table.values():
+            dispatch.handler(entry)
+    catalog.defaultCatalog()
+    sky.defaultIndex()
+
+def prefork(host, port, processes):
+    # runs processes workers on host:port until SIGINT or SIGTERM, replacing any that
+    # exit early; raises OSError if a worker exits before it is listening
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise OSError('SO_REUSEPORT is not available on this platform')
+    # holds the port, bound but not listening, so a port of 0 picks one all the workers share
+    reserved = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    reserved.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    reserved.bind((host, port))
+    port = reserved.getsockname()[1]
+    warm()
+
+    # worker pid -> (read end of the pipe it writes a byte to once listening, when it started)
+    children = {}
+    stopping = []
+
+    def spawn():
+        # only the worker holds the write end, so the read end sees EOF if it dies first
+        readyRead, readyWrite = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            reserved.close()
+            os.close(readyRead)
+            status = 1
+            try:
+                asyncio.run(serve(host, port, lambda server: os.write(readyWrite, b'.'),
+                                  batchThreshold=None, reusePort=True))
+                status = 0
+            finally:
+                os._exit(status)
+        os.close(readyWrite)
+        children[pid] = (readyRead, time.monotonic())
+
+    def stop(signalNumber, frame):
+        stopping.append(signalNumber)
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    def reap(pid):
+        readyRead, started = children.pop(pid)
+        os.close(readyRead)
+        return time.monotonic() - started
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for process in range(processes):
+        spawn()
+    failed = False
+    for readyRead, started in list(children.values()):
+        if not os.read(readyRead, 1):
+            failed = not stopping
+            break
+    if failed:
+        stop(signal.SIGTERM, None)
+    else:
+        print('serving on http://%s:%d with %d processes' % (host, port, processes), flush=True)
+
+    # a worker that keeps dying soon after it starts is restarted ever more slowly
+    backoff = 0.0
+    while children:
+        pid, status = os.wait()
+        uptime = reap(pid)
+        if stopping:
+            continue
+        if uptime < RESPAWN_UPTIME:
+            backoff = min(max(2 * backoff, RESPAWN_BACKOFF), MAX_RESPAWN_BACKOFF)
+            deadline = time.monotonic() + backoff
+            while not stopping and time.monotonic() < deadline:
+                time.sleep(min(0.1, backoff))
+        else:
+            backoff = 0.0
+        if not stopping:
+            spawn()
+    reserved.close()
+    if failed:
+        raise OSError('a worker exited before it was listening')
+
+def main():
+    # python server.py [port] [host] [processes]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    host = sys.argv[2] if len(sys.argv) > 2 else '127.0.0.1'
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    if processes > 1:
+        prefork(host, port, processes)
+    else:
+        asyncio.run(serve(host, port))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import math
+import numpy as np
+import util
+import catalog
+import predict
+
+# Window queries over the star catalog: which stars lie between two altitudes
+# (and optionally inside an azimuth sector) for an assumed position and time.
+# The index sorts the catalog into declination bands ordered by SHA, so a query
+# only reduces the stars inside the window's declination/SHA bounding box.
+
+BAND_DEGREES = 2.0
+
+# boundary samples per window edge and the slack added to the bounding box
+EDGE_SAMPLES = 64
+MARGIN_DEGREES = 1.0
+
+class SkyIndex(object):
+
+    def __init__(self, stars):
+        self.catalog = stars
+        sha = np.frombuffer(stars.sha, dtype=float)
+        dec = np.frombuffer(stars.dec, dtype=float)
+        self.bands = int(math.ceil(180.0 / BAND_DEGREES))
+        band = np.clip(((dec + 90.0) // BAND_DEGREES).astype(int), 0, self.bands - 1)
+        self.rows = np.lexsort((sha, band))
+        # band * 360 + sha increases through the sorted rows
+        self.keys = band[self.rows] * 360.0 + sha[self.rows]
+        self.sha = sha[self.rows]
+        self.sinDec = np.frombuffer(stars.sinDec, dtype=float)[self.rows]
+        self.cosDec = np.frombuffer(stars.cosDec, dtype=float)[self.rows]
+
+    def query(self, ghaAries, lat, long, minAltitude=15.0, maxAltitude=65.0, minAzimuth=None, maxAzimuth=None):
+        # -> (catalog rows, altitudes, azimuths) in degrees; the azimuth sector runs
+        # clockwise from minAzimuth to maxAzimuth and is the whole horizon when omitted
+        candidates = self._candidates(ghaAries, lat, long, minAltitude, maxAltitude, minAzimuth, maxAzimuth)
+        altitude, azimuth = _altitudeAzimuth(ghaAries + long, lat, self.sha[candidates],
+                                             self.sinDec[candidates], self.cosDec[candidates])
+        inside = (altitude >= minAltitude) & (altitude <= maxAltitude)
+        if minAzimuth is not None:
+            inside &= _inSector(azimuth, minAzimuth, maxAzimuth)
+        return self.rows[candidates[inside]], altitude[inside], azimuth[inside]
+
+    def _candidates(self, ghaAries, lat, long, minAltitude, maxAltitude, minAzimuth, maxAzimuth):
+        # positions (into the sorted rows) of every star in the window's bounding box
+        decMin, decMax, shaRanges = _boundingBox(ghaAries, lat, long, minAltitude, maxAltitude, minAzimuth, maxAzimuth)
+        firstBand = max(int((decMin + 90.0) // BAND_DEGREES), 0)
+        lastBand = min(int((decMax + 90.0) // BAND_DEGREES), self.bands - 1)
+        bands = np.arange(firstBand, lastBand + 1) * 360.0
+        starts, ends = [], []
+        for low, high in shaRanges:
+            starts.append(np.searchsorted(self.keys, bands + low, 'left'))
+            ends.append(np.searchsorted(self.keys, bands + high, 'left'))
+        starts = np.concatenate(starts)
+        lengths = np.concatenate(ends) - starts
+        # expand the (start, length) runs into one index array
+        total = lengths.sum()
+        runStarts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return runStarts + np.arange(total)
+
+def _boundingBox(ghaAries, lat, long, minAltitude, maxAltitude, minAzimuth, maxAzimuth):
+    # declination range and SHA ranges (within [0, 360]) covering the window
+    edge = np.linspace(0.0, 1.0, EDGE_SAMPLES)
+    if minAzimuth is None:
+        around = edge * 360.0
+        altitudes = np.concatenate((np.full(EDGE_SAMPLES, minAltitude), np.full(EDGE_SAMPLES, maxAltitude)))
+        azimuths = np.concatenate((around, around))
+    else:
+        width = (maxAzimuth - minAzimuth) % 360.0 or 360.0
+        around = minAzimuth + edge * width
+        up = minAltitude + edge * (maxAltitude - minAltitude)
+        altitudes = np.concatenate((np.full(EDGE_SAMPLES, minAltitude), np.full(EDGE_SAMPLES, maxAltitude), up, up))
+        azimuths = np.concatenate((around, around, np.full(EDGE_SAMPLES, minAzimuth), np.full(EDGE_SAMPLES, maxAzimuth)))
+    dec, lha = _equatorial(lat, np.radians(altitudes), np.radians(azimuths))
+    # declination limits come from the window's exact distance to each pole
+    decMin = -90.0 + _poleDistance(-lat, 180.0, minAltitude, maxAltitude, minAzimuth, maxAzimuth) - MARGIN_DEGREES
+    decMax = 90.0 - _poleDistance(lat, 0.0, minAltitude, maxAltitude, minAzimuth, maxAzimuth) + MARGIN_DEGREES
+
+    # a celestial pole inside the window, or inside the ring a whole-horizon window
+    # makes around the zenith, takes in every SHA around it
+    wholeCircle = False
+    for poleAltitude, poleAzimuth, poleDec in ((lat, 0.0, 90.0), (-lat, 180.0, -90.0)):
+        if minAltitude <= poleAltitude <= maxAltitude and _sectorHas(poleAzimuth, minAzimuth, maxAzimuth):
+            decMin, decMax = min(decMin, poleDec), max(decMax, poleDec)
+            wholeCircle = True
+        elif minAzimuth is None and poleAltitude > maxAltitude:
+            wholeCircle = True
+    if wholeCircle or max(abs(decMin), abs(decMax)) >= 90.0 - MARGIN_DEGREES:
+        return decMin, decMax, [(0.0, 360.0)]
+
+    # SHA relative to the zenith's, measured so that neither end falls inside the window:
+    # the upper meridian (LHA 0) runs from each pole up through the zenith and the lower
+    # meridian (LHA 180) from each pole down through the nadir
+    northUp, southUp = _sectorHas(0.0, minAzimuth, maxAzimuth), _sectorHas(180.0, minAzimuth, maxAzimuth)
+    crossesUpper = (northUp and maxAltitude > lat) or (southUp and maxAltitude > -lat)
+    crossesLower = (northUp and minAltitude < lat) or (southUp and minAltitude < -lat)
+    if crossesUpper and crossesLower:
+        return decMin, decMax, [(0.0, 360.0)]
+    shaZenith = -(ghaAries + long)
+    if crossesLower:
+        relative = lha % 360.0
+    else:
+        relative = (lha + 180.0) % 360.0 - 180.0
+    slack = MARGIN_DEGREES / math.cos(math.radians(max(abs(decMin), abs(decMax))))
+    lowRelative = relative.min() - slack
+    highRelative = relative.max() + slack
+    if highRelative - lowRelative >= 360.0:
+        return decMin, decMax, [(0.0, 360.0)]
+    low = (shaZenith + lowRelative) % 360.0
+    high = low + (highRelative - lowRelative)
+    if high <= 360.0:
+        return decMin, decMax, [(low, high)]
+    return decMin, decMax, [(low, 360.0), (0.0, high - 360.0)]
+
+def _poleDistance(poleAltitude, poleAzimuth, minAltitude, maxAltitude, minAzimuth, maxAzimuth):
+    # angular distance in degrees from a pole at (poleAltitude, poleAzimuth) to the window
+    if _sectorHas(poleAzimuth, minAzimuth, maxAzimuth):
+        return abs(poleAltitude - min(max(poleAltitude, minAltitude), maxAltitude))
+    # otherwise the nearest point is on one of the sector's edges, where
+    # cos(distance) = sin(h) a + cos(h) b peaks at h = atan2(a, b)
+    a = math.sin(math.radians(poleAltitude))
+    nearest = -1.0
+    for edge in (minAzimuth, maxAzimuth):
+        b = math.cos(math.radians(poleAltitude)) * math.cos(math.radians(edge - poleAzimuth))
+        peak = math.degrees(math.atan2(a, b))
+        for h in (minAltitude, maxAltitude, min(max(peak, minAltitude), maxAltitude)):
+            nearest = max(nearest, math.sin(math.radians(h)) * a + math.cos(math.radians(h)) * b)
+    return math.degrees(math.acos(min(nearest, 1.0)))
+
+def _equatorial(lat, altitude, azimuth):
+    # horizon (altitude, azimuth) radians at latitude lat degrees -> (dec, LHA) degrees
+    sinLat, cosLat = math.sin(math.radians(lat)), math.cos(math.radians(lat))
+    east = np.cos(altitude) * np.sin(azimuth)
+    north = np.cos(altitude) * np.cos(azimuth)
+    up = np.sin(altitude)
+    x = up * cosLat - north * sinLat
+    z = up * sinLat + north * cosLat
+    dec = np.degrees(np.arcsin(np.clip(z, -1.0, 1.0)))
+    lha = np.degrees(np.arctan2(-east, x)) % 360.0
+    return dec, lha
+
+def _altitudeAzimuth(lhaOffset, lat, sha, sinDec, cosDec):
+    # altitude and true azimuth in degrees of stars at sha, where LHA = lhaOffset + sha
+    sinLat, cosLat = math.sin(math.radians(lat)), math.cos(math.radians(lat))
+    lha = np.radians(lhaOffset + sha)
+    cosLha = np.cos(lha)
+    sinAltitude = sinDec * sinLat + cosDec * cosLat * cosLha
+    altitude = np.degrees(np.arcsin(np.clip(sinAltitude, -1.0, 1.0)))
+    azimuth = np.degrees(np.arctan2(-cosDec * np.sin(lha), sinDec * cosLat - cosDec * sinLat * cosLha)) % 360.0
+    return altitude, azimuth
+
+def _sectorHas(azimuth, minAzimuth, maxAzimuth):
+    return minAzimuth is None or bool(_inSector(np.array([azimuth]), minAzimuth, maxAzimuth)[0])
+
+def _inSector(azimuth, minAzimuth, maxAzimuth):
+    width = (maxAzimuth - minAzimuth) % 360.0 or 360.0
+    return (azimuth - minAzimuth) % 360.0 <= width
+
+_defaultIndex = None
+
+def defaultIndex():
+    # built on first use over the default catalog
+    global _defaultIndex
+    if _defaultIndex is None:
+        _defaultIndex = SkyIndex(catalog.defaultCatalog())
+    return _defaultIndex
+
+def visible(values):
+    output = values.copy()
+    output.update(_compute(values))
+    return output
+
+def _compute(values):
+    output = {}
+
+    if 'stars' in values:
+        output['error'] = 'stars already exists in the input'
+        return output
+
+    if 'assumedLat' not in values or 'assumedLong' not in values:
+        output['error'] = 'mandatory information is missing'
+        return output
+
+    ghaAries, error = predict.ghaAriesFromValues(values)
+    if error is not None:
+        output['error'] = error
+        return output
+
+    lat = util.parseAngle(values['assumedLat'], -89, 90)
+    if lat is None:
+        output['error'] = 'assumedLat is invalid'
+        return output
+    long = util.parseAngle(values['assumedLong'], 0, 360)
+    if long is None:
+        output['error'] = 'assumedLong is invalid'
+        return output
+
+    window = {}
+    for key, default, minDegrees, maxDegrees in (('minAltitude', 15.0, 0, 90), ('maxAltitude', 65.0, 0, 91),
+                                                 ('minAzimuth', None, 0, 360), ('maxAzimuth', None, 0, 360)):
+        window[key] = default
+        if key in values:
+            window[key] = util.parseAngle(values[key], minDegrees, maxDegrees)
+            if window[key] is None:
+                output['error'] = key + ' is invalid'
+                return output
+    if window['minAltitude'] > window['maxAltitude']:
+        output['error'] = 'maxAltitude is invalid'
+        return output
+    if (window['minAzimuth'] is None) != (window['maxAzimuth'] is None):
+        output['error'] = 'mandatory information is missing'
+        return output
+
+    index = defaultIndex()
+    rows, altitudes, azimuths = index.query(ghaAries, lat, long, **window)
+    order = np.argsort(-altitudes, kind='stable')
+    output['stars'] = [{'body': index.catalog.names[int(rows[i])],
+                        'altitude': util.formatAlt(float(altitudes[i])),
+                        'azimuth': util.formatAndNormalizeAlt(float(azimuths[i]))} for i in order]
+    return output
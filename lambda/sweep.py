@@ -0,0 +1,96 @@
+import math
+import numpy as np
+import util
+import vector
+
+# correct over a grid of assumed positions: every sighting is reduced from every
+# grid point, giving the correctedDistance/correctedAzimuth surfaces a plot of
+# candidate positions needs in one request instead of one request per point
+
+# grid points times sightings, each of which adds a distance and an azimuth string
+# to the output: 200,000 results come to about 4 MB of JSON, inside Lambda's 6 MB
+# response limit, and half a second of work
+MAX_RESULTS = 200000
+
+def sweep(values):
+    output = values.copy()
+    output.update(_compute(values))
+    return output
+
+def _compute(values):
+    output = {}
+
+    if 'grid' in values:
+        output['error'] = 'grid already exists in the input'
+        return output
+
+    keys = ('sightings', 'minAssumedLat', 'maxAssumedLat', 'minAssumedLong', 'maxAssumedLong', 'step')
+    if any(key not in values for key in keys):
+        output['error'] = 'mandatory information is missing'
+        return output
+
+    # sightings: the lat, long and altitude correct takes, one dict per sight
+    sightings = values['sightings']
+    if not isinstance(sightings, list) or not sightings:
+        output['error'] = 'sightings is invalid'
+        return output
+    try:
+        columns = [[sighting[key] for sighting in sightings] for key in ('lat', 'long', 'altitude')]
+    except (KeyError, TypeError):
+        output['error'] = 'sightings is invalid'
+        return output
+
+    bounds = {}
+    for key, minDegrees, maxDegrees in (('minAssumedLat', -89, 90), ('maxAssumedLat', -89, 90),
+                                        ('minAssumedLong', 0, 360), ('maxAssumedLong', 0, 360)):
+        bounds[key] = util.parseAngle(values[key], minDegrees, maxDegrees)
+        if bounds[key] is None:
+            output['error'] = key + ' is invalid'
+            return output
+    if bounds['maxAssumedLat'] < bounds['minAssumedLat']:
+        output['error'] = 'maxAssumedLat is invalid'
+        return output
+
+    # step: grid spacing in arcminutes
+    try:
+        step = util.arcminToDegrees(float(values['step']))
+    except (TypeError, ValueError):
+        output['error'] = 'step is invalid'
+        return output
+    # inf and 1e400 are floats, but no spacing
+    if not (math.isfinite(step) and step > 0.0):
+        output['error'] = 'step is invalid'
+        return output
+
+    # a longitude range whose max is below its min runs east through 0d0.0
+    longSpan = (bounds['maxAssumedLong'] - bounds['minAssumedLong']) % 360.0
+    latCount = _count(bounds['maxAssumedLat'] - bounds['minAssumedLat'], step)
+    longCount = _count(longSpan, step)
+    if latCount * longCount * len(sightings) > MAX_RESULTS:
+        output['error'] = 'grid is too large'
+        return output
+    assumedLats = bounds['minAssumedLat'] + np.arange(latCount) * step
+    assumedLongs = np.mod(bounds['minAssumedLong'] + np.arange(longCount) * step, 360.0)
+
+    errors, tiles = vector.correctGrid(columns[0], columns[1], columns[2], assumedLats, assumedLongs)
+    if errors.any():
+        output['error'] = 'sightings is invalid'
+        return output
+
+    distances, azimuths = [], []
+    for first, distance, azimuth in tiles:
+        distances.extend(np.round(distance).astype(int).astype(str).tolist())
+        azimuths.extend(vector.formatAndNormalizeAlt(azimuth).tolist())
+    output['grid'] = {
+        'assumedLat': [util.formatAlt(lat) for lat in assumedLats.tolist()],
+        'assumedLong': vector.formatAndNormalizeAlt(assumedLongs).tolist(),
+        'correctedDistance': distances,
+        'correctedAzimuth': azimuths
+    }
+    return output
+
+def _count(span, step):
+    # grid points from 0 to span inclusive, allowing for rounding in span / step;
+    # past MAX_RESULTS the count only has to be too many, which a tiny step whose
+    # span / step is inf still is
+    return int(min(span / step + 1e-9, MAX_RESULTS)) + 1
@@ -1,5 +1,14 @@
+import math
+import json
+import pickle
+import importlib
 from unittest import TestCase
 from .. import dispatch as nav
+from .. import vector
+from .. import catalog
+from .. import util
+from .. import schema
+from .. import lambda_function
 
 class DispatchTest(TestCase):
     # -----------------------------------------------------------------------
@@ -614,3 +623,1341 @@ class DispatchTest(TestCase):
             'assumedLong': '74d35.3',
         }
         self.assertDictEqual(nav.dispatch(input), output)
+
+
+#---- Unit tests
+#
+# 500 dispatchBatch
+#     Analysis
+#        inputs:
+#            valuesList ->  list of dicts, each handled as dispatch would handle it
+#     Happy path:
+#            dispatchBatch([validDict, ...]) -> list of dispatch results in input order, the same
+#                                                 whether an op's group runs scalar or through vector
+#     Sad path:
+#            dispatchBatch(notAList) -> dictionary with an error
+#            dispatchBatch([invalidDict, ...]) -> that item's dispatch error, rest unaffected
+#
+    # Happy path
+    def test500_010_ShouldReturnResultsInInputOrder(self):
+        input = [
+            {'observation': '42d0.0', 'op': 'adjust'},
+            {'op': 'predict', 'body': 'Betelgeuse', 'date': '2016-01-17', 'time': '03:15:42'},
+            {'op': 'correct', 'lat': '89d20.1', 'long': '154d5.4', 'altitude': '37d17.4',
+             'assumedLat': '35d59.7', 'assumedLong': '74d35.3'},
+            {'op': 'predict', 'body': 'Nunki', 'date': '2011-04-05'}
+        ]
+        expected = [nav.dispatch(dict(values)) for values in input]
+        self.assertListEqual(nav.dispatchBatch(input), expected)
+
+    def test500_020_ShouldShareRepeatedRequests(self):
+        values = {'op': 'predict', 'body': 'Betelgeuse', 'date': '2016-01-17', 'time': '03:15:42'}
+        output = nav.dispatchBatch([values, dict(values), dict(values, body='betelgeuse')])
+        self.assertEqual([result['long'] for result in output], ['75d53.6'] * 3)
+        self.assertEqual(output[2]['body'], 'betelgeuse')
+        output[0]['long'] = 'changed'
+        self.assertEqual(output[1]['long'], '75d53.6')
+
+    def test500_030_ShouldMatchDispatchThroughVectorPaths(self):
+        from .. import adjust, correct
+        rows = max(adjust.NUMPY_BATCH, correct.NUMPY_BATCH)
+        input = []
+        for index in range(rows):
+            input.append({'op': 'adjust', 'observation': '%dd%d.%d' % (5 + index % 80, index % 60, index % 10),
+                          'height': str(index % 20), 'horizon': ('natural', 'Artificial')[index % 2]})
+            input.append({'op': 'correct', 'lat': '%dd%d.0' % (index % 120 - 60, index % 60), 'long': '%dd0.0' % (index % 360),
+                          'altitude': '%dd30.0' % (5 + index % 80), 'assumedLat': '35d59.7', 'assumedLong': '74d35.3'})
+        input[:8] = [{'op': 'adjust', 'observation': '0d0.0'}, {'op': 'adjust', 'observation': '30d1.5', 'height': 'nan'},
+                     {'op': 'adjust', 'observation': '30d1.5', 'temperature': 85}, {'op': 'adjust', 'observation': '89d59.9'},
+                     {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3',
+                      'assumedLat': '35d59.7', 'assumedLong': '74d35.3', 'method': 'table'},
+                     {'op': 'correct', 'lat': '0d0.1', 'long': '95d41.6', 'altitude': '13d42.3',
+                      'assumedLat': '35d59.7', 'assumedLong': '74d35.3'},
+                     {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': 13.7,
+                      'assumedLat': '35d59.7', 'assumedLong': '74d35.3'},
+                     {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3',
+                      'assumedLat': '35d59.7', 'assumedLong': '74d35.3', 'correctedAzimuth': '0d0.0'}]
+        expected = [nav.dispatch(dict(values)) for values in input]
+        self.assertListEqual(nav.dispatchBatch(input), expected)
+
+    # Sad path
+    def test500_910_ShouldReturnErrorIfInputIsNotList(self):
+        self.assertDictEqual(nav.dispatchBatch(42), {'error': 'parameter is not a list'})
+        self.assertDictEqual(nav.dispatchBatch(), {'error': 'parameter is missing'})
+
+    def test500_920_ShouldReturnPerItemErrors(self):
+        input = [
+            {'op': 'unknown'},
+            42,
+            {'op': 'predict', 'body': 'Betelgeuse', 'date': '2016-1-17'},
+            {'op': 'adjust', 'observation': '42d0.0'}
+        ]
+        output = nav.dispatchBatch(input)
+        self.assertEqual(output[0]['error'], 'op is not a legal operation')
+        self.assertEqual(output[1]['error'], 'parameter is not a dictionary')
+        self.assertEqual(output[2]['error'], 'date is invalid')
+        self.assertEqual(output[3]['altitude'], '41d59.0')
+
+
+#---- Unit tests
+#
+# 600 vector.adjust
+#     Analysis
+#        inputs:
+#            observation, height, temperature, pressure, horizon -> columns or scalars broadcast to every row
+#     Happy path:
+#            vector.adjust(validColumns) -> altitudes matching adjust row for row, error codes of 0
+#     Sad path:
+#            vector.adjust(invalidColumns) -> NaN altitude and the code of the first failed check on that row
+#
+    # Happy path
+    def test600_010_ShouldMatchScalarAdjust(self):
+        altitude, errors = vector.adjust(['30d1.5', '42d0.0'], [19.0, 0], [85, 72], [1000, 1010], ['artificial', 'Natural'])
+        self.assertListEqual(list(errors), [0, 0])
+        self.assertListEqual(list(vector.formatAlt(altitude)), ['29d59.9', '41d59.0'])
+
+    def test600_020_ShouldAcceptDegreeColumns(self):
+        altitude, errors = vector.adjust([42.0], 0)
+        self.assertListEqual(list(vector.formatAlt(altitude)), ['41d59.0'])
+
+    # Sad path
+    def test600_910_ShouldReturnPerRowErrors(self):
+        altitude, errors = vector.adjust(['101d15.2', '45d15.2', '45d15.2', '45d15.2', '45d1.25', '0d0.1'],
+                                         ['6', 'a', '6', '-1', '6', '6'], 71, 1010,
+                                         ['natural', 'natural', '   ', 'natural', 'natural', 'natural'])
+        messages = [vector.ADJUST_ERRORS[code] for code in errors]
+        self.assertListEqual(messages, ['observation is invalid', 'height is invalid', 'horizon is invalid',
+                                        'height must be greater than 0', 'observation is invalid',
+                                        'observation is invalid'])
+        self.assertTrue(all(value != value for value in altitude))
+
+    def test600_920_ShouldRejectWhatScalarRejects(self):
+        angles = ['30d0', '45d5', '30d', '30d5.', '30d1.55', '30d1.0 ', '30d+1.0', '30d1_0.0', '3_0d1.0',
+                  '30d1d0.0', '++30d1.0', '30d1.0', ' 30 d 1.0', '30d.5', '+30d1.0']
+        altitude, errors = vector.adjust(angles)
+        self.assertListEqual([vector.ADJUST_ERRORS[code] for code in errors],
+                             [nav.dispatch({'op': 'adjust', 'observation': angle}).get('error') for angle in angles])
+        self.assertListEqual([code != 0 for code in errors], [True] * 11 + [False] * 4)
+
+    def test600_930_ShouldRejectNanHeightAndHorizonObservationAsScalarDoes(self):
+        observations, heights = ['30d1.5', '0d0.0', '-0d0.0'], ['nan', '6', '6']
+        altitude, errors = vector.adjust(observations, heights)
+        self.assertListEqual([vector.ADJUST_ERRORS[code] for code in errors],
+                             [nav.dispatch({'op': 'adjust', 'observation': observation, 'height': height}).get('error')
+                              for observation, height in zip(observations, heights)])
+        self.assertListEqual([vector.ADJUST_ERRORS[code] for code in errors],
+                             ['height must be greater than 0', 'observation is invalid', 'observation is invalid'])
+
+
+#---- Unit tests
+#
+# 700 predict series
+#     Analysis
+#        inputs:
+#            values ->  dict with a body and either 'times' (list of ISO timestamps)
+#                       or 'start', 'end' (ISO timestamps) and 'step' (seconds)
+#     Happy path:
+#            predict(seriesDict) -> dictionary with lat and a list of longs, one per instant
+#     Sad path:
+#            predict(invalidSeriesDict) -> dictionary with an error corresponding to the invalid element
+#
+    # Happy path
+    def test700_010_ShouldPredictEachTime(self):
+        input = {'op': 'predict', 'body': 'Betelgeuse', 'times': ['2016-01-17T03:15:42', '2011-04-05T00:00:00']}
+        output = nav.dispatch(input)
+        self.assertEqual(output['lat'], '7d24.3')
+        self.assertListEqual(output['long'], [
+            '75d53.6',
+            nav.dispatch({'op': 'predict', 'body': 'Betelgeuse', 'date': '2011-04-05'})['long']
+        ])
+
+    def test700_020_ShouldPredictRangeInclusive(self):
+        input = {'op': 'predict', 'body': 'Betelgeuse', 'start': '2016-01-17T03:15:42',
+                 'end': '2016-01-17T03:20:42', 'step': '60'}
+        output = nav.dispatch(input)
+        self.assertEqual(len(output['long']), 6)
+        self.assertEqual(output['long'][0], '75d53.6')
+        self.assertEqual(output['long'][5], nav.dispatch({'op': 'predict', 'body': 'Betelgeuse',
+                                                          'date': '2016-01-17', 'time': '03:20:42'})['long'])
+
+    def test700_030_ShouldKeepSeriesApartInBatch(self):
+        first = {'op': 'predict', 'body': 'Betelgeuse', 'start': '2016-01-17T03:15:42',
+                 'end': '2016-01-17T03:20:42', 'step': '60'}
+        second = dict(first, start='2016-01-17T03:16:42', step='120')
+        outputs = nav.dispatchBatch([first, second])
+        self.assertListEqual(outputs, [nav.dispatch(first), nav.dispatch(second)])
+        self.assertEqual(len(outputs[0]['long']), 6)
+        self.assertEqual(len(outputs[1]['long']), 3)
+
+    # Sad path
+    def test700_910_ShouldReturnInvalidTimesError(self):
+        output = nav.dispatch({'op': 'predict', 'body': 'Betelgeuse', 'times': ['2016-13-17T03:15:42']})
+        self.assertEqual(output['error'], 'times is invalid')
+        output = nav.dispatch({'op': 'predict', 'body': 'Betelgeuse', 'times': ['2000-01-17T03:15:42']})
+        self.assertEqual(output['error'], 'date is invalid')
+
+    def test700_920_ShouldReturnInvalidRangeError(self):
+        input = {'op': 'predict', 'body': 'Betelgeuse', 'start': '2016-01-17', 'end': '2016-01-16', 'step': '60'}
+        self.assertEqual(nav.dispatch(input)['error'], 'end is invalid')
+        input = {'op': 'predict', 'body': 'Betelgeuse', 'start': '2016-01-17', 'end': '2016-01-18', 'step': '0'}
+        self.assertEqual(nav.dispatch(input)['error'], 'step is invalid')
+        input = {'op': 'predict', 'body': 'Betelgeuse', 'start': '2016-01-17', 'end': '2017-01-18', 'step': '1'}
+        self.assertEqual(nav.dispatch(input)['error'], 'series is too long')
+
+    def test700_930_ShouldRejectNatEndsAndNonFiniteStep(self):
+        series = {'op': 'predict', 'body': 'Betelgeuse', 'start': '2016-01-17', 'end': '2016-01-18', 'step': '60'}
+        for start in ('', 'NaT', 'nat'):
+            self.assertEqual(nav.dispatch(dict(series, start=start))['error'], 'start is invalid')
+            self.assertEqual(nav.dispatch(dict(series, end=start))['error'], 'end is invalid')
+        for step in (float('inf'), float('nan'), 1e400, '1e400'):
+            self.assertEqual(nav.dispatch(dict(series, step=step))['error'], 'step is invalid')
+        output = nav.dispatch({'op': 'predict', 'body': 'Betelgeuse', 'times': ['2016-01-17T03:15:42', 'NaT']})
+        self.assertEqual(output['error'], 'times is invalid')
+
+
+#---- Unit tests
+#
+# 800 predictAll
+#     Analysis
+#        inputs:
+#            values ->  dict with optional date and time, as for predict
+#     Happy path:
+#            predictAll(validDict) -> dictionary with a stars element mapping every catalog star to its lat/long
+#     Sad path:
+#            predictAll(invalidDict) -> dictionary with an error corresponding to the invalid element
+#
+    # Happy path
+    def test800_010_ShouldPredictEveryStar(self):
+        input = {'op': 'predictAll', 'date': '2016-01-17', 'time': '03:15:42'}
+        output = nav.dispatch(input)
+        self.assertEqual(len(output['stars']), 59)
+        self.assertDictEqual(output['stars']['Betelgeuse'], {'lat': '7d24.3', 'long': '75d53.6'})
+        procyon = nav.dispatch({'op': 'predict', 'body': 'Procyon', 'date': '2016-01-17', 'time': '03:15:42'})
+        self.assertEqual(output['stars']['Procyon']['long'], procyon['long'])
+
+    # Sad path
+    def test800_910_ShouldReturnInvalidDateError(self):
+        output = nav.dispatch({'op': 'predictAll', 'date': '2016-01-7'})
+        self.assertEqual(output['error'], 'date is invalid')
+
+    def test800_920_ShouldReturnStarsExistsError(self):
+        output = nav.dispatch({'op': 'predictAll', 'stars': {}})
+        self.assertEqual(output['error'], 'stars already exists in the input')
+
+
+#---- Unit tests
+#
+# 900 catalog
+#     Analysis
+#        inputs:
+#            body ->  star name, any case
+#     Happy path:
+#            catalog.find(name) -> row of the star's parsed SHA/declination
+#     Sad path:
+#            catalog.find(unknownOrNonString) -> None
+#
+    # Happy path
+    def test900_010_ShouldFindStarInAnyCase(self):
+        row = catalog.find('RIGIL KENT.')
+        self.assertEqual(catalog.names[row], 'Rigil Kent.')
+        self.assertEqual(catalog.decText[row], '-60d53.6')
+        self.assertAlmostEqual(catalog.sha[row], 139 + 49.6 / 60)
+        self.assertAlmostEqual(catalog.sinDec[row] ** 2 + catalog.cosDec[row] ** 2, 1.0)
+
+    def test900_020_ShouldPredictMultiWordStar(self):
+        output = nav.dispatch({'op': 'predict', 'body': 'kaus aust.', 'date': '2016-01-17', 'time': '03:15:42'})
+        self.assertEqual(output['lat'], '-34d22.4')
+
+    # Sad path
+    def test900_910_ShouldNotFindUnknownStar(self):
+        self.assertIsNone(catalog.find('Unknown'))
+        self.assertIsNone(catalog.find(42))
+        output = nav.dispatch({'op': 'predict', 'body': ''})
+        self.assertEqual(output['error'], 'star not in catalog')
+
+    def test900_930_ShouldNotFindUnencodableStar(self):
+        self.assertIsNone(catalog.find('\udcff'))
+        output = nav.dispatch({'op': 'predict', 'body': 'Vega\udcff'})
+        self.assertEqual(output['error'], 'star not in catalog')
+
+    def test900_030_ShouldRoundTripCompiledCatalog(self):
+        import os
+        import tempfile
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'test.cat')
+        catalog.writeCatalog([('Vega', '80d38.2', '38d48.1'), ('Kaus Aust.', '83d41.9', '-34d22.4')], path)
+        compiled = catalog.Catalog(path)
+        self.assertEqual(len(compiled), 2)
+        self.assertEqual(compiled.find('KAUS AUST.'), 1)
+        self.assertEqual(compiled.decText[1], '-34d22.4')
+        self.assertAlmostEqual(compiled.dec[1], -(34 + 22.4 / 60))
+        self.assertListEqual(list(compiled.names), ['Vega', 'Kaus Aust.'])
+        self.assertIsNone(compiled.find('Deneb'))
+
+    def test900_920_ShouldRejectDuplicateStar(self):
+        import os
+        import tempfile
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'test.cat')
+        with self.assertRaises(ValueError):
+            catalog.writeCatalog([('Vega', '80d38.2', '38d48.1'), ('VEGA', '80d38.2', '38d48.1')], path)
+
+
+#---- Unit tests
+#
+# 1000 visible
+#     Analysis
+#        inputs:
+#            values ->  dict with assumedLat, assumedLong, optional date/time as for predict,
+#                       optional minAltitude/maxAltitude (default 15d0.0/65d0.0) and
+#                       minAzimuth/maxAzimuth (default the whole horizon)
+#     Happy path:
+#            visible(validDict) -> dictionary with a stars list of body/altitude/azimuth, highest first
+#     Sad path:
+#            visible(invalidDict) -> dictionary with an error corresponding to the invalid element
+#
+    # Happy path
+    def test1000_010_ShouldListStarsInWindow(self):
+        input = {'op': 'visible', 'date': '2016-01-17', 'time': '03:15:42',
+                 'assumedLat': '35d59.7', 'assumedLong': '74d35.3'}
+        stars = nav.dispatch(input)['stars']
+        altitudes = [vector.parseAngles([star['altitude']], 0, 91)[0][0] for star in stars]
+        self.assertTrue(all(15.0 <= altitude <= 65.0 for altitude in altitudes))
+        self.assertListEqual(altitudes, sorted(altitudes, reverse=True))
+        # the index finds exactly the stars a full scan of the catalog finds
+        window = [nav.dispatch({'op': 'predict', 'body': name, 'date': '2016-01-17', 'time': '03:15:42'})
+                  for name in catalog.names]
+        lat = 35 + 59.7 / 60
+        expected = set()
+        for name, star in zip(catalog.names, window):
+            dec = vector.parseAngles([star['lat']], -89, 90)[0][0]
+            lha = math.radians(vector.parseAngles([star['long']], 0, 360)[0][0] + 74 + 35.3 / 60)
+            altitude = math.degrees(math.asin(math.sin(math.radians(dec)) * math.sin(math.radians(lat)) +
+                                              math.cos(math.radians(dec)) * math.cos(math.radians(lat)) * math.cos(lha)))
+            if 15.0 <= altitude <= 65.0:
+                expected.add(name)
+        self.assertSetEqual(set(star['body'] for star in stars), expected)
+
+    def test1000_020_ShouldRestrictToAzimuthSector(self):
+        input = {'op': 'visible', 'date': '2016-01-17', 'time': '03:15:42', 'assumedLat': '35d59.7',
+                 'assumedLong': '74d35.3', 'minAzimuth': '90d0.0', 'maxAzimuth': '180d0.0'}
+        stars = nav.dispatch(input)['stars']
+        self.assertListEqual([star['body'] for star in stars], ['Rasalhague', 'Sabik', 'Altair', 'Antares'])
+        self.assertDictEqual(stars[0], {'body': 'Rasalhague', 'altitude': '57d52.1', 'azimuth': '130d39.4'})
+
+    # Sad path
+    def test1000_910_ShouldReturnMandatoryMissingError(self):
+        output = nav.dispatch({'op': 'visible', 'assumedLat': '35d59.7'})
+        self.assertEqual(output['error'], 'mandatory information is missing')
+
+    def test1000_920_ShouldReturnInvalidWindowError(self):
+        input = {'op': 'visible', 'assumedLat': '35d59.7', 'assumedLong': '74d35.3', 'minAltitude': '70d0.0'}
+        self.assertEqual(nav.dispatch(input)['error'], 'maxAltitude is invalid')
+        input = {'op': 'visible', 'assumedLat': '95d59.7', 'assumedLong': '74d35.3'}
+        self.assertEqual(nav.dispatch(input)['error'], 'assumedLat is invalid')
+
+
+#---- Unit tests
+#
+# 1100 locate
+#     Analysis
+#        inputs:
+#            values ->  dict with assumedLat, assumedLong and corrections, a list of
+#                       correct's outputs: the body's long with correctedDistance/correctedAzimuth
+#     Happy path:
+#            locate(validDict) -> dictionary with presentLat, presentLong and the RMS residual as precision
+#            bodies west of the meridian are placed by their LHA as well as those east of it
+#     Sad path:
+#            locate(invalidDict) -> dictionary with an error corresponding to the invalid element
+#
+    # Happy path
+    def test1100_010_ShouldSolveFix(self):
+        input = {
+            'op': 'locate',
+            'assumedLat': '35d59.7',
+            'assumedLong': '74d35.3',
+            'corrections': [
+                {'long': '200d0.0', 'correctedDistance': '6', 'correctedAzimuth': '30d0.0'},
+                {'long': '200d0.0', 'correctedDistance': '-11', 'correctedAzimuth': '150d0.0'},
+                {'long': '50d0.0', 'correctedDistance': '5', 'correctedAzimuth': '90d0.0'}
+            ]
+        }
+        output = nav.dispatch(input)
+        self.assertEqual(output['presentLat'], '36d9.5')
+        self.assertEqual(output['presentLong'], '74d29.1')
+        self.assertEqual(output['precision'], '0')
+
+    def test1100_020_ShouldFitManySightings(self):
+        from .. import locate
+        azimuths = [index * 7.0 for index in range(3000)]
+        distances = [math.cos(math.radians(azimuth)) * 10 - math.sin(math.radians(azimuth)) * 5 + (index % 3 - 1)
+                     for index, azimuth in enumerate(azimuths)]
+        north, east, precision = locate.solveFix(distances, azimuths)
+        self.assertAlmostEqual(north, 10, places=1)
+        self.assertAlmostEqual(east, -5, places=1)
+        self.assertAlmostEqual(precision, math.sqrt(2.0 / 3), places=1)
+
+    def test1100_030_ShouldSolveThousandsWellUnderAMillisecond(self):
+        import timeit
+        from .. import locate
+        azimuths = [index * 7.0 for index in range(3000)]
+        distances = [(index % 21) - 10.0 for index in range(3000)]
+        self.assertGreaterEqual(len(distances), locate.NUMPY_SIGHTINGS)
+        seconds = min(timeit.repeat(lambda: locate.solveFix(distances, azimuths), number=20, repeat=5)) / 20
+        self.assertLess(seconds, 1e-3)
+        few = locate.NUMPY_SIGHTINGS - 1
+        for fix, expected in zip(locate.solveFix(distances[:few], azimuths[:few]),
+                                 locate._solveFixNumpy(distances[:few], azimuths[:few])):
+            self.assertAlmostEqual(fix, expected)
+
+    def test1100_040_ShouldFixKnownPositionFromBodiesEitherSideOfMeridian(self):
+        from .. import reduction
+        # altitudes observed from 35d30.0 100d18.0, reduced from 35d0.0 100d0.0;
+        # the last three bodies are west of the meridian
+        bodies = (('10d0.0', '200d0.0'), ('40d0.0', '230d0.0'), ('-20d0.0', '250d0.0'),
+                  ('20d0.0', '300d0.0'), ('5d0.0', '320d0.0'), ('30d0.0', '330d0.0'))
+        corrections = []
+        for lat, long in bodies:
+            altitude, _ = reduction.reduce(35.5, util.parseAngle(lat, -90, 90), util.parseAngle(long, 0, 360) + 100.3)
+            corrections.append(nav.dispatch({'op': 'correct', 'lat': lat, 'long': long, 'altitude': util.formatAlt(altitude),
+                                             'assumedLat': '35d0.0', 'assumedLong': '100d0.0'}))
+        for sightings in (corrections[:3], corrections[3:], corrections):
+            output = nav.dispatch({'op': 'locate', 'assumedLat': '35d0.0', 'assumedLong': '100d0.0', 'corrections': sightings})
+            self.assertAlmostEqual(self.degrees1600(output['presentLat']), 35.5, delta=1.0 / 60)
+            self.assertAlmostEqual(self.degrees1600(output['presentLong']), 100.3, delta=1.0 / 60)
+        # and the same through the NumPy solve
+        output = nav.dispatch({'op': 'locate', 'assumedLat': '35d0.0', 'assumedLong': '100d0.0', 'corrections': corrections * 3})
+        self.assertAlmostEqual(self.degrees1600(output['presentLat']), 35.5, delta=1.0 / 60)
+        self.assertAlmostEqual(self.degrees1600(output['presentLong']), 100.3, delta=1.0 / 60)
+
+    # Sad path
+    def test1100_910_ShouldReturnMandatoryMissingError(self):
+        output = nav.dispatch({'op': 'locate', 'assumedLat': '35d59.7', 'assumedLong': '74d35.3'})
+        self.assertEqual(output['error'], 'mandatory information is missing')
+
+    def test1100_920_ShouldReturnInsufficientError(self):
+        input = {'op': 'locate', 'assumedLat': '35d59.7', 'assumedLong': '74d35.3',
+                 'corrections': [{'long': '200d0.0', 'correctedDistance': '6', 'correctedAzimuth': '30d0.0'}]}
+        self.assertEqual(nav.dispatch(input)['error'], 'corrections are insufficient')
+
+    def test1100_930_ShouldReturnInvalidCorrectionsError(self):
+        for azimuth in ('30d0', '30x0.0'):
+            input = {'op': 'locate', 'assumedLat': '35d59.7', 'assumedLong': '74d35.3',
+                     'corrections': [{'long': '200d0.0', 'correctedDistance': '6', 'correctedAzimuth': azimuth}]}
+            self.assertEqual(nav.dispatch(input)['error'], 'corrections is invalid')
+        # without the body's long there is no telling which side of the meridian it is on
+        for correction in ({'correctedDistance': '6', 'correctedAzimuth': '30d0.0'},
+                           {'long': '360d0.0', 'correctedDistance': '6', 'correctedAzimuth': '30d0.0'}):
+            input = {'op': 'locate', 'assumedLat': '35d59.7', 'assumedLong': '74d35.3', 'corrections': [correction]}
+            self.assertEqual(nav.dispatch(input)['error'], 'corrections is invalid')
+
+
+#---- Unit tests
+#
+# 1200 track
+#     Analysis
+#        inputs:
+#            values ->  dict with course, speed, sightings (correct's output, with the body's long,
+#                       plus date and time) and optionally the track state a previous call returned
+#     Happy path:
+#            track(validDict) -> dictionary with presentLat, presentLong, precision and track
+#            a sighting west of the meridian is placed by its LHA as one east of it is
+#     Sad path:
+#            track(invalidDict) -> dictionary with an error corresponding to the invalid element
+#
+    def sightings1200(self):
+        # LHA 274d0.0: east of the meridian, where correctedAzimuth is the bearing
+        return [
+            {'long': '200d0.0', 'assumedLat': '35d0.0', 'assumedLong': '74d0.0', 'correctedDistance': '3',
+             'correctedAzimuth': '0d0.0', 'date': '2016-03-01', 'time': '00:00:00'},
+            {'long': '200d0.0', 'assumedLat': '35d0.0', 'assumedLong': '74d0.0', 'correctedDistance': '0',
+             'correctedAzimuth': '90d0.0', 'date': '2016-03-01', 'time': '00:00:00'},
+            {'long': '200d0.0', 'assumedLat': '35d0.0', 'assumedLong': '74d0.0', 'correctedDistance': '13',
+             'correctedAzimuth': '0d0.0', 'date': '2016-03-01', 'time': '01:00:00'}
+        ]
+
+    # Happy path
+    def test1200_010_ShouldDeadReckonBetweenSightings(self):
+        input = {'op': 'track', 'course': '0d0.0', 'speed': '10', 'sightings': self.sightings1200()}
+        output = nav.dispatch(input)
+        self.assertEqual(output['presentLat'], '35d13.0')
+        self.assertEqual(output['presentLong'], '74d0.0')
+        self.assertEqual(output['precision'], '1')
+
+    def test1200_020_ShouldCarryStateAcrossCalls(self):
+        sightings = self.sightings1200()
+        whole = nav.dispatch({'op': 'track', 'course': '0d0.0', 'speed': '10', 'sightings': sightings})
+        state = None
+        for sighting in sightings:
+            input = {'op': 'track', 'course': '0d0.0', 'speed': '10', 'sightings': [sighting]}
+            if state is not None:
+                input['track'] = state
+            output = nav.dispatch(input)
+            state = output['track']
+        self.assertEqual(output['presentLat'], whole['presentLat'])
+        self.assertEqual(output['presentLong'], whole['presentLong'])
+        self.assertAlmostEqual(state['lat'], whole['track']['lat'])
+
+    def test1200_030_ShouldSignLatitudeJustSouthOfEquator(self):
+        sightings = [dict(sighting, assumedLat='0d10.0') for sighting in self.sightings1200()[:2]]
+        sightings[0].update(correctedDistance='20', correctedAzimuth='180d0.0')
+        output = nav.dispatch({'op': 'track', 'course': '0d0.0', 'speed': '0', 'sightings': sightings})
+        self.assertEqual(output['presentLat'], '-0d9.8')
+        self.assertLess(output['track']['lat'], 0)
+
+    def test1200_040_ShouldBearWestOfMeridianSightingsWest(self):
+        # Z 90 at LHA 124d0.0 bears 270: the same line of position as -6 toward 90 east of it
+        west = self.sightings1200()[:2]
+        west[1].update({'long': '50d0.0', 'correctedDistance': '6'})
+        east = self.sightings1200()[:2]
+        east[1].update({'correctedDistance': '-6'})
+        output = nav.dispatch({'op': 'track', 'course': '0d0.0', 'speed': '0', 'sightings': west})
+        expected = nav.dispatch({'op': 'track', 'course': '0d0.0', 'speed': '0', 'sightings': east})
+        self.assertLess(self.degrees1600(output['presentLong']), 74.0)
+        for key in ('presentLat', 'presentLong', 'precision'):
+            self.assertEqual(output[key], expected[key])
+
+    # Sad path
+    def test1200_910_ShouldReturnMandatoryMissingError(self):
+        output = nav.dispatch({'op': 'track', 'course': '0d0.0', 'sightings': self.sightings1200()})
+        self.assertEqual(output['error'], 'mandatory information is missing')
+
+    def test1200_920_ShouldReturnInvalidSpeedError(self):
+        output = nav.dispatch({'op': 'track', 'course': '0d0.0', 'speed': 'fast', 'sightings': self.sightings1200()})
+        self.assertEqual(output['error'], 'speed is invalid')
+
+    def test1200_930_ShouldReturnInvalidSightingsErrorOutOfOrder(self):
+        sightings = self.sightings1200()[::-1]
+        output = nav.dispatch({'op': 'track', 'course': '0d0.0', 'speed': '10', 'sightings': sightings})
+        self.assertEqual(output['error'], 'sightings is invalid')
+        # without the body's long there is no telling which side of the meridian it is on
+        sightings = self.sightings1200()
+        del sightings[1]['long']
+        output = nav.dispatch({'op': 'track', 'course': '0d0.0', 'speed': '10', 'sightings': sightings})
+        self.assertEqual(output['error'], 'sightings is invalid')
+
+    def test1200_940_ShouldReturnInvalidTrackError(self):
+        input = {'op': 'track', 'course': '0d0.0', 'speed': '10', 'sightings': self.sightings1200(),
+                 'track': {'lat': 35.0, 'long': 74.0}}
+        self.assertEqual(nav.dispatch(input)['error'], 'track is invalid')
+
+
+#---- Unit tests
+#
+# 1300 vector.correct
+#     Analysis
+#        inputs:
+#            lat, long, altitude ->  columns of 'DdM.M' strings or degrees
+#            assumedLat, assumedLong -> one assumed position shared by every row
+#     Happy path:
+#            correct(columns) -> distances and azimuths equal to correct.correct's, row by row
+#     Sad path:
+#            correct(invalidColumns) -> error codes naming correct.correct's error
+#
+    # Happy path
+    def test1300_010_ShouldMatchScalarCorrect(self):
+        lat = ['16d32.3', '89d20.1', '-53d38.4', '0d15.0', '45d0.0']
+        long = ['95d41.6', '154d5.4', '74d35.3', '359d59.9', '12d34.5']
+        altitude = ['13d42.3', '37d17.4', '40d0.0', '1d0.0', '89d59.9']
+        distance, azimuth, errors = vector.correct(lat, long, altitude, '-53d38.4', '74d35.3')
+        for row in range(len(lat)):
+            output = nav.dispatch({'op': 'correct', 'lat': lat[row], 'long': long[row], 'altitude': altitude[row],
+                                   'assumedLat': '-53d38.4', 'assumedLong': '74d35.3'})
+            self.assertEqual(errors[row], 0)
+            self.assertEqual(str(int(round(distance[row]))), output['correctedDistance'])
+            self.assertEqual(str(vector.formatAndNormalizeAlt(azimuth[row])), output['correctedAzimuth'])
+
+    def test1300_020_ShouldAcceptDegrees(self):
+        distance, azimuth, errors = vector.correct(['16d30.0'], ['95d30.0'], ['13d30.0'], '35d30.0', '74d30.0')
+        degreesDistance, degreesAzimuth, degreesErrors = vector.correct([16.5], [95.5], [13.5], 35.5, 74.5)
+        self.assertAlmostEqual(distance[0], degreesDistance[0])
+        self.assertAlmostEqual(azimuth[0], degreesAzimuth[0])
+        self.assertEqual(degreesErrors[0], 0)
+
+    def test1300_030_ShouldReadNegativeZeroDegreesAsScalarDoes(self):
+        self.assertEqual(util.parseAngle('-0d30.0', -89, 90), -0.5)
+        self.assertIsNone(util.parseAngle('-0d30.0', 0, 360))
+        distance, azimuth, errors = vector.correct(['-0d30.0', '16d32.3'], ['95d41.6', '-0d30.0'], '13d42.3',
+                                                   '-0d30.0', '74d35.3')
+        outputs = [nav.dispatch({'op': 'correct', 'lat': '-0d30.0', 'long': '95d41.6', 'altitude': '13d42.3',
+                                 'assumedLat': '-0d30.0', 'assumedLong': '74d35.3'}),
+                   nav.dispatch({'op': 'correct', 'lat': '16d32.3', 'long': '-0d30.0', 'altitude': '13d42.3',
+                                 'assumedLat': '-0d30.0', 'assumedLong': '74d35.3'})]
+        self.assertEqual(str(int(round(distance[0]))), outputs[0]['correctedDistance'])
+        self.assertEqual(str(vector.formatAndNormalizeAlt(azimuth[0])), outputs[0]['correctedAzimuth'])
+        self.assertEqual(vector.CORRECT_ERRORS[errors[1]], outputs[1]['error'])
+
+    # Sad path
+    def test1300_910_ShouldReportFirstInvalidField(self):
+        lat = ['90d0.0', '16d32.3', '16d32.3', '16d32.3', '16d32.3']
+        long = ['360d0.0', '95d41', '95d41.6', '0d0.1', '95d41.6']
+        altitude = ['0d30.0', '13d42.3', '0d30.0', '13d42.3', '13d42.3']
+        distance, azimuth, errors = vector.correct(lat, long, altitude, '35d59.7', '74d35.3')
+        self.assertEqual([vector.CORRECT_ERRORS[code] for code in errors],
+                         ['lat is invalid', 'long is invalid', 'altitude is invalid', 'long is invalid', None])
+        self.assertTrue(math.isnan(distance[0]))
+
+    def test1300_920_ShouldReportInvalidAssumedPosition(self):
+        distance, azimuth, errors = vector.correct(['16d32.3'] * 2, ['95d41.6'] * 2, ['13d42.3'] * 2, '35d59.7', '360d0.0')
+        self.assertEqual([vector.CORRECT_ERRORS[code] for code in errors], ['assumedLong is invalid'] * 2)
+
+
+#---- Unit tests
+#
+# 1400 sweep
+#     Analysis
+#        inputs:
+#            values ->  dict with sightings (lat, long, altitude), the assumed position
+#                       bounds minAssumedLat, maxAssumedLat, minAssumedLong, maxAssumedLong
+#                       and step in arcminutes
+#     Happy path:
+#            sweep(validDict) -> dictionary with grid, correct's results at every assumed position
+#     Sad path:
+#            sweep(invalidDict) -> dictionary with an error corresponding to the invalid element
+#
+    def sweep1400(self):
+        return {'op': 'sweep',
+                'sightings': [{'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3'},
+                              {'lat': '-53d38.4', 'long': '10d0.0', 'altitude': '40d0.0'}],
+                'minAssumedLat': '35d0.0', 'maxAssumedLat': '36d0.0',
+                'minAssumedLong': '359d0.0', 'maxAssumedLong': '1d0.0', 'step': '30'}
+
+    # Happy path
+    def test1400_010_ShouldMatchCorrectAtEveryGridPoint(self):
+        output = nav.dispatch(self.sweep1400())
+        grid = output['grid']
+        self.assertEqual(grid['assumedLat'], ['35d0.0', '35d30.0', '36d0.0'])
+        self.assertEqual(grid['assumedLong'], ['359d0.0', '359d30.0', '0d0.0', '0d30.0', '1d0.0'])
+        for i, assumedLat in enumerate(grid['assumedLat']):
+            for j, assumedLong in enumerate(grid['assumedLong']):
+                for k, sighting in enumerate(self.sweep1400()['sightings']):
+                    expected = nav.dispatch(dict(sighting, op='correct', assumedLat=assumedLat, assumedLong=assumedLong))
+                    self.assertEqual(grid['correctedDistance'][i][j][k], expected['correctedDistance'])
+                    self.assertEqual(grid['correctedAzimuth'][i][j][k], expected['correctedAzimuth'])
+
+    def test1400_020_ShouldTileWithoutChangingResults(self):
+        import numpy as np
+        assumedLats, assumedLongs = np.linspace(-60, 60, 41), np.linspace(0, 350, 36)
+        errors, whole = vector.correctGrid(['16d32.3'], ['95d41.6'], ['13d42.3'], assumedLats, assumedLongs)
+        errors, tiled = vector.correctGrid(['16d32.3'], ['95d41.6'], ['13d42.3'], assumedLats, assumedLongs, tile=100)
+        tiles = list(tiled)
+        self.assertGreater(len(tiles), 1)
+        self.assertTrue(np.array_equal(np.concatenate([distance for first, distance, azimuth in tiles]),
+                                       np.concatenate([distance for first, distance, azimuth in whole])))
+
+    # Sad path
+    def test1400_910_ShouldReturnMandatoryMissingError(self):
+        input = self.sweep1400()
+        del input['step']
+        self.assertEqual(nav.dispatch(input)['error'], 'mandatory information is missing')
+
+    def test1400_920_ShouldReturnInvalidSightingsError(self):
+        input = self.sweep1400()
+        input['sightings'][1]['altitude'] = '0d30.0'
+        self.assertEqual(nav.dispatch(input)['error'], 'sightings is invalid')
+
+    def test1400_930_ShouldReturnTooLargeError(self):
+        input = self.sweep1400()
+        input.update({'minAssumedLat': '-60d0.0', 'maxAssumedLat': '60d0.0', 'step': '1'})
+        self.assertEqual(nav.dispatch(input)['error'], 'grid is too large')
+
+    def test1400_940_ShouldCountSightingsTowardTooLarge(self):
+        input = self.sweep1400()
+        input.update({'minAssumedLat': '-60d0.0', 'maxAssumedLat': '60d0.0', 'step': '60'})
+        self.assertNotIn('error', nav.dispatch(input))
+        input['sightings'] = input['sightings'] * 300
+        self.assertEqual(nav.dispatch(input)['error'], 'grid is too large')
+
+    def test1400_950_ShouldReturnInvalidStepErrorForNonFiniteStep(self):
+        input = self.sweep1400()
+        for step in (float('inf'), float('nan'), 1e400, '1e400', 'inf', '0', '-30'):
+            input['step'] = step
+            self.assertEqual(nav.dispatch(input)['error'], 'step is invalid')
+        # a step so small that span / step is inf is only too many points
+        input['step'] = 1e-310
+        self.assertEqual(nav.dispatch(input)['error'], 'grid is too large')
+
+
+#---- Unit tests
+#
+# 1500 correct with method=table
+#     Analysis
+#        inputs:
+#            values ->  correct's dict plus method, 'direct' or 'table'
+#     Happy path:
+#            correct(tableDict) -> correctedDistance/correctedAzimuth interpolated from the reduction table
+#     Sad path:
+#            correct(invalidDict) -> dictionary with an error corresponding to the invalid element
+#
+    def useTable1500(self, step):
+        import os
+        import tempfile
+        reduction = importlib.import_module('reduction')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'test.tab')
+        reduction.writeTable(path, step)
+        previous = reduction._defaultTable
+        reduction._defaultTable = reduction.Table(path)
+        self.addCleanup(setattr, reduction, '_defaultTable', previous)
+        return reduction
+
+    # Happy path
+    def test1500_010_ShouldInterpolateCloseToDirect(self):
+        reduction = self.useTable1500(1.0)
+        table = reduction.defaultTable()
+        for lat, dec, lha in ((35.995, 16.54, 170.28), (-53.64, 16.54, 10.3), (12.5, -40.25, 300.0)):
+            hc, z = reduction.reduce(lat, dec, lha)
+            lookedHc, lookedZ = table.lookup(lat, dec, lha)
+            self.assertAlmostEqual(lookedHc, hc, delta=2.0 / 60)
+            self.assertAlmostEqual(lookedZ, z, delta=10.0 / 60)
+
+    def test1500_020_ShouldReturnTableResultsThroughCorrect(self):
+        self.useTable1500(1.0)
+        input = {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3',
+                 'assumedLat': '-53d38.4', 'assumedLong': '74d35.3'}
+        direct = nav.dispatch(dict(input))
+        looked = nav.dispatch(dict(input, method='table'))
+        self.assertEqual((looked['correctedDistance'], looked['correctedAzimuth']), ('3950', '164d42.8'))
+        # within 2 arcminutes of distance and 1 arcminute of azimuth of the direct reduction
+        self.assertLessEqual(abs(int(looked['correctedDistance']) - int(direct['correctedDistance'])), 2)
+        self.assertAlmostEqual(util.parseAngle(looked['correctedAzimuth'], 0, 360),
+                               util.parseAngle(direct['correctedAzimuth'], 0, 360), delta=1.0 / 60)
+
+    def test1500_030_ShouldFallBackNearZenith(self):
+        self.useTable1500(3.0)
+        input = {'op': 'correct', 'lat': '35d0.0', 'long': '0d0.0', 'altitude': '85d0.0',
+                 'assumedLat': '35d30.0', 'assumedLong': '0d30.0'}
+        self.assertEqual(nav.dispatch(dict(input, method='table')), dict(nav.dispatch(dict(input)), method='table'))
+
+    # Sad path
+    def test1500_910_ShouldReturnInvalidMethodError(self):
+        input = {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3',
+                 'assumedLat': '-53d38.4', 'assumedLong': '74d35.3', 'method': 'lookup'}
+        self.assertEqual(nav.dispatch(input)['error'], 'method is invalid')
+
+    def test1500_920_ShouldRejectStepNotDividing90(self):
+        with self.assertRaises(ValueError):
+            importlib.import_module('reduction').writeTable('unused.tab', 7.0)
+
+
+#---- Unit tests
+#
+# 1600 pipeline
+#     Analysis
+#        inputs:
+#            values ->  dict with assumedLat, assumedLong and sightings, each with adjust's
+#                       and predict's inputs (observation, height, ..., body, date, time)
+#     Happy path:
+#            pipeline(validDict) -> the fix of the position the sightings were observed from
+#     Sad path:
+#            pipeline(invalidDict) -> dictionary with the error the failing step reports
+#
+    def sightings1600(self):
+        return [{'body': 'Aldebaran', 'observation': '60d10.0', 'height': '6', 'date': '2016-01-17', 'time': '03:15:42'},
+                {'body': 'Sirius', 'observation': '37d0.0', 'height': '6', 'date': '2016-01-17', 'time': '03:15:42'},
+                {'body': 'Procyon', 'observation': '54d10.0', 'height': '6', 'date': '2016-01-17', 'time': '03:15:42'}]
+
+    def degrees1600(self, angle):
+        degrees, minutes = angle.split('d')
+        return (-1 if degrees.startswith('-') else 1) * (abs(int(degrees)) + float(minutes) / 60)
+
+    # Happy path
+    def test1600_010_ShouldFixKnownPosition(self):
+        from .. import adjust
+        from .. import reduction
+        # observations from 35d30.0 100d18.0, found by adjusting until the altitude is
+        # the one reduced there; Arcturus, Alphecca and Alioth are west of the meridian
+        sightings = []
+        for body in ('Arcturus', 'Alphecca', 'Alioth', 'Altair', 'Deneb', 'Enif'):
+            predicted = nav.dispatch({'op': 'predict', 'body': body, 'date': '2016-01-17', 'time': '03:15:42'})
+            altitude, _ = reduction.reduce(35.5, self.degrees1600(predicted['lat']), self.degrees1600(predicted['long']) + 100.3)
+            observation = altitude
+            for _ in range(3):
+                adjusted, _ = adjust.altitudeFromValues({'observation': util.formatAlt(observation), 'height': '6'})
+                observation += altitude - adjusted
+            sightings.append({'body': body, 'observation': util.formatAlt(observation), 'height': '6',
+                              'date': '2016-01-17', 'time': '03:15:42'})
+        for assumedLat, assumedLong in (('35d0.0', '100d0.0'), ('36d0.0', '101d0.0')):
+            output = nav.dispatch({'op': 'pipeline', 'assumedLat': assumedLat, 'assumedLong': assumedLong, 'sightings': sightings})
+            self.assertAlmostEqual(self.degrees1600(output['presentLat']), 35.5, delta=1.0 / 60)
+            self.assertAlmostEqual(self.degrees1600(output['presentLong']), 100.3, delta=1.0 / 60)
+            self.assertEqual(output['precision'], '0')
+
+    # Sad path
+    def test1600_910_ShouldReturnAdjustError(self):
+        sightings = self.sightings1600()
+        sightings[1]['observation'] = '95d0.0'
+        output = nav.dispatch({'op': 'pipeline', 'assumedLat': '36d0.0', 'assumedLong': '290d0.0', 'sightings': sightings})
+        self.assertEqual(output['error'], 'observation is invalid')
+
+    def test1600_920_ShouldReturnPredictError(self):
+        sightings = self.sightings1600()
+        sightings[2]['body'] = 'Unknown'
+        output = nav.dispatch({'op': 'pipeline', 'assumedLat': '36d0.0', 'assumedLong': '290d0.0', 'sightings': sightings})
+        self.assertEqual(output['error'], 'star not in catalog')
+
+    def test1600_930_ShouldReturnInsufficientError(self):
+        output = nav.dispatch({'op': 'pipeline', 'assumedLat': '36d0.0', 'assumedLong': '290d0.0',
+                               'sightings': self.sightings1600()[:1]})
+        self.assertEqual(output['error'], 'sightings are insufficient')
+
+    def test1600_940_ShouldReturnMandatoryMissingError(self):
+        output = nav.dispatch({'op': 'pipeline', 'assumedLat': '36d0.0', 'sightings': self.sightings1600()})
+        self.assertEqual(output['error'], 'mandatory information is missing')
+
+
+#---- Unit tests
+#
+# 1700 util.Angle
+#     Analysis
+#        inputs:
+#            'DdM.M' strings with a degree range, or degrees
+#     Happy path:
+#            Angle.parse(text) -> Angle holding whole tenths of an arcminute; format() gives the text back
+#     Sad path:
+#            Angle.parse(invalidText) -> None
+#
+    # Happy path
+    def test1700_010_ShouldRoundTripText(self):
+        for text in ('0d0.0', '16d32.3', '-53d38.4', '359d59.9', '89d0.5'):
+            angle = util.Angle.parse(text, -90, 360)
+            self.assertEqual(angle.format(), text)
+            self.assertEqual(str(angle), text)
+
+    def test1700_020_ShouldHoldTenthsOfArcminutes(self):
+        angle = util.Angle.parse('-53d38.4', -89, 90)
+        self.assertEqual(angle.tenths, -(53 * 600 + 384))
+        self.assertAlmostEqual(angle.degrees, -(53 + 38.4 / 60))
+        self.assertEqual(angle, util.Angle.fromDegrees(-(53 + 38.4 / 60)))
+
+    def test1700_030_ShouldNotFormatSixtyMinutes(self):
+        self.assertEqual(util.formatAlt(12.99999), '13d0.0')
+        self.assertEqual(util.formatAndNormalizeAlt(359.99999), '0d0.0')
+        self.assertEqual(str(vector.formatAlt(12.99999)), '13d0.0')
+
+    def test1700_040_ShouldFormatSignAndNormalize(self):
+        self.assertEqual(util.formatAlt(-0.5), '-0d30.0')
+        self.assertEqual(util.formatAndNormalizeAlt(-10.5), '349d30.0')
+        self.assertEqual(util.Angle.fromDegrees(370.25).normalized().format(), '10d15.0')
+
+    # Sad path
+    def test1700_910_ShouldRejectMalformedText(self):
+        for text in ('16d32', '16d32.25', '16d60.0', '16x32.3', '90d0.0', '0d0.1', 16.5, None, ['16d32.3']):
+            self.assertIsNone(util.Angle.parse(text, -89, 90))
+
+# 1800 schema
+#     Analysis
+#        inputs:
+#            rules -> required, absent, field and check, applied in the order given
+#        outputs:
+#            validate(values) -> (parsed fields, None) or (None, error of the first failing rule)
+#     Happy path:
+#            every field parsed once, defaults for absent optional fields
+#     Sad path:
+#            missing, already present, invalid and failed check each report their own error
+#
+    # Happy path
+    def test1800_010_ShouldParseFieldsAndDefaults(self):
+        validate = schema.build(
+            schema.required('observation'),
+            schema.field('observation', schema.angle(0, 90)),
+            schema.field('temperature', schema.number(int, -20, 120), default=72),
+            schema.field('horizon', schema.choice(('artificial', 'natural'), lower=True), default='natural'))
+        fields, error = validate({'observation': '30d1.5', 'horizon': 'Artificial'})
+        self.assertIsNone(error)
+        self.assertAlmostEqual(fields['observation'], 30.025)
+        self.assertEqual(fields['temperature'], 72)
+        self.assertEqual(fields['horizon'], 'artificial')
+
+    # Sad path
+    def test1800_910_ShouldReportFirstFailingRule(self):
+        validate = schema.build(
+            schema.required('height'),
+            schema.absent('altitude', 'altitude already exists'),
+            schema.field('height', schema.number(float)),
+            schema.check('height', lambda height: height >= 0, 'height must be greater than 0'))
+        self.assertEqual(validate({}), (None, schema.MISSING))
+        self.assertEqual(validate({'height': 'x', 'altitude': '1d0.0'}), (None, 'altitude already exists'))
+        self.assertEqual(validate({'height': 'x'}), (None, 'height is invalid'))
+        self.assertEqual(validate({'height': None}), (None, 'height is invalid'))
+        self.assertEqual(validate({'height': '-1'}), (None, 'height must be greater than 0'))
+
+    def test1800_920_ShouldReportAdjustTypeErrorsAsInvalid(self):
+        output = nav.dispatch({'op': 'adjust', 'observation': '30d1.5', 'temperature': None})
+        self.assertEqual(output['error'], 'temperature is invalid')
+
+    def test1800_930_ShouldReportInfinityAsInvalid(self):
+        # int(float('inf')) raises OverflowError, as JSON's Infinity for temperature would
+        self.assertIsNone(schema.number(int)(float('inf')))
+        self.assertIsNone(schema.number(float)(10 ** 400))
+        output = nav.dispatch(json.loads('{"op": "adjust", "observation": "30d1.5", "temperature": Infinity}'))
+        self.assertEqual(output['error'], 'temperature is invalid')
+        output = nav.dispatch({'op': 'adjust', 'observation': '30d1.5', 'height': 10 ** 400})
+        self.assertEqual(output['error'], 'height is invalid')
+
+# 1900 util.Overlay
+#     Analysis
+#        inputs:
+#            base -> the op's input values, not copied
+#            added -> the keys the op adds
+#        outputs:
+#            a dict that reads, iterates, compares, pickles and serializes as base updated with added
+#     Happy path:
+#            adjust/predict/correct outputs equal and serialize as the copied dicts they replace
+#     Sad path:
+#            removing a key from the output leaves the input untouched
+#
+    # Happy path
+    def test1900_010_ShouldSerializeAsCopiedOutput(self):
+        values = {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3',
+                  'assumedLat': '-53d38.4', 'assumedLong': '74d35.3', 'error': 'stale'}
+        output = nav.dispatch(values)
+        expected = dict(values)
+        expected.update({'correctedDistance': '3950', 'correctedAzimuth': '164d42.9'})
+        self.assertIsInstance(output, importlib.import_module('util').Overlay)
+        self.assertDictEqual(output, expected)
+        self.assertEqual(list(output.items()), list(expected.items()))
+        self.assertEqual(json.dumps(output), json.dumps(expected))
+        self.assertEqual(pickle.loads(pickle.dumps(output)), expected)
+        self.assertEqual(len(output), len(expected))
+
+    def test1900_020_ShouldNotCopyInput(self):
+        values = {'op': 'adjust', 'observation': '30d1.5'}
+        output = nav.dispatch(values)
+        self.assertIs(output.base, values)
+        self.assertEqual(dict.keys(output), {'altitude'})
+
+    # Sad path
+    def test1900_910_ShouldLeaveInputOnRemove(self):
+        values = {'op': 'adjust', 'observation': '30d1.5'}
+        output = nav.dispatch(values)
+        del output['observation']
+        self.assertNotIn('observation', output)
+        self.assertIn('observation', values)
+        self.assertEqual(json.dumps(util.Overlay({'a': 1}, {})), '{"a": 1}')
+
+# 2000 dispatchCached
+#     Analysis
+#        inputs:
+#            values -> as dispatch
+#            cache -> util.ResultCache(maxsize, ttl)
+#        outputs:
+#            as dispatch; adjust, predict and correct repeats are served from cache
+#     Happy path:
+#            a repeat, or one differing only in the case of body, is a hit that echoes its own input
+#     Sad path:
+#            entries past maxsize are evicted, past ttl expire, and a caller's changes never reach the cache
+#
+    # Happy path
+    def test2000_010_ShouldServeRepeatsFromCache(self):
+        cache = util.ResultCache(8)
+        first = nav.dispatchCached({'op': 'predict', 'body': 'Betelgeuse', 'date': '2016-01-17', 'time': '03:15:42'}, cache)
+        second = nav.dispatchCached({'op': 'predict', 'body': 'betelgeuse', 'date': '2016-01-17', 'time': '03:15:42'}, cache)
+        self.assertEqual(first['long'], second['long'])
+        self.assertEqual(second['body'], 'betelgeuse')
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test2000_030_ShouldShareEntriesAcrossIgnoredWhitespace(self):
+        cache = util.ResultCache(8)
+        first = nav.dispatchCached({'op': 'adjust', 'observation': '30d1.5', 'height': '19.0'}, cache)
+        second = nav.dispatchCached({'op': 'adjust', 'observation': ' 30d1.5', 'height': ' 19.0 '}, cache)
+        self.assertEqual(first['altitude'], second['altitude'])
+        self.assertEqual(cache.stats()['hits'], 1)
+        third = nav.dispatchCached({'op': 'adjust', 'observation': '30d1.5 ', 'height': '19.0'}, cache)
+        self.assertEqual(third['error'], 'observation is invalid')
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test2000_020_ShouldMatchDispatch(self):
+        cache = util.ResultCache(8)
+        for values in ({'op': 'adjust', 'observation': '30d1.5', 'horizon': 'Artificial'},
+                       {'op': 'correct', 'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3',
+                        'assumedLat': '-53d38.4', 'assumedLong': '74d35.3'},
+                       {'op': 'predict', 'body': 'Sirius', 'times': ['2016-01-17 03:15:42']},
+                       {'op': 'locate'}, {'op': 'bogus'}):
+            for repeat in range(2):
+                self.assertEqual(nav.dispatchCached(dict(values), cache), nav.dispatch(dict(values)))
+
+    # Sad path
+    def test2000_910_ShouldEvictLeastRecentlyUsed(self):
+        cache = util.ResultCache(2)
+        for observation in ('30d1.5', '31d1.5', '30d1.5', '32d1.5', '30d1.5'):
+            nav.dispatchCached({'op': 'adjust', 'observation': observation}, cache)
+        self.assertEqual(cache.stats(), {'size': 2, 'hits': 2, 'misses': 3, 'evictions': 1})
+
+    def test2000_920_ShouldExpireAfterTtl(self):
+        now = [0.0]
+        cache = util.ResultCache(8, ttl=60, clock=lambda: now[0])
+        nav.dispatchCached({'op': 'adjust', 'observation': '30d1.5'}, cache)
+        now[0] = 61.0
+        nav.dispatchCached({'op': 'adjust', 'observation': '30d1.5'}, cache)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 2)
+
+    def test2000_930_ShouldIsolateCachedResults(self):
+        cache = util.ResultCache(8)
+        values = {'op': 'predict', 'body': 'Sirius', 'start': '2016-01-17 03:00:00',
+                  'end': '2016-01-17 03:02:00', 'step': '60'}
+        first = nav.dispatchCached(dict(values), cache)
+        first['long'].append('spoiled')
+        first['error'] = 'spoiled'
+        second = nav.dispatchCached(dict(values), cache)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(second, nav.dispatch(dict(values)))
+
+# 2100 op registry
+#     Analysis
+#        inputs:
+#            register(op, module, function) -> an op handled by module.function, imported on first use
+#            hooks -> called as hook(op, seconds, requests) after each handler
+#        outputs:
+#            dispatch runs the registered handler; an OpTimer hook counts and times each op
+#     Happy path:
+#            a registered op is dispatched; dispatch, dispatchBatch and dispatchCached report to hooks
+#     Sad path:
+#            an op that is not registered, or is not a string, is not a legal operation
+#
+    # Happy path
+    def test2100_010_ShouldDispatchRegisteredOp(self):
+        nav.register('serialize', 'json', 'dumps')
+        try:
+            self.assertEqual(nav.dispatch({'op': 'serialize'}), '{"op": "serialize"}')
+        finally:
+            del nav.ops['serialize']
+
+    def test2100_020_ShouldTimeEachOp(self):
+        timer = nav.OpTimer()
+        nav.hooks.append(timer)
+        try:
+            nav.dispatch({'op': 'adjust', 'observation': '30d1.5'})
+            nav.dispatchBatch([{'op': 'adjust', 'observation': '30d1.5'}, {'op': 'adjust', 'observation': '31d1.5'},
+                               {'op': 'predict', 'body': 'Sirius'}])
+            nav.dispatchCached({'op': 'correct'}, util.ResultCache())
+        finally:
+            nav.hooks.remove(timer)
+        stats = timer.stats()
+        self.assertEqual(dict((op, stats[op]['count']) for op in stats), {'adjust': 3, 'predict': 1, 'correct': 1})
+        self.assertTrue(all(stats[op]['seconds'] >= 0.0 for op in stats))
+
+    # Sad path
+    def test2100_910_ShouldRejectUnregisteredOp(self):
+        for op in ('serialize', ['adjust'], 3):
+            self.assertEqual(nav.dispatch({'op': op})['error'], 'op is not a legal operation')
+
+# 2200 cold start
+#     Analysis
+#        inputs:
+#            a fresh interpreter importing lambda_function and handling one request
+#        outputs:
+#            only the modules that request's op needs are imported
+#     Happy path:
+#            adjust, predict, correct and locate answer without importing numpy
+#     Sad path:
+#            locate and track still accept the '0d0.1' azimuth correct can report
+#
+    # Happy path
+    def test2200_010_ShouldNotImportNumpyForScalarOps(self):
+        import os
+        import subprocess
+        import sys
+        here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        program = ("import sys, lambda_function\n"
+                   "for op in ('adjust', 'predict', 'correct', 'locate'):\n"
+                   "    lambda_function.lambda_handler({'querystring': '{op=%s, body=Sirius}' % op}, None)\n"
+                   "print('numpy' in sys.modules, 'vector' in sys.modules)\n")
+        result = subprocess.run([sys.executable, '-c', program], cwd=here, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.split(), ['False', 'False'])
+
+    # Sad path
+    def test2200_910_ShouldAcceptSmallestAzimuth(self):
+        output = nav.dispatch({'op': 'locate', 'assumedLat': '30d0.0', 'assumedLong': '290d0.0',
+                               'corrections': [{'long': '0d0.0', 'correctedDistance': '10', 'correctedAzimuth': '0d0.1'},
+                                               {'long': '0d0.0', 'correctedDistance': '10', 'correctedAzimuth': '90d0.0'}]})
+        self.assertEqual(output['presentLat'], '30d10.0')
+        self.assertNotIn('error', output)
+
+# 2300 lambda_handler
+#     Analysis
+#        inputs:
+#            event -> {'querystring': '{key=value, key="quoted value"}'} from API Gateway
+#        outputs:
+#            dispatch's output for the parsed values, or {'error': ...} naming what was wrong
+#     Happy path:
+#            fields separated by commas or spaces; quoted values keep commas and spaces
+#     Sad path:
+#            a missing querystring, a field without a value and an unterminated quote each have their own error
+#
+    # Happy path
+    def test2300_010_ShouldParseQuerystring(self):
+        values, error = lambda_function.parseQuerystring('{op=predict, body="Kaus Aust.", date=2016-01-17 time=03:15:42}')
+        self.assertIsNone(error)
+        self.assertEqual(values, {'op': 'predict', 'body': 'Kaus Aust.', 'date': '2016-01-17', 'time': '03:15:42'})
+        self.assertEqual(lambda_function.parseQuerystring('{note="a, b", op=adjust}')[0], {'note': 'a, b', 'op': 'adjust'})
+
+    def test2300_030_ShouldSplitValuesContainingEqualsAsBefore(self):
+        self.assertEqual(lambda_function.parseQuerystring('{a=b=, b.==db, c==d}')[0], {'a': 'b=', 'b.=': 'db', 'c=': 'd'})
+
+    def test2300_020_ShouldHandleEvent(self):
+        output = lambda_function.lambda_handler({'querystring': '{op=adjust, observation=30d1.5, height=19.0}'}, None)
+        self.assertEqual(output['altitude'], '29d55.7')
+
+    # Sad path
+    def test2300_910_ShouldReportDistinctErrors(self):
+        self.assertEqual(lambda_function.lambda_handler({}, None), {'error': 'querystring is missing'})
+        for querystring, error in (('{op=adjust, observation}', 'querystring has a field without a value'),
+                                   ('{op=adjust, observation=}', 'querystring has a field without a value'),
+                                   ('{=adjust}', 'querystring has a value without a field'),
+                                   ('{op=predict, body="Kaus Aust.}', 'querystring has an unterminated quote'),
+                                   ('{op=predict, body=Kaus"Aust."}', 'querystring has a quote outside a value'),
+                                   (None, 'querystring is invalid')):
+            self.assertEqual(lambda_function.lambda_handler({'querystring': querystring}, None), {'error': error})
+
+# 2400 lambda_handler requests
+#     Analysis
+#        inputs:
+#            event -> {'requests': [querystring or values dict, ...]}
+#        outputs:
+#            a list with each request's result in its place
+#     Happy path:
+#            querystrings and dicts of any op in one event
+#     Sad path:
+#            a request that cannot be parsed, or whose op raises, fails alone
+#
+    # Happy path
+    def test2400_010_ShouldHandleEachRequest(self):
+        outputs = lambda_function.lambda_handler({'requests': [
+            '{op=adjust, observation=30d1.5, height=19.0}',
+            {'op': 'predict', 'body': 'Betelgeuse', 'date': '2016-01-17', 'time': '03:15:42'},
+            {'op': 'locate'}]}, None)
+        self.assertEqual(len(outputs), 3)
+        self.assertEqual(outputs[0]['altitude'], '29d55.7')
+        self.assertEqual(outputs[1]['long'], '75d53.6')
+        self.assertEqual(outputs[2]['error'], 'mandatory information is missing')
+
+    # Sad path
+    def test2400_910_ShouldFailRequestsAlone(self):
+        dispatch = importlib.import_module('dispatch')
+        dispatch.register('explode', 'json', 'loads')
+        dispatch.register('explode', 'json', 'loads', table=dispatch.batchOps)
+        try:
+            outputs = lambda_function.lambda_handler({'requests': [
+                '{op=adjust, observation}', 7, {'op': 'explode'}, '{op=adjust, observation=30d1.5}']}, None)
+        finally:
+            del dispatch.ops['explode']
+            del dispatch.batchOps['explode']
+        self.assertEqual(outputs[0], {'error': 'querystring has a field without a value'})
+        self.assertEqual(outputs[1], {'error': 'request is invalid'})
+        self.assertEqual(outputs[2], {'error': 'op failed'})
+        self.assertEqual(outputs[3]['altitude'], '29d59.9')
+
+    def test2400_920_ShouldRejectInvalidRequests(self):
+        self.assertEqual(lambda_function.lambda_handler({'requests': 'op=adjust'}, None), {'error': 'requests is invalid'})
+        self.assertEqual(lambda_function.lambda_handler({'requests': [{}] * 1001}, None), {'error': 'requests are too many'})
+
+# 2500 server
+#     Analysis
+#        inputs:
+#            HTTP/1.1 requests: GET /dispatch?query, POST /dispatch and POST /lambda with JSON bodies
+#        outputs:
+#            JSON responses on a kept-alive connection; batches and heavy ops run in the process pool
+#     Happy path:
+#            several requests on one connection, including an offloaded batch, then a graceful shutdown;
+#            a single request is answered while a heavy op runs
+#     Sad path:
+#            unknown paths, other methods and bodies that are not JSON are refused; a stalled body is dropped
+#
+    def exchange2500(self, port, requests):
+        import asyncio
+
+        async def run():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            responses = []
+            for method, target, body in requests:
+                writer.write(('%s %s HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % (method, target, len(body))).encode('latin-1')
+                             + body)
+                head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+                length = int(head.lower().split('content-length:')[1].split('\r\n')[0])
+                responses.append((int(head.split(' ')[1]), json.loads(await reader.readexactly(length))))
+            writer.close()
+            return responses
+        return run
+
+    def serve2500(self, requests):
+        import asyncio
+        server = importlib.import_module('server')
+
+        async def run():
+            instance = server.Server(port=0, workers=1, batchThreshold=2)
+            await instance.start()
+            try:
+                return await self.exchange2500(instance.port, requests)()
+            finally:
+                await instance.shutdown()
+        return asyncio.run(run())
+
+    # Happy path
+    def test2500_010_ShouldServeOnOneConnection(self):
+        batch = json.dumps([{'op': 'adjust', 'observation': '30d1.5'}, {'op': 'predict', 'body': 'Sirius'}]).encode()
+        event = json.dumps({'querystring': '{op=adjust, observation=30d1.5, height=19.0}'}).encode()
+        responses = self.serve2500([('GET', '/dispatch?op=adjust&observation=30d1.5', b''),
+                                    ('POST', '/dispatch', batch),
+                                    ('POST', '/lambda', event)])
+        self.assertEqual(responses[0], (200, {'op': 'adjust', 'observation': '30d1.5', 'altitude': '29d59.9'}))
+        self.assertEqual(responses[1][0], 200)
+        self.assertEqual(responses[1][1][1]['long'], '359d14.3')
+        self.assertEqual(responses[2][1]['altitude'], '29d55.7')
+
+    def test2500_020_ShouldAnswerWhileHeavyOpRuns(self):
+        import asyncio
+        server = importlib.import_module('server')
+        sweep = json.dumps({'op': 'sweep', 'sightings': [{'lat': '16d32.3', 'long': '95d41.6', 'altitude': '13d42.3'}] * 4,
+                            'minAssumedLat': '-60d0.0', 'maxAssumedLat': '60d0.0', 'minAssumedLong': '0d0.0',
+                            'maxAssumedLong': '359d0.0', 'step': '60'}).encode()
+        answered = {}
+
+        async def send(name, method, target, body):
+            # -> the response, noting when its head arrived
+            reader, writer = await asyncio.open_connection('127.0.0.1', instance.port)
+            writer.write(('%s %s HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % (method, target, len(body))).encode('latin-1')
+                         + body)
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            answered[name] = asyncio.get_running_loop().time()
+            length = int(head.lower().split('content-length:')[1].split('\r\n')[0])
+            output = json.loads(await reader.readexactly(length))
+            writer.close()
+            return output
+
+        async def run():
+            await instance.start()
+            try:
+                heavy = asyncio.ensure_future(send('sweep', 'POST', '/dispatch', sweep))
+                await asyncio.sleep(0.05)
+                light = await send('adjust', 'GET', '/dispatch?op=adjust&observation=30d1.5', b'')
+                return light, await heavy
+            finally:
+                await instance.shutdown()
+        instance = server.Server(port=0, workers=1)
+        light, swept = asyncio.run(run())
+        self.assertLess(answered['adjust'], answered['sweep'])
+        self.assertEqual(light['altitude'], '29d59.9')
+        self.assertEqual(len(swept['grid']['assumedLat']), 121)
+
+    # Sad path
+    def test2500_910_ShouldRefuseUnreadableRequests(self):
+        responses = self.serve2500([('GET', '/nope', b''), ('PUT', '/lambda', b'{}'), ('POST', '/lambda', b'{op=adjust')])
+        self.assertEqual([status for status, output in responses], [404, 405, 400])
+        self.assertEqual(responses[2][1], {'error': 'body is not JSON'})
+
+    def test2500_920_ShouldDropStalledBody(self):
+        import asyncio
+        server = importlib.import_module('server')
+
+        async def run():
+            instance = server.Server(port=0, batchThreshold=None, idleTimeout=0.2)
+            await instance.start()
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', instance.port)
+                writer.write(b'POST /dispatch HTTP/1.1\r\nContent-Length: 10\r\n\r\n{}')
+                closed = await asyncio.wait_for(reader.read(), 5)
+                writer.close()
+            finally:
+                await instance.shutdown()
+            return closed
+        self.assertEqual(asyncio.run(run()), b'')
+
+# 2600 prefork
+#     Analysis
+#        inputs:
+#            servers started with reusePort on one port; server.py run with a process count
+#        outputs:
+#            each server answers on the shared port, running batches without a process pool
+#     Happy path:
+#            two servers share a port; both forked workers answer separate connections and exit on SIGTERM
+#     Sad path:
+#            a server without reusePort cannot bind a port already in use;
+#            a worker that dies before it is listening fails startup instead of hanging it
+#
+    def test2600_010_ShouldShareOnePort(self):
+        import asyncio
+        server = importlib.import_module('server')
+        batch = json.dumps([{'op': 'adjust', 'observation': '30d1.5'}, {'op': 'predict', 'body': 'Sirius'}]).encode()
+
+        async def run():
+            first = server.Server(port=0, batchThreshold=None, reusePort=True)
+            await first.start()
+            second = server.Server(port=first.port, batchThreshold=None, reusePort=True)
+            await second.start()
+            try:
+                return await self.exchange2500(first.port, [('POST', '/dispatch', batch)])()
+            finally:
+                await first.shutdown()
+                await second.shutdown()
+        responses = asyncio.run(run())
+        self.assertEqual(responses[0][1][1]['long'], '359d14.3')
+
+    def test2600_020_ShouldServeFromForkedWorkers(self):
+        import os
+        import sys
+        import signal
+        import asyncio
+        import subprocess
+        here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        process = subprocess.Popen([sys.executable, '-W', 'ignore', 'server.py', '0', '127.0.0.1', '2'],
+                                   cwd=here, stdout=subprocess.PIPE, text=True)
+        try:
+            announced = process.stdout.readline()
+            self.assertTrue(announced.endswith('with 2 processes\n'))
+            port = int(announced.split(':')[2].split(' ')[0])
+
+            async def ask():
+                # a connection of its own, so the kernel picks a worker for each
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(b'GET /dispatch?op=predict&body=Sirius HTTP/1.1\r\nConnection: close\r\n\r\n')
+                head, body = (await reader.read()).split(b'\r\n\r\n', 1)
+                writer.close()
+                worker = head.decode('latin-1').lower().split('x-worker:')[1].split('\r\n')[0].strip()
+                return worker, json.loads(body)
+
+            async def run():
+                return await asyncio.gather(*[ask() for connection in range(16)])
+            answers = asyncio.run(run())
+        finally:
+            process.send_signal(signal.SIGTERM)
+            self.assertEqual(process.wait(30), 0)
+        self.assertEqual([output['long'] for worker, output in answers], ['359d14.3'] * 16)
+        self.assertEqual(len(set(worker for worker, output in answers)), 2)
+
+    # Sad path
+    def test2600_910_ShouldNotShareWithoutReusePort(self):
+        import asyncio
+        server = importlib.import_module('server')
+
+        async def run():
+            first = server.Server(port=0, batchThreshold=None, reusePort=True)
+            await first.start()
+            try:
+                second = server.Server(port=first.port, batchThreshold=None)
+                await second.start()
+            finally:
+                await first.shutdown()
+        with self.assertRaises(OSError):
+            asyncio.run(run())
+
+    def test2600_920_ShouldFailWhenWorkerDiesBeforeListening(self):
+        import os
+        import sys
+        import subprocess
+        here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        script = ('import server\n'
+                  'async def broken(*args, **kwargs):\n'
+                  '    raise RuntimeError("broken")\n'
+                  'server.serve = broken\n'
+                  'try:\n'
+                  '    server.prefork("127.0.0.1", 0, 2)\n'
+                  'except OSError as error:\n'
+                  '    print(error)\n')
+        completed = subprocess.run([sys.executable, '-W', 'ignore', '-c', script], cwd=here,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=30)
+        self.assertEqual(completed.stdout, 'a worker exited before it was listening\n')
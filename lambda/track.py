@@ -0,0 +1,169 @@
+import math
+import util
+import predict
+import reduction
+
+# Running fix for a vessel under way: dead reckoning on course and speed between
+# sightings, then a Kalman update along each sighting's line of position. The
+# estimate is a position plus a 2x2 north/east covariance in square nautical
+# miles, so a sighting costs the same however long the passage has been.
+
+# variance of one line of position, of the set and drift accumulated per hour
+# of dead reckoning, and of the first sighting's assumed position
+SIGHTING_VARIANCE = 1.0
+DRIFT_VARIANCE = 0.25
+INITIAL_VARIANCE = 100.0
+
+class Track(object):
+    __slots__ = ('lat', 'long', 'seconds', 'nn', 'ne', 'ee')
+
+    def __init__(self, lat, long, seconds, nn=INITIAL_VARIANCE, ne=0.0, ee=INITIAL_VARIANCE):
+        self.lat = lat
+        self.long = long
+        self.seconds = seconds
+        self.nn, self.ne, self.ee = nn, ne, ee
+
+    def advance(self, seconds, course, speed):
+        # dead reckon to seconds at course degrees true and speed knots
+        hours = (seconds - self.seconds) / 3600.0
+        run = speed * hours
+        self._move(run * math.cos(math.radians(course)), run * math.sin(math.radians(course)))
+        self.nn += DRIFT_VARIANCE * hours
+        self.ee += DRIFT_VARIANCE * hours
+        self.seconds = seconds
+
+    def sight(self, assumedLat, assumedLong, distance, azimuth):
+        # fold in the line of position distance nautical miles from the assumed
+        # position toward azimuth degrees, the true bearing of the body
+        cosZ, sinZ = math.cos(math.radians(azimuth)), math.sin(math.radians(azimuth))
+        north = util.degreesToArcmin(self.lat - assumedLat)
+        east = util.degreesToArcmin((self.long - assumedLong + 180.0) % 360.0 - 180.0) * math.cos(math.radians(self.lat))
+        innovation = distance - (cosZ * north + sinZ * east)
+        # P H' and H P H' + R for the one-row observation H = [cos Z, sin Z]
+        pn = self.nn * cosZ + self.ne * sinZ
+        pe = self.ne * cosZ + self.ee * sinZ
+        variance = cosZ * pn + sinZ * pe + SIGHTING_VARIANCE
+        gainN, gainE = pn / variance, pe / variance
+        self._move(gainN * innovation, gainE * innovation)
+        self.nn -= gainN * pn
+        self.ne -= gainN * pe
+        self.ee -= gainE * pe
+
+    def precision(self):
+        # radius in nautical miles of the estimate's one-sigma circle
+        return math.sqrt(max(self.nn + self.ee, 0.0))
+
+    def _move(self, north, east):
+        self.lat += util.arcminToDegrees(north)
+        self.long = (self.long + util.arcminToDegrees(east) / math.cos(math.radians(self.lat))) % 360.0
+
+def track(values):
+    output = values.copy()
+    output.update(_compute(values))
+    return output
+
+def _compute(values):
+    output = {}
+
+    if 'presentLat' in values or 'presentLong' in values:
+        output['error'] = 'presentLat or presentLong already exists in the input'
+        return output
+
+    if 'course' not in values or 'speed' not in values or 'sightings' not in values:
+        output['error'] = 'mandatory information is missing'
+        return output
+
+    course = util.parseAngle(values['course'], 0, 360)
+    if course is None:
+        output['error'] = 'course is invalid'
+        return output
+    try:
+        speed = float(values['speed'])
+    except (TypeError, ValueError):
+        output['error'] = 'speed is invalid'
+        return output
+    if not 0.0 <= speed < 100.0:
+        output['error'] = 'speed is invalid'
+        return output
+
+    sightings = values['sightings']
+    if not isinstance(sightings, list) or not sightings:
+        output['error'] = 'sightings is invalid'
+        return output
+
+    # track: the state a previous call returned, carried on to the next call
+    estimate = None
+    if 'track' in values:
+        estimate = _parseTrack(values['track'])
+        if estimate is None:
+            output['error'] = 'track is invalid'
+            return output
+
+    for sighting in sightings:
+        parsed = _parseSighting(sighting)
+        if parsed is None:
+            output['error'] = 'sightings is invalid'
+            return output
+        seconds, assumedLat, assumedLong, distance, azimuth = parsed
+        if estimate is None:
+            estimate = Track(assumedLat, assumedLong, seconds)
+        if seconds < estimate.seconds:
+            output['error'] = 'sightings is invalid'
+            return output
+        estimate.advance(seconds, course, speed)
+        estimate.sight(assumedLat, assumedLong, distance, azimuth)
+
+    output['presentLat'] = util.formatAlt(estimate.lat)
+    output['presentLong'] = util.formatAndNormalizeAlt(estimate.long)
+    output['precision'] = str(int(round(estimate.precision())))
+    output['track'] = _formatTrack(estimate)
+    return output
+
+def _parseSighting(sighting):
+    # correct's output plus the date and time of the sight
+    # -> (seconds since 2001, assumedLat, assumedLong, distance, true bearing) or None.
+    # correctedAzimuth is Z, 0..180 either side of the meridian; the body's long
+    # (GHA) that correct kept gives the LHA that says which side it is on
+    if not isinstance(sighting, dict):
+        return None
+    if 'correctedDistance' not in sighting or 'correctedAzimuth' not in sighting:
+        return None
+    if 'assumedLat' not in sighting or 'assumedLong' not in sighting or 'long' not in sighting:
+        return None
+    seconds = _secondsFromValues(sighting)
+    assumedLat = util.parseAngle(sighting['assumedLat'], -89, 90)
+    assumedLong = util.parseAngle(sighting['assumedLong'], 0, 360)
+    long = util.parseAngle(sighting['long'], 0, 360)
+    azimuth = util.parseAzimuth(sighting['correctedAzimuth'])
+    try:
+        distance = int(sighting['correctedDistance'])
+    except (TypeError, ValueError):
+        return None
+    if seconds is None or assumedLat is None or assumedLong is None or long is None or azimuth is None:
+        return None
+    return seconds, assumedLat, assumedLong, distance, reduction.bearing(azimuth, long + assumedLong)
+
+def _parseTrack(state):
+    # {'lat', 'long', 'seconds', 'covariance': [nn, ne, ee]} as _formatTrack wrote it -> Track or None
+    try:
+        lat, long, seconds = float(state['lat']), float(state['long']), float(state['seconds'])
+        nn, ne, ee = [float(term) for term in state['covariance']]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90.0 < lat < 90.0 and 0.0 <= long < 360.0 and seconds >= 0.0):
+        return None
+    if not (nn >= 0.0 and ee >= 0.0 and ne * ne <= nn * ee * (1.0 + 1e-9)):
+        return None
+    return Track(lat, long, seconds, nn, ne, ee)
+
+def _formatTrack(estimate):
+    # full precision, unlike presentLat and presentLong, so carrying the state
+    # from call to call does not round the estimate
+    return {'lat': estimate.lat, 'long': estimate.long, 'seconds': estimate.seconds,
+            'covariance': [estimate.nn, estimate.ne, estimate.ee]}
+
+def _secondsFromValues(values):
+    year, seconds, error = predict.parseDateAndTime(values)
+    if error is not None:
+        return None
+    return util.secondsSince2001(year, seconds)
@@ -1,4 +1,8 @@
 import math
+import time
+import functools
+import collections
+import collections.abc
 
 def isLeapYear(year):
     if (year % 4 == 0 and year % 100 != 0) or year % 400 == 0:
@@ -6,11 +10,57 @@ def isLeapYear(year):
     return False
 
 def numOfLeapYears(year1, year2):
-    num = 0
-    for year in range(year1, year2):
-        if isLeapYear(year):
-            num = num + 1
-    return num
+    # leap years in [year1, year2)
+    if year2 <= year1:
+        return 0
+    return leapYearsBefore(year2) - leapYearsBefore(year1)
+
+def leapYearsBefore(year):
+    # leap years in [1, year)
+    year = year - 1
+    return year // 4 - year // 100 + year // 400
+
+def secondsSince2001(year, seconds):
+    # seconds into year -> seconds since 2001-01-01 00:00:00
+    days = (year - 2001) * 365 + numOfLeapYears(2001, year)
+    return days * 86400 + seconds
+
+# days before the first of each month in a common year
+_daysBeforeMonth = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334, 365)
+
+def parseDate(date):
+    # 'YYYY-MM-DD' -> (year, days since January 1) or None when invalid
+    try:
+        if len(date) != 10 or date[4] != '-' or date[7] != '-':
+            return None
+        yearStr, monthStr, dayStr = date[0:4], date[5:7], date[8:10]
+        # strptime's %d also accepted a space-padded day
+        if dayStr[0] == ' ':
+            dayStr = '0' + dayStr[1]
+        if not (yearStr.isdigit() and monthStr.isdigit() and dayStr.isdigit()):
+            return None
+        year, month, day = int(yearStr), int(monthStr), int(dayStr)
+    except (TypeError, ValueError):
+        return None
+    if month < 1 or month > 12 or day < 1:
+        return None
+    leap = 1 if isLeapYear(year) else 0
+    monthDays = _daysBeforeMonth[month] - _daysBeforeMonth[month - 1] + (leap if month == 2 else 0)
+    if day > monthDays:
+        return None
+    return year, _daysBeforeMonth[month - 1] + (leap if month > 2 else 0) + day - 1
+
+def parseTime(time):
+    # 'HH:MM:SS' -> seconds since midnight or None when invalid
+    try:
+        if len(time) != 8 or time[2] != ':' or time[5] != ':':
+            return None
+        hour, min, sec = int(time[0:2]), int(time[3:5]), int(time[6:8])
+    except (TypeError, ValueError):
+        return None
+    if hour < 0 or hour > 23 or min < 0 or min > 59 or sec < 0 or sec > 59:
+        return None
+    return hour * 3600 + min * 60 + sec
 
 def degreesFromFormattedAlt(f):
     degreesAndMinutes = f.split('d')
@@ -24,20 +74,123 @@ def degreesFromFormattedAlt(f):
     return degrees + arcminToDegrees(minutes)
 
 
+# tenths of an arcminute in a degree and in a full circle
+TENTHS_PER_DEGREE = 600
+TENTHS_PER_CIRCLE = 360 * TENTHS_PER_DEGREE
+
+# 'M.M' for each of the 600 tenths of arcminute in a degree
+_MINUTES = tuple('%d.%d' % divmod(tenths, 10) for tenths in range(TENTHS_PER_DEGREE))
+
+class Angle(object):
+    # an angle held as a whole number of tenths of an arcminute, the resolution
+    # of the 'DdM.M' notation, so parsing and formatting never drift
+    __slots__ = ('tenths',)
+
+    def __init__(self, tenths):
+        self.tenths = tenths
+
+    @classmethod
+    def fromDegrees(cls, degrees):
+        return cls(int(round(degrees * TENTHS_PER_DEGREE)))
+
+    @classmethod
+    def parse(cls, f, minDegrees, maxDegrees):
+        # 'DdM.M' -> Angle, or None unless minDegrees <= D < maxDegrees and M.M has
+        # exactly one decimal place in [0.0, 60.0)
+        try:
+            tenths = _parseTenths(f, minDegrees, maxDegrees)
+        except TypeError:
+            return None
+        if tenths is None:
+            return None
+        return cls(tenths)
+
+    @property
+    def degrees(self):
+        return self.tenths / float(TENTHS_PER_DEGREE)
+
+    def normalized(self):
+        # the same direction within [0d0.0, 360d0.0)
+        return Angle(self.tenths % TENTHS_PER_CIRCLE)
+
+    def format(self):
+        if self.tenths < 0:
+            degrees, tenths = divmod(-self.tenths, TENTHS_PER_DEGREE)
+            return '-%dd%s' % (degrees, _MINUTES[tenths])
+        degrees, tenths = divmod(self.tenths, TENTHS_PER_DEGREE)
+        return '%dd%s' % (degrees, _MINUTES[tenths])
+
+    __str__ = format
+
+    def __repr__(self):
+        return 'Angle(%r)' % self.format()
+
+    def __eq__(self, other):
+        return isinstance(other, Angle) and self.tenths == other.tenths
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.tenths)
+
+# requests repeat the same few angles (assumed positions, catalog declinations),
+# so a parsed string is usually a cache hit
+@functools.lru_cache(maxsize=4096)
+def _parseTenths(f, minDegrees, maxDegrees):
+    # a D of -0 keeps its sign, as format writes a small negative angle: '-0d30.0'
+    # is half a degree below 0, so it is refused where minDegrees is 0 or more
+    try:
+        degreesStr, minutesStr = f.split('d')
+        degrees = int(degreesStr)
+        minutes = float(minutesStr)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if degrees < minDegrees or degrees >= maxDegrees:
+        return None
+    # int and float would also take underscores, exponents and signed minutes
+    if '_' in degreesStr or not minutesStr.lstrip().replace('.', '', 1).isdigit():
+        return None
+    if minutesStr[-2:-1] != '.' or minutesStr[-1] == '.':
+        return None
+    if minutes < 0.0 or minutes >= 60.0:
+        return None
+    tenths = int(round(minutes * 10))
+    if degrees == 0 and tenths == 1:
+        return None
+    if degrees == 0 and degreesStr.lstrip().startswith('-'):
+        if tenths and minDegrees >= 0:
+            return None
+        return -tenths
+    if degrees >= 0:
+        return degrees * TENTHS_PER_DEGREE + tenths
+    return degrees * TENTHS_PER_DEGREE - tenths
+
+def parseAngle(f, minDegrees, maxDegrees):
+    # 'DdM.M' -> signed degrees, or None when Angle.parse rejects it
+    try:
+        tenths = _parseTenths(f, minDegrees, maxDegrees)
+    except TypeError:
+        return None
+    if tenths is None:
+        return None
+    return tenths / float(TENTHS_PER_DEGREE)
+
+def parseAzimuth(f):
+    # correct's correctedAzimuth -> degrees in [0, 360), or None. correct can report
+    # '0d0.1', which the input validators have always refused
+    if f == '0d0.1':
+        return 1.0 / TENTHS_PER_DEGREE
+    return parseAngle(f, 0, 360)
+
 def formatAlt(alt):
-    degrees = math.floor(alt)
-    if alt < 0:
-        degrees = math.ceil(alt)
-    arcmin = abs(round(degreesToArcmin(alt - degrees), 1))
-    return '%dd%.1f' % (degrees, arcmin)
+    # degrees -> 'DdM.M' to the nearest tenth of an arcminute, signed when negative
+    return Angle(int(round(alt * TENTHS_PER_DEGREE))).format()
 
 def formatAndNormalizeAlt(alt):
-    degrees = math.floor(alt)
-    if alt < 0:
-        degrees = math.ceil(alt)
-    normalizedDegrees = degrees % 360
-    arcmin = abs(round(degreesToArcmin(alt - degrees), 1))
-    return '%dd%.1f' % (normalizedDegrees, arcmin)
+    # degrees -> 'DdM.M' within [0d0.0, 360d0.0)
+    degrees, tenths = divmod(int(round(alt * TENTHS_PER_DEGREE)) % TENTHS_PER_CIRCLE, TENTHS_PER_DEGREE)
+    return '%dd%s' % (degrees, _MINUTES[tenths])
 
 def calcAltitude(totalDegrees, dip, refraction):
     return totalDegrees + dip + refraction
@@ -56,3 +209,214 @@ def arcminToDegrees(min):
 
 def degreesToArcmin(degrees):
     return degrees * 60.0
+
+_missing = object()
+
+def memoizeBatch(valuesList, fields, compute, computeMany=None):
+    # requests that agree on every field in fields get the same added keys,
+    # so each distinct combination is parsed and computed once per batch.
+    # computeMany, when given, takes the list of distinct requests and returns
+    # the added keys for each, so an op can compute them all at once
+    missing = (_missing,) * len(fields)
+    indexes = []
+    distinct = {}
+    distinctValues = []
+    for values in valuesList:
+        index = len(distinctValues)
+        try:
+            index = distinct.setdefault(tuple(map(values.get, fields, missing)), index)
+        except TypeError:
+            # an unhashable field (a list of times) is computed on its own
+            pass
+        if index == len(distinctValues):
+            distinctValues.append(values)
+        indexes.append(index)
+    if computeMany is None:
+        added = [compute(values) for values in distinctValues]
+    else:
+        added = computeMany(distinctValues)
+    return [Overlay(values, added[index]) for values, index in zip(valuesList, indexes)]
+
+# how the ops read each field's text, so requests they cannot tell apart share an
+# entry: names in any case, numbers with whitespace around them and angles with
+# whitespace before them ('Betelgeuse' and 'betelgeuse', ' 30d1.5' and '30d1.5').
+# Whitespace anywhere else makes a field invalid and stays in the key.
+CANONICAL_FIELDS = {
+    'body': str.lower,
+    'horizon': str.lower,
+    'height': str.strip,
+    'temperature': str.strip,
+    'pressure': str.strip,
+    'step': str.strip,
+    'observation': str.lstrip,
+    'lat': str.lstrip,
+    'long': str.lstrip,
+    'altitude': str.lstrip,
+    'assumedLat': str.lstrip,
+    'assumedLong': str.lstrip
+}
+
+class ResultCache(object):
+    # memoizeBatch across requests: the keys an op added for each distinct
+    # combination of its fields, kept for the most recent maxsize combinations
+    # and, when ttl is given, for at most ttl seconds
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = collections.OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def memoize(self, values, fields, compute):
+        # -> compute's added keys over values, as memoizeBatch builds them
+        key = (compute,) + tuple(_canonical(field, values.get(field, _missing)) for field in fields)
+        try:
+            expires, added = self._entries[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # an unhashable field (a list of times) is computed every time
+            self.misses += 1
+            return Overlay(values, compute(values))
+        else:
+            if expires is None or self.clock() < expires:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return Overlay(values, _isolated(added))
+            del self._entries[key]
+
+        self.misses += 1
+        added = compute(values)
+        if self.maxsize > 0:
+            self._entries[key] = (None if self.ttl is None else self.clock() + self.ttl, added)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return Overlay(values, _isolated(added))
+
+    def stats(self):
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def clear(self):
+        self._entries.clear()
+
+def _canonical(field, value):
+    if isinstance(value, str):
+        canonical = CANONICAL_FIELDS.get(field)
+        if canonical is not None:
+            return canonical(value)
+    return value
+
+def _isolated(added):
+    # a cached entry is never handed out, only a copy: strings are shared, any
+    # list or dict (a predict series) is copied so a caller cannot change it
+    for value in added.values():
+        if not isinstance(value, str):
+            import copy
+            return copy.deepcopy(added)
+    return added
+
+class Overlay(dict):
+    # an op's output: the input values with the keys the op added laid over them,
+    # without copying the input. The dict itself holds only the added keys; reads,
+    # iteration, comparison, copy, pickle and json see the merged mapping, in the
+    # order values.copy() followed by update(added) would give. The input must
+    # not change while the output is in use.
+    __slots__ = ('base',)
+
+    def __init__(self, base, added):
+        dict.__init__(self, added)
+        self.base = base
+        # json's C encoder writes an empty dict as {} without asking for items()
+        if not added:
+            self._flatten()
+
+    def _flatten(self):
+        # copy the input in, for the mutations that could otherwise reach through to it
+        if self.base:
+            items = list(self.items())
+            dict.clear(self)
+            dict.update(self, items)
+            self.base = {}
+
+    def __getitem__(self, key):
+        try:
+            return dict.__getitem__(self, key)
+        except KeyError:
+            return self.base[key]
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        return self.base.get(key, default)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.base
+
+    def __iter__(self):
+        base = self.base
+        for key in base:
+            yield key
+        for key in dict.__iter__(self):
+            if key not in base:
+                yield key
+
+    def __reversed__(self):
+        return reversed(list(self))
+
+    def __len__(self):
+        base = self.base
+        return len(base) + sum(1 for key in dict.__iter__(self) if key not in base)
+
+    def keys(self):
+        return collections.abc.KeysView(self)
+
+    def items(self):
+        return collections.abc.ItemsView(self)
+
+    def values(self):
+        return collections.abc.ValuesView(self)
+
+    def copy(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return dict(self.items()) != other
+
+    __hash__ = None
+
+    def __or__(self, other):
+        return dict(self.items()) | other
+
+    def __ror__(self, other):
+        return other | dict(self.items())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()),))
+
+    def setdefault(self, key, default=None):
+        self._flatten()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key, *default):
+        self._flatten()
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self._flatten()
+        return dict.popitem(self)
+
+    def __delitem__(self, key):
+        self._flatten()
+        dict.__delitem__(self, key)
+
+    def clear(self):
+        dict.clear(self)
+        self.base = {}
@@ -0,0 +1,277 @@
+import numpy as np
+import util
+import predict as predictOp
+import catalog
+
+# NumPy versions of the op calculations for whole columns of observations.
+# Each kernel returns per-row results plus per-row error codes; code 0 means the
+# row is valid and any other code indexes the op's error table below.
+
+ADJUST_ERRORS = (
+    None,
+    'observation is invalid',
+    'height is invalid',
+    'height must be greater than 0',
+    'temperature is invalid',
+    'pressure is invalid',
+    'horizon is invalid',
+    'altitude is invalid'
+)
+
+def adjust(observation, height=0.0, temperature=72, pressure=1010, horizon='natural'):
+    observation = np.atleast_1d(np.asarray(observation))
+    rows = observation.shape[0]
+
+    totalDegrees, observationInvalid = parseAngles(observation, 0, 90)
+    # 0d0.0 and 0d0.1 are too close to the horizon to correct
+    observationInvalid |= totalDegrees <= util.arcminToDegrees(0.1)
+
+    height, heightInvalid = _numericColumn(height, rows, float)
+    # not (height >= 0), so a height of 'nan' is refused as the scalar check refuses it
+    heightNegative = ~heightInvalid & ~(height >= 0)
+
+    temperature, temperatureInvalid = _numericColumn(temperature, rows, int)
+    temperatureInvalid |= (temperature < -20) | (temperature > 120)
+
+    pressure, pressureInvalid = _numericColumn(pressure, rows, int)
+    pressureInvalid |= (pressure < 100) | (pressure > 1100)
+
+    natural, horizonInvalid = _horizonColumn(horizon, rows)
+
+    with np.errstate(all='ignore'):
+        dip = np.where(natural, -0.97 * np.sqrt(np.where(heightInvalid | heightNegative, 0.0, height)) / 60.0, 0.0)
+        tempC = (temperature - 32) * 5.0 / 9.0
+        refraction = (-0.00452 * pressure) / ((273 + tempC) * np.tan(np.radians(totalDegrees)))
+        altitude = totalDegrees + dip + refraction
+        altitudeInvalid = ~((altitude >= 0) & (altitude < 91))
+
+    # assign from the last check to the first so each row reports its first failure
+    errors = np.zeros(rows, dtype=np.int8)
+    for code, invalid in ((7, altitudeInvalid), (6, horizonInvalid), (5, pressureInvalid),
+                          (4, temperatureInvalid), (3, heightNegative), (2, heightInvalid),
+                          (1, observationInvalid)):
+        errors[invalid] = code
+    altitude[errors != 0] = np.nan
+    return altitude, errors
+
+PREDICT_ERRORS = (
+    None,
+    'date is invalid'
+)
+
+def predict(body, times):
+    # one star at many instants -> (declination string, GHA/longitude degrees, error codes);
+    # declination is None when the star is not in the catalog
+    times = parseTimes(times)
+    rows = times.shape[0]
+    star = catalog.find(body)
+    if star is None:
+        return None, np.full(rows, np.nan), np.zeros(rows, dtype=np.int8)
+
+    years = times.astype('datetime64[Y]')
+    errors = (np.isnat(times) | (years < np.datetime64('2001', 'Y'))).astype(np.int8)
+    yearNumbers = np.where(errors != 0, 2001, years.astype(int) + 1970)
+
+    # the yearly Aries base is computed once per distinct year, the rotation once per row
+    uniqueYears, yearIndex = np.unique(yearNumbers, return_inverse=True)
+    base = np.array([predictOp.ghaAriesBase(int(year)) for year in uniqueYears])[yearIndex]
+    delta = (times - years).astype('timedelta64[s]').astype(float)
+    long = np.mod(base + predictOp.rotation(delta) + catalog.sha[star], 360.0)
+    long[errors != 0] = np.nan
+    return catalog.decText[star], long, errors
+
+# zero-copy view of the catalog's SHA column
+_catalogSha = np.frombuffer(catalog.sha, dtype=float)
+
+def predictAll(ghaAries):
+    # every catalog star at one instant -> (names, declination strings, GHA/longitude degrees)
+    return catalog.names, catalog.decText, np.mod(ghaAries + _catalogSha, 360.0)
+
+CORRECT_ERRORS = (
+    None,
+    'lat is invalid',
+    'long is invalid',
+    'altitude is invalid',
+    'assumedLat is invalid',
+    'assumedLong is invalid'
+)
+
+def correct(lat, long, altitude, assumedLat, assumedLong):
+    # many sightings reduced from one assumed position -> (corrected distance in
+    # arcminutes, corrected azimuth in degrees, error codes); angles are 'DdM.M'
+    # strings or degrees
+    lat, latInvalid = _correctAngles(lat, -89, 90)
+    long, longInvalid = _correctAngles(long, 0, 360)
+    altitude, altitudeInvalid = _correctAngles(altitude, 1, 90)
+    rows = max(lat.shape[0], long.shape[0], altitude.shape[0])
+    assumedLat, assumedLatInvalid = _correctAngles(assumedLat, -89, 90)
+    assumedLong, assumedLongInvalid = _correctAngles(assumedLong, 0, 360)
+
+    # the assumed position's trig once, the rest per row
+    sinAssumedLat = np.sin(np.radians(assumedLat[0]))
+    cosAssumedLat = np.cos(np.radians(assumedLat[0]))
+    latRadians = np.radians(lat)
+    sinLat = np.sin(latRadians)
+    with np.errstate(all='ignore'):
+        intermediateDistance = sinLat * sinAssumedLat + np.cos(latRadians) * cosAssumedLat * np.cos(np.radians(long + assumedLong[0]))
+        intermediateDistance = np.broadcast_to(np.clip(intermediateDistance, -1.0, 1.0), (rows,))
+        distance = (altitude - np.degrees(np.arcsin(intermediateDistance))) * 60.0
+        azimuth = np.degrees(np.arccos(np.clip((sinLat - sinAssumedLat * intermediateDistance)
+                                               / (cosAssumedLat * np.sqrt(1.0 - intermediateDistance * intermediateDistance)),
+                                               -1.0, 1.0)))
+
+    # assign from the last check to the first so each row reports its first failure
+    errors = np.zeros(rows, dtype=np.int8)
+    for code, invalid in ((5, assumedLongInvalid), (4, assumedLatInvalid), (3, altitudeInvalid),
+                          (2, longInvalid), (1, latInvalid)):
+        errors[np.broadcast_to(invalid, (rows,))] = code
+    distance[errors != 0] = np.nan
+    azimuth[errors != 0] = np.nan
+    return distance, azimuth, errors
+
+# elements (assumed positions x sightings) per correctGrid tile; each element
+# needs a handful of float64 temporaries, so a tile stays within a few MB
+GRID_TILE = 1 << 16
+
+def correctGrid(lat, long, altitude, assumedLats, assumedLongs, tile=GRID_TILE):
+    # sightings reduced from every assumed position in the grid assumedLats x
+    # assumedLongs (degrees) -> (per-sighting error codes, tiles) where tiles yields
+    # (first assumed latitude row, distance, azimuth) with results shaped
+    # [assumed latitude, assumed longitude, sighting], a few latitude rows at a time
+    lat, latInvalid = _correctAngles(lat, -89, 90)
+    long, longInvalid = _correctAngles(long, 0, 360)
+    altitude, altitudeInvalid = _correctAngles(altitude, 1, 90)
+    rows = max(lat.shape[0], long.shape[0], altitude.shape[0])
+    errors = np.zeros(rows, dtype=np.int8)
+    for code, invalid in ((3, altitudeInvalid), (2, longInvalid), (1, latInvalid)):
+        errors[np.broadcast_to(invalid, (rows,))] = code
+    assumedLats = np.atleast_1d(np.asarray(assumedLats, dtype=float))
+    assumedLongs = np.atleast_1d(np.asarray(assumedLongs, dtype=float))
+    return errors, _gridTiles(lat, long, altitude, assumedLats, assumedLongs, tile)
+
+def _gridTiles(lat, long, altitude, assumedLats, assumedLongs, tile):
+    latRadians = np.radians(lat)
+    sinLat, cosLat = np.sin(latRadians), np.cos(latRadians)
+    # LHA depends only on the assumed longitude, so its cosine is shared by every tile
+    cosLha = np.cos(np.radians(assumedLongs[:, np.newaxis] + long))
+    latRows = max(1, tile // cosLha.size)
+    for first in range(0, assumedLats.shape[0], latRows):
+        assumedLat = np.radians(assumedLats[first:first + latRows])[:, np.newaxis, np.newaxis]
+        sinAssumedLat, cosAssumedLat = np.sin(assumedLat), np.cos(assumedLat)
+        with np.errstate(all='ignore'):
+            intermediateDistance = np.clip(sinLat * sinAssumedLat + cosLat * cosAssumedLat * cosLha, -1.0, 1.0)
+            distance = (altitude - np.degrees(np.arcsin(intermediateDistance))) * 60.0
+            azimuth = np.degrees(np.arccos(np.clip((sinLat - sinAssumedLat * intermediateDistance)
+                                                   / (cosAssumedLat * np.sqrt(1.0 - intermediateDistance * intermediateDistance)),
+                                                   -1.0, 1.0)))
+        yield first, distance, azimuth
+
+def parseTimes(times):
+    # ISO 8601 timestamp strings (or datetime64 values) -> datetime64[s] array
+    times = np.atleast_1d(np.asarray(times))
+    if times.dtype.kind != 'M' and times.dtype.kind != 'U':
+        raise TypeError('times must be timestamp strings')
+    times = times.astype('datetime64[s]')
+    # '', 'NaT' and 'nat' parse to NaT, which is no instant
+    if np.isnat(times).any():
+        raise ValueError('times must not be NaT')
+    return times
+
+def timeRange(start, end, step):
+    # start to end inclusive, every step seconds
+    return np.arange(start, end + np.timedelta64(1, 's'), np.timedelta64(step, 's'))
+
+def parseAngles(angles, minDegrees, maxDegrees):
+    # 'DdM.M' strings -> signed degrees; degrees must lie in [minDegrees, maxDegrees)
+    # and minutes need exactly one decimal digit, as in the scalar validators
+    angles = np.atleast_1d(np.asarray(angles))
+    if angles.dtype.kind in 'iuf':
+        degrees = angles.astype(float)
+        return degrees, ~((degrees >= minDegrees) & (degrees < maxDegrees))
+
+    # whitespace is allowed where int and float allow it: around D and before M.M
+    parts = np.char.partition(angles.astype(str), 'd')
+    degreesStr, separator, minutesStr = np.char.strip(parts[..., 0]), parts[..., 1], np.char.lstrip(parts[..., 2])
+    negative = np.char.startswith(degreesStr, '-')
+    unsigned = np.char.lstrip(degreesStr, '-+')
+    digits = np.char.replace(minutesStr, '.', '', 1)
+    valid = ((separator == 'd') & np.char.isdigit(unsigned) & np.char.isdigit(digits)
+             & (np.char.str_len(degreesStr) - np.char.str_len(unsigned) <= 1)
+             & (np.char.rfind(minutesStr, '.') >= 0)
+             & (np.char.rfind(minutesStr, '.') == np.char.str_len(minutesStr) - 2))
+
+    degrees = _floats(np.where(valid, unsigned, '0'))
+    minutes = _floats(np.where(valid, minutesStr, '0'))
+    degrees = np.where(negative, -degrees, degrees)
+    valid &= (degrees >= minDegrees) & (degrees < maxDegrees) & (minutes < 60.0)
+    # '-0dM.M' is below 0, as in util.parseAngle
+    if minDegrees >= 0:
+        valid &= ~(negative & (minutes > 0))
+    # whole tenths over TENTHS_PER_DEGREE, the same division util.parseAngle makes
+    tenths = np.rint(minutes * 10)
+    total = np.where(negative, degrees * util.TENTHS_PER_DEGREE - tenths, degrees * util.TENTHS_PER_DEGREE + tenths)
+    return np.where(valid, total / util.TENTHS_PER_DEGREE, 0.0), ~valid
+
+def _floats(text):
+    # a column of numeric strings -> floats, read by Python's float, which is
+    # several times faster than NumPy's string cast
+    return np.fromiter(map(float, text.ravel().tolist()), float, text.size).reshape(text.shape)
+
+def _correctAngles(angles, minDegrees, maxDegrees):
+    # parseAngles plus the scalar validators' rejection of exactly 0d0.1
+    degrees, invalid = parseAngles(angles, minDegrees, maxDegrees)
+    if np.asarray(angles).dtype.kind not in 'iuf':
+        invalid |= np.abs(degrees) == util.arcminToDegrees(0.1)
+    return degrees, invalid
+
+def formatAlt(degrees):
+    # vectorized util.formatAlt for non-negative angles
+    return _formatTenths(np.rint(np.asarray(degrees, dtype=float) * util.TENTHS_PER_DEGREE).astype(np.int64))
+
+def formatAndNormalizeAlt(degrees):
+    # vectorized util.formatAndNormalizeAlt
+    tenths = np.rint(np.asarray(degrees, dtype=float) * util.TENTHS_PER_DEGREE).astype(np.int64)
+    return _formatTenths(np.mod(tenths, util.TENTHS_PER_CIRCLE))
+
+def _formatTenths(tenths):
+    # util.Angle.format over a column of non-negative tenths of an arcminute. Python's
+    # % on each row, with the 'M.M' text looked up, is faster than joining string
+    # columns with np.char.add
+    degrees, tenths = np.divmod(tenths, util.TENTHS_PER_DEGREE)
+    minutes = map(util._MINUTES.__getitem__, tenths.ravel().tolist())
+    return np.array(['%dd%s' % row for row in zip(degrees.ravel().tolist(), minutes)]).reshape(degrees.shape)
+
+def _numericColumn(column, rows, convert):
+    dtype = np.int64 if convert is int else float
+    if not (isinstance(column, list) and len(column) == rows):
+        column = np.asarray(column)
+        if column.dtype.kind in 'iuf':
+            return np.broadcast_to(column.astype(dtype), (rows,)), np.zeros(rows, dtype=bool)
+        column = np.broadcast_to(column, (rows,)).tolist()
+    # Python's int and float read each row, as the scalar validators do
+    try:
+        return np.fromiter(map(convert, column), dtype, rows), np.zeros(rows, dtype=bool)
+    except (ValueError, TypeError, OverflowError):
+        pass
+    # at least one row is malformed; fall back to converting row by row
+    values = np.zeros(rows, dtype=dtype)
+    invalid = np.zeros(rows, dtype=bool)
+    for row, value in enumerate(column):
+        try:
+            values[row] = convert(value)
+        except (ValueError, TypeError, OverflowError):
+            invalid[row] = True
+    return values, invalid
+
+def _horizonColumn(column, rows):
+    if not isinstance(column, list):
+        column = np.asarray(column)
+        if column.ndim == 0:
+            natural, invalid = _horizonColumn([column.item()], 1)
+            return np.broadcast_to(natural, (rows,)), np.broadcast_to(invalid, (rows,))
+        column = column.tolist()
+    # str.lower, as the scalar validator lowers it
+    lowered = [value.lower() if isinstance(value, str) else '' for value in column]
+    natural = np.fromiter([horizon == 'natural' for horizon in lowered], bool, len(lowered))
+    artificial = np.fromiter([horizon == 'artificial' for horizon in lowered], bool, len(lowered))
+    return natural, ~(natural | artificial)